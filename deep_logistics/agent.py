@@ -63,6 +63,9 @@ class Agent:
         self.total_pickups = 0
         self.total_actions = 0
 
+        """Crashes over the lifetime of the agent. Not reset on spawn, Telemetry counts the increments."""
+        self.total_crashes = 0
+
     def reset_stats(self):
         self.total_deliveries = 0
         self.total_pickups = 0
@@ -97,6 +100,7 @@ class Agent:
         self.state = Agent.INACTIVE
 
     def crash(self):
+        self.total_crashes += 1
 
         if self.task:
             self.task.abort()
@@ -121,8 +125,16 @@ class Agent:
     def automate(self):
         return None
 
-    def do_action(self, action):
-        self.total_actions += 1
+    def do_action(self, action, repeat=False):
+        """
+        :param repeat: The action repeats the previous decision on a skipped frame (See MultiAgentEnvironment.step).
+        It is applied like any action, but not counted in total_actions.
+        """
+        if self.environment.recorder is not None:
+            self.environment.recorder.on_action(self, action)
+
+        if not repeat:
+            self.total_actions += 1
 
         if self.is_terminal():
             return
@@ -149,20 +161,35 @@ class Agent:
             self._increase_acceleration()
 
     def update(self):
+        move = self.intend_move()
+        if move is None:
+            return
 
+        x, y = move
+        return_code = self.environment.grid.move_relative(self, x, y)
+
+        if return_code == Grid.MOVE_AGENT_COLLISION:
+            # TODO additional handling for other agent
+            self.environment.grid.relative_cell(self, x, y).occupant.crash()
+
+        self.complete_move(return_code)
+
+    def intend_move(self):
+        """
+        First half of update: advance the action progress and return the relative move (x, y) the agent makes this
+        tick, without touching the grid. None when the agent does not move at all.
+        """
         if self.state is Agent.INACTIVE:
             """Inactive state - Means the agent has not spawned yet, and cannot be updated."""
-            return
+            return None
         elif self.state is Agent.DESTROYED:
             """Destroyed state - Means the agent should be set to inactive 
             (Algorithms should have catched the destroyed state)."""
             self.state = Agent.INACTIVE
-            return
+            return None
         elif self.action is None:
             """If the player has no action at all (Means that the agent is fully de-accelerated and action is unset)."""
-            return
-
-        action = self.action
+            return None
 
         d_prog = ((self.action_intensity * Agent.MAX_SPEED) / Agent.MAX_SPEED) * self.environment.tick_ps_ratio
         self.action_progress += d_prog
@@ -173,22 +200,17 @@ class Agent:
 
         assert self.action_progress < 1  # TODO - Remove when release
 
-        x, y = np.multiply(ActionSpace.DIRECTIONS[action], steps)
+        x, y = np.multiply(ActionSpace.DIRECTIONS[self.action], steps)
+        return x, y
 
-        return_code = self.environment.grid.move_relative(self, x, y)
+    def complete_move(self, return_code):
+        """Second half of update: apply the outcome of the move from intend_move."""
         self.state = Agent.MOVING
 
-        if return_code == Grid.MOVE_WALL_COLLISION:
-            self.crash()
-            return
-        elif return_code == Grid.MOVE_AGENT_COLLISION:
-            # TODO additional handling for other agent
-            self.environment.grid.relative_cell(self, x, y).occupant.crash()
+        if return_code == Grid.MOVE_WALL_COLLISION or return_code == Grid.MOVE_AGENT_COLLISION:
             self.crash()
-            
             return
 
-        assert action == self.action
         self._decrease_acceleration()
 
         if self.action_intensity == 0:
@@ -288,7 +310,10 @@ class ManhattanAgent(Agent):
             is_aligned_x = d_x == 0
             is_aligned_y = d_y == 0
 
-            if not is_aligned_x:
+            if self.environment.grid.has_obstacles:
+                """Follow the BFS distance field around the obstacles."""
+                action = self.environment.distance_fields.next_step(self.cell, task_coords)
+            elif not is_aligned_x:
                 if d_x > 0:
                     action = ActionSpace.LEFT
                 else:
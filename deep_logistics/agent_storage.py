@@ -1,7 +1,18 @@
+import numpy as np
+
 from deep_logistics.agent import Agent
 
 
 class AgentStore:
+    """Columns of the array returned by gather()."""
+    HAS_CELL = 0
+    X = 1
+    Y = 2
+    HAS_TASK = 3
+    TARGET_X = 4
+    TARGET_Y = 5
+    STATE = 6
+    N_COLUMNS = 7
 
     def __init__(self, env):
         self.env = env
@@ -33,3 +44,42 @@ class AgentStore:
             if not agent.is_terminal():
                 return False
         return True
+
+    def gather(self, agents=None, out=None):
+        """
+        Read the raw per-agent values into a (n_agents, N_COLUMNS) int array in one pass over the agents.
+        The target is the pickup point until the task is picked up, then the delivery point. Missing cells and tasks
+        are written as zeros.
+        :param agents: Sequence of agents. Defaults to all agents in the store.
+        :param out: Optional preallocated (n_agents, N_COLUMNS) int array that is written in place.
+        :return: out
+        """
+        agents = self.agents if agents is None else agents
+        if out is None:
+            out = np.zeros(shape=(len(agents), AgentStore.N_COLUMNS), dtype=np.int64)
+
+        for i, agent in enumerate(agents):
+            row = out[i]
+            cell = agent._cell
+            task = agent.task
+            if cell is not None:
+                row[0] = 1
+                row[1] = cell.x
+                row[2] = cell.y
+            else:
+                row[0:3] = 0
+
+            if task is not None:
+                row[3] = 1
+                if task.has_picked_up:
+                    row[4] = task.x_1
+                    row[5] = task.y_1
+                else:
+                    row[4] = task.x_0
+                    row[5] = task.y_0
+            else:
+                row[3:6] = 0
+
+            row[6] = agent.state
+
+        return out
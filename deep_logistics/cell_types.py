@@ -25,3 +25,13 @@ class Agent:
     COLOR = (0, 255, 0)
 
 
+class Wall:
+    COLOR = (64, 64, 64)
+
+
+class Shelf:
+    COLOR = (19, 69, 139)
+
+
+"""Static cell types that agents cannot enter."""
+OBSTACLES = [Wall, Shelf]
@@ -0,0 +1,111 @@
+import time
+
+
+class Clock:
+    """
+    Fixed-timestep clock for the environment.
+    With ups=None the clock is unbounded and the simulation runs as fast as possible. With ups set, every update is
+    scheduled on an absolute deadline (start + n / ups), so the time spent doing the update is compensated for and the
+    real update rate does not drift below the target. The render rate (fps) is decoupled from the update rate.
+    """
+
+    def __init__(self, ups=None, fps=None, max_lag=0.25, time_fn=time.perf_counter, sleep_fn=time.sleep):
+        """
+        :param ups: Target updates per second. None (or 0) runs unbounded.
+        :param fps: Target renders per second. None (or 0) renders on every request.
+        :param max_lag: Seconds the clock may fall behind before it gives up on catching up and resynchronizes.
+        :param time_fn: Monotonic time source in seconds.
+        :param sleep_fn: Sleep function in seconds.
+        """
+        self.ups = ups
+        self.fps = fps
+        self.update_interval = 0 if not ups else 1.0 / ups
+        self.render_interval = 0 if not fps else 1.0 / fps
+        self.max_lag = max_lag
+
+        self._time = time_fn
+        self._sleep = sleep_fn
+
+        self.updates = 0
+        self.renders = 0
+        self.resyncs = 0
+
+        self._deadline = None
+        self._next_render = None
+        self._accumulator_time = None
+        self.accumulator = 0.0
+
+    @property
+    def unbounded(self):
+        return not self.ups
+
+    def reset(self):
+        now = self._time()
+        self._deadline = now + self.update_interval
+        self._next_render = now
+        self._accumulator_time = now
+        self.accumulator = 0.0
+
+    def tick(self):
+        """Called once per update. In fixed-timestep mode this sleeps until the deadline of the next update."""
+        self.updates += 1
+        if self.unbounded:
+            return
+
+        if self._deadline is None:
+            self.reset()
+
+        now = self._time()
+        remaining = self._deadline - now
+
+        if remaining > 0:
+            self._sleep(remaining)
+            self._deadline += self.update_interval
+        elif -remaining > self.max_lag:
+            """Too far behind. Drop the backlog instead of running a burst of updates without sleeping."""
+            self._deadline = now + self.update_interval
+            self.resyncs += 1
+        else:
+            self._deadline += self.update_interval
+
+    def updates_due(self, max_updates=None):
+        """
+        Fixed-timestep accumulation for real-time loops: returns the number of updates that should run now to keep up
+        with wall-clock time. Unbounded clocks always return 1.
+        :param max_updates: Cap on the number of updates returned. Defaults to what fits inside max_lag.
+        """
+        if self.unbounded:
+            return 1
+
+        if self._accumulator_time is None:
+            self.reset()
+
+        now = self._time()
+        self.accumulator += now - self._accumulator_time
+        self._accumulator_time = now
+
+        if max_updates is None:
+            max_updates = max(1, int(self.max_lag / self.update_interval))
+
+        n = int(self.accumulator / self.update_interval)
+        if n > max_updates:
+            self.resyncs += 1
+            self.accumulator = 0.0
+            return max_updates
+
+        self.accumulator -= n * self.update_interval
+        return n
+
+    def should_render(self):
+        """Returns True when a render is due according to the render rate."""
+        if not self.fps:
+            self.renders += 1
+            return True
+
+        now = self._time()
+        if self._next_render is None or now >= self._next_render:
+            self._next_render = now + self.render_interval
+            self.renders += 1
+            return True
+
+        return False
@@ -0,0 +1,102 @@
+import numpy as np
+
+from deep_logistics.grid import Grid
+
+
+class CongestionMap:
+    """
+    Per-cell congestion counters, recorded by Grid.move (Environment(congestion=True)).
+    - visits: Agents entering the cell.
+    - collisions: Collisions on the cell. Agent collisions are counted on the cell that was run into, wall collisions
+      on the cell of the agent.
+    - wait: Seconds agents spent on the cell while updating without leaving it (accelerating, turning or blocked).
+
+    With a window, all counters decay exponentially with a time constant of window ticks. The decay is applied through
+    a global scale: increments are added as the current scale and the scale grows every tick, so a move costs one array
+    increment and a tick costs one multiplication. The arrays are renormalized when the scale gets large.
+    """
+    LAYERS = ["visits", "collisions", "wait"]
+
+    RENORMALIZE = 1e12
+
+    def __init__(self, grid, window=None, tick_seconds=0.1):
+        """
+        :param grid: Grid
+        :param window: Decay time constant in ticks. None accumulates without decay.
+        :param tick_seconds: Seconds per tick, added to wait for every tick an agent stays on a cell
+        """
+        self.grid = grid
+        self.window = window
+        self.growth = 1.0 if window is None else 1.0 / (1.0 - 1.0 / max(window, 1.0))
+        self.tick_seconds = tick_seconds
+
+        self.visits = np.zeros(shape=(grid.height, grid.width), dtype=np.float64)
+        self.collisions = np.zeros(shape=(grid.height, grid.width), dtype=np.float64)
+        self.wait = np.zeros(shape=(grid.height, grid.width), dtype=np.float64)
+
+        """Weight of an increment made now. Stored values are divided by it when read."""
+        self.scale = 1.0
+        self.wait_scale = tick_seconds
+
+    def reset(self):
+        self.visits[:] = 0
+        self.collisions[:] = 0
+        self.wait[:] = 0
+        self.scale = 1.0
+        self.wait_scale = self.tick_seconds
+
+    def tick(self):
+        """Advance the decay by one tick."""
+        if self.window is None:
+            return
+
+        self.scale *= self.growth
+        if self.scale > CongestionMap.RENORMALIZE:
+            for layer in CongestionMap.LAYERS:
+                getattr(self, layer)[:] /= self.scale
+            self.scale = 1.0
+        self.wait_scale = self.scale * self.tick_seconds
+
+    def record(self, codes, x0, y0, x1, y1):
+        """Vectorized recording of simultaneous moves (See Grid.move_simultaneous)."""
+        ok = codes == Grid.MOVE_OK
+        stay = (x0 == x1) & (y0 == y1)
+        entered = ok & ~stay
+        np.add.at(self.visits, (y1[entered], x1[entered]), self.scale)
+        np.add.at(self.wait, (y0[ok & stay], x0[ok & stay]), self.wait_scale)
+
+        wall = codes == Grid.MOVE_WALL_COLLISION
+        agent = codes == Grid.MOVE_AGENT_COLLISION
+        np.add.at(self.collisions, (y0[wall], x0[wall]), self.scale)
+        np.add.at(self.collisions, (y1[agent], x1[agent]), self.scale)
+
+    def layer(self, name):
+        """Current (decayed) values of a layer."""
+        if name not in CongestionMap.LAYERS:
+            raise ValueError("Unknown congestion layer %s. Available layers: %s" % (name, CongestionMap.LAYERS))
+        return getattr(self, name) / self.scale
+
+    def arrays(self):
+        return {name: self.layer(name) for name in CongestionMap.LAYERS}
+
+    def normalized(self, name):
+        """Layer scaled to [0, 1] by its maximum."""
+        values = self.layer(name)
+        peak = values.max()
+        return values / peak if peak > 0 else values
+
+    def overlay(self, image, name="visits", color=(0, 0, 255), alpha=0.6):
+        """
+        Blend a layer over a rendered frame in place.
+        :param image: (height * cell_height, width * cell_width, 3) uint8 array, e.g. the frame of the HTTPRenderer
+        :param color: Color of the hottest cells, in the channel order of image
+        :param alpha: Opacity of the hottest cells
+        :return: image
+        """
+        cell_height = image.shape[0] // self.grid.height
+        cell_width = image.shape[1] // self.grid.width
+        weight = np.kron(self.normalized(name), np.ones((cell_height, cell_width)))[..., None] * alpha
+
+        region = image[:cell_height * self.grid.height, :cell_width * self.grid.width]
+        region[:] = (region * (1 - weight) + np.asarray(color, dtype=np.float64) * weight).astype(image.dtype)
+        return image
@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import socket
+import uuid
+
+import numpy as np
+
+"""
+Sharded transition dataset, e.g. expert demonstrations (ManhattanAgent.automate) or rollouts for pretraining.
+A dataset is a directory of shards. A shard holds shard_size transitions as one .npy file per column (obs, actions,
+rewards, terminals) and a meta.json with its row count. The last shard of a writer may hold fewer, its files are
+truncated to the written rows when it is closed. Shards are filled through memory maps in a temporary directory
+and renamed into place when full or when the writer is closed, so readers only ever see complete shards, and any
+number of writers (processes, machines on a shared file system) can write into the same dataset.
+"""
+
+"""Default column dtypes. Actions of deep_logistics (ActionSpace) fit into int8."""
+COLUMNS = dict(
+    obs=np.float32,
+    actions=np.int8,
+    rewards=np.float32,
+    terminals=np.bool_
+)
+
+META = "meta.json"
+
+
+class DatasetWriter:
+    """Streams transitions into the shards of a dataset directory (See module docstring)."""
+
+    def __init__(self, path, shard_size=1 << 20, dtypes=None, name=None):
+        """
+        :param path: Dataset directory. Created if missing, shards of other writers are left alone.
+        :param shard_size: Transitions per shard. The last shard of a writer may hold fewer.
+        :param dtypes: Column dtypes overriding COLUMNS
+        :param name: Prefix of the shards of this writer. Defaults to a name unique to the host and process.
+        """
+        self.path = path
+        self.shard_size = shard_size
+        self.dtypes = dict(COLUMNS, **(dtypes or {}))
+        self.name = name or "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+        self.shards = 0
+        self.count = 0  # Rows in the open shard
+        self.columns = None  # Memory maps of the open shard
+        self.tmp = None
+
+        os.makedirs(path, exist_ok=True)
+
+    def _open(self, shapes):
+        self.tmp = os.path.join(self.path, ".%s-%06d.tmp" % (self.name, self.shards))
+        os.makedirs(self.tmp)
+        self.columns = {
+            k: np.lib.format.open_memmap(os.path.join(self.tmp, k + ".npy"), mode="w+", dtype=self.dtypes[k],
+                                         shape=(self.shard_size, ) + shapes[k])
+            for k in self.dtypes.keys()
+        }
+        self.count = 0
+
+    def _truncate(self, k, column):
+        """Rewrite a column of a shard that is closed before it is full, so the file holds only the written rows."""
+        path = os.path.join(self.tmp, k + ".npy")
+        truncated = np.lib.format.open_memmap(path + ".part", mode="w+", dtype=column.dtype,
+                                              shape=(self.count, ) + column.shape[1:])
+        truncated[:] = column[:self.count]
+        truncated.flush()
+        os.replace(path + ".part", path)
+
+    def _close_shard(self):
+        """Flush the open shard and rename it into place."""
+        shapes = {}
+        for k, column in self.columns.items():
+            column.flush()
+            if self.count < self.shard_size:
+                self._truncate(k, column)
+            shapes[k] = [column.dtype.str, list(column.shape[1:])]
+        self.columns = None
+
+        with open(os.path.join(self.tmp, META), "w") as f:
+            json.dump(dict(rows=self.count, columns=shapes), f)
+
+        os.rename(self.tmp, os.path.join(self.path, "shard-%s-%06d" % (self.name, self.shards)))
+        self.tmp = None
+        self.shards += 1
+
+    def extend(self, obs, actions, rewards, terminals):
+        """Write a batch of transitions, e.g. the arrays of a MultiAgentEnvironment step."""
+        data = dict(obs=obs, actions=actions, rewards=rewards, terminals=terminals)
+        data = {k: np.asarray(v) for k, v in data.items()}
+        n = len(data["actions"])
+
+        start = 0
+        while start < n:
+            if self.columns is None:
+                self._open({k: v.shape[1:] for k, v in data.items()})
+
+            end = min(n, start + self.shard_size - self.count)
+            for k, column in self.columns.items():
+                column[self.count:self.count + end - start] = data[k][start:end]
+
+            self.count += end - start
+            start = end
+            if self.count == self.shard_size:
+                self._close_shard()
+
+    def add(self, obs, action, reward, terminal):
+        """Write a single transition."""
+        self.extend(np.asarray(obs)[None], [action], [reward], [terminal])
+
+    def close(self):
+        """Write the open shard, if it holds any transitions."""
+        if self.columns is None:
+            return
+
+        if self.count > 0:
+            self._close_shard()
+        else:
+            self.columns = None
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            self.tmp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class DatasetReader:
+    """
+    Minibatches of a dataset, read through read-only memory maps of the shards so nothing is loaded into memory that
+    is not in a minibatch. The index is the row offset of every shard, minibatch rows are located with one
+    searchsorted.
+    """
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        self.random = np.random.RandomState(seed)
+
+        self.names = []
+        self.shards = []
+        self.starts = np.zeros(1, dtype=np.int64)
+        self.refresh()
+
+    def refresh(self):
+        """Add the shards completed since the dataset was opened (or last refreshed)."""
+        known = set(self.names)
+        names = sorted(name for name in os.listdir(self.path) if name.startswith("shard-") and name not in known)
+
+        rows = []
+        for name in names:
+            shard = os.path.join(self.path, name)
+            with open(os.path.join(shard, META)) as f:
+                meta = json.load(f)
+
+            self.names.append(name)
+            self.shards.append({
+                k: np.load(os.path.join(shard, k + ".npy"), mmap_mode="r")[:meta["rows"]]
+                for k in meta["columns"].keys()
+            })
+            rows.append(meta["rows"])
+
+        self.starts = np.concatenate([self.starts, self.starts[-1] + np.cumsum(rows, dtype=np.int64)])
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def _gather(self, shards, starts, rows):
+        """
+        The rows (sorted, indices into the concatenation of shards) as a dict of arrays. Sorted rows read every shard
+        front to back, and the rows of one shard are one fancy index into its memory map.
+        """
+        bounds = np.searchsorted(rows, starts)
+        first = self.shards[shards[0]]
+        batch = {k: np.empty((len(rows), ) + column.shape[1:], dtype=column.dtype) for k, column in first.items()}
+
+        for i, shard in enumerate(shards):
+            a, b = bounds[i], bounds[i + 1]
+            if a == b:
+                continue
+            local = rows[a:b] - starts[i]
+            for k, column in self.shards[shard].items():
+                batch[k][a:b] = column[local]
+
+        return batch
+
+    def sample(self, batch_size):
+        """batch_size transitions drawn uniformly (with replacement) from the whole dataset."""
+        if len(self) == 0:
+            raise ValueError("The dataset %s has no shards." % self.path)
+
+        rows = np.sort(self.random.randint(0, len(self), size=batch_size))
+        return self._gather(np.arange(len(self.shards)), self.starts, rows)
+
+    def epoch(self, batch_size, window=8):
+        """
+        Iterate once over every transition in shuffled minibatches. The shards are visited in random order, window
+        shards at a time, and the rows of those shards are shuffled together. Memory is bounded by the window instead
+        of the dataset size. The last minibatch of every window may be smaller.
+        """
+        order = self.random.permutation(len(self.shards))
+        sizes = np.diff(self.starts)
+
+        for w in range(0, len(order), window):
+            shards = order[w:w + window]
+            starts = np.concatenate([[0], np.cumsum(sizes[shards])])
+            rows = self.random.permutation(starts[-1])
+
+            for start in range(0, len(rows), batch_size):
+                yield self._gather(shards, starts, np.sort(rows[start:start + batch_size]))
+
+
+def collect(env, policy, writer, steps):
+    """
+    Stream steps of a MultiAgentEnvironment into writer, one row per agent and step. The environment is reset when any
+    agent is terminal.
+    :param policy: Called with the observations, returns the actions of all agents, e.g. an expert
+    lambda obs: [agent.automate(perform_action=False) for agent in env.env.agents] with ManhattanAgents
+    """
+    obs = env.reset().copy()
+    for _ in range(steps):
+        actions = np.asarray(policy(obs))
+        obs1, rewards, terminals, _ = env.step(actions)
+        writer.extend(obs, actions, rewards, terminals)
+
+        obs = env.reset().copy() if terminals.any() else obs1.copy()
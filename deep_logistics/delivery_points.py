@@ -32,6 +32,8 @@ class DeliveryPointGenerator:
                 yield item
 
     def add_delivery_point(self, x, y):
+        if self.environment.grid.obstacles[y, x]:
+            raise ValueError("The delivery point (%s, %s) is placed on an obstacle." % (x, y))
         cell = self.environment.grid.cell(x, y)
         cell.type = cell_types.OrderDelivery
         cell.original_type = cell_types.OrderDelivery
@@ -48,6 +50,8 @@ class DeliveryPointGenerator:
             selected_xs = list(self.roll(possible_xs, self.frequency))
 
             for x in selected_xs:
+                if self.environment.grid.obstacles[y, x]:
+                    continue
                 delivery_points.append(self.add_delivery_point(x, y))
 
         return delivery_points
@@ -0,0 +1,219 @@
+import abc
+from collections import deque
+
+import numpy as np
+
+from deep_logistics.scheduler import Order
+
+
+class ArrivalProcess(abc.ABC):
+    """Order arrival process. Times are in environment seconds (See Environment.get_seconds)."""
+
+    @abc.abstractmethod
+    def arrivals(self, t0, t1, rng):
+        """
+        Draw all arrivals in [t0, t1).
+        :param rng: numpy Generator
+        :return: Sorted float64 array of arrival times
+        """
+        raise NotImplementedError("arrivals must be implemented!")
+
+    def locations(self, t0, t1):
+        """Fixed (pickup, delivery) locations for the arrivals in [t0, t1), or None when they are drawn at random."""
+        return None
+
+
+class PoissonProcess(ArrivalProcess):
+    """Homogeneous Poisson process with rate orders per second."""
+
+    def __init__(self, rate):
+        if rate < 0:
+            raise ValueError("The arrival rate must be >= 0, got %s." % rate)
+        self.rate = rate
+
+    def arrivals(self, t0, t1, rng):
+        n = rng.poisson(self.rate * (t1 - t0))
+        return np.sort(rng.uniform(t0, t1, size=n))
+
+
+class DiurnalProcess(ArrivalProcess):
+    """
+    Non-homogeneous Poisson process with a periodic rate curve. The curve is given as rates (orders per second) at
+    evenly spaced points over one period and interpolated linearly in between, wrapping around at the end of the
+    period. Arrivals are drawn by thinning a Poisson process at the peak rate.
+    """
+
+    def __init__(self, rates, period=24 * 60 * 60):
+        self.rates = np.asarray(rates, dtype=np.float64)
+        if self.rates.ndim != 1 or len(self.rates) == 0 or (self.rates < 0).any():
+            raise ValueError("The rate curve must be a non-empty sequence of rates >= 0.")
+        self.period = float(period)
+        self.peak = float(self.rates.max())
+
+        self._xp = np.linspace(0, self.period, len(self.rates) + 1)
+        self._fp = np.append(self.rates, self.rates[0])
+
+    def rate(self, t):
+        return np.interp(np.mod(t, self.period), self._xp, self._fp)
+
+    def arrivals(self, t0, t1, rng):
+        n = rng.poisson(self.peak * (t1 - t0))
+        candidates = rng.uniform(t0, t1, size=n)
+        accepted = candidates[rng.uniform(0, self.peak, size=n) < self.rate(candidates)]
+        return np.sort(accepted)
+
+
+class TraceProcess(ArrivalProcess):
+    """
+    Replay of recorded arrivals. Locations are replayed as well when pickups and deliveries are given.
+    :param times: Arrival times in seconds
+    :param pickups: Optional (n, 2) array of pickup (x, y)
+    :param deliveries: Optional (n, 2) array of delivery (x, y)
+    :param loop: Repeat the trace with a period of loop seconds
+    """
+
+    def __init__(self, times, pickups=None, deliveries=None, loop=None):
+        times = np.asarray(times, dtype=np.float64)
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+
+        if (pickups is None) != (deliveries is None):
+            raise ValueError("Pickups and deliveries must be given together.")
+        self.pickups = None if pickups is None else np.asarray(pickups, dtype=np.int64).reshape(-1, 2)[order]
+        self.deliveries = None if deliveries is None else np.asarray(deliveries, dtype=np.int64).reshape(-1, 2)[order]
+
+        if loop is not None and len(self.times) > 0 and self.times[-1] >= loop:
+            raise ValueError("All trace times must be within the loop period of %s seconds." % loop)
+        self.loop = loop
+
+    def _slice(self, t0, t1):
+        """Indices into the trace and time offsets of all arrivals in [t0, t1)."""
+        if self.loop is None:
+            start, end = np.searchsorted(self.times, [t0, t1])
+            return np.arange(start, end), np.zeros(end - start)
+
+        indices = []
+        offsets = []
+        for k in range(int(t0 // self.loop), int(t1 // self.loop) + 1):
+            base = k * self.loop
+            start, end = np.searchsorted(self.times, [t0 - base, t1 - base])
+            indices.append(np.arange(start, end))
+            offsets.append(np.full(end - start, base))
+        return np.concatenate(indices), np.concatenate(offsets)
+
+    def arrivals(self, t0, t1, rng):
+        indices, offsets = self._slice(t0, t1)
+        return self.times[indices] + offsets
+
+    def locations(self, t0, t1):
+        if self.pickups is None:
+            return None
+        indices, _ = self._slice(t0, t1)
+        return self.pickups[indices], self.deliveries[indices]
+
+
+class DemandEngine:
+    """
+    Generates orders from an arrival process into a pending backlog that schedulers pull from (See BacklogScheduler).
+    Arrivals and their locations are drawn in blocks of block seconds with one vectorized call per quantity, and
+    released into the backlog as Orders when the environment clock passes their arrival time.
+    """
+
+    def __init__(self, environment, process, seed=None, block=60.0, max_backlog=None):
+        """
+        :param environment: Environment
+        :param process: ArrivalProcess
+        :param seed: Seed of the generator used for arrivals and locations
+        :param block: Seconds of arrivals drawn at a time
+        :param max_backlog: Maximum number of waiting orders. The oldest orders are dropped beyond it.
+        """
+        self.environment = environment
+        self.process = process
+        self.rng = np.random.default_rng(seed)
+        self.block = block
+        self.max_backlog = max_backlog
+
+        """Pickup points are drawn like OrderGenerator.add_task (See DistanceFieldCache.pickup_cells)."""
+        self.pickup_cells = environment.distance_fields.pickup_cells()
+        self.delivery_cells = np.array(
+            [(cell.x, cell.y) for cell in environment.delivery_points.data], dtype=np.int64
+        ).reshape(-1, 2)
+        if len(self.delivery_cells) == 0:
+            raise ValueError("The demand engine requires at least one delivery point.")
+        if len(self.pickup_cells) == 0:
+            raise ValueError("There is no walkable cell below the two top rows that can reach a delivery point.")
+
+        self.backlog = deque()
+
+        self.horizon = 0.0  # Arrivals are generated up to this time
+        self._times = np.zeros(0)
+        self._pickups = np.zeros((0, 2), dtype=np.int64)
+        self._deliveries = np.zeros((0, 2), dtype=np.int64)
+        self._depths = np.zeros(0, dtype=np.int64)
+        self._cursor = 0
+
+        self.total_arrivals = 0
+        self.total_dropped = 0
+
+    def reset(self):
+        """Discard the backlog and restart the arrivals from the current time."""
+        self.backlog.clear()
+        self.horizon = self.environment.get_seconds()
+        self._times = self._times[:0]
+        self._cursor = 0
+
+    def _generate(self):
+        t0 = self.horizon
+        t1 = t0 + self.block
+        times = self.process.arrivals(t0, t1, self.rng)
+        n = len(times)
+
+        locations = self.process.locations(t0, t1)
+        if locations is None:
+            pickups = self.pickup_cells[self.rng.integers(0, len(self.pickup_cells), size=n)]
+            deliveries = self.delivery_cells[self.rng.integers(0, len(self.delivery_cells), size=n)]
+        else:
+            pickups, deliveries = locations
+
+        self._times = times
+        self._pickups = pickups
+        self._deliveries = deliveries
+        self._depths = self.rng.integers(0, self.environment.depth + 1, size=n)
+        self._cursor = 0
+        self.horizon = t1
+
+    def update(self, now=None):
+        """Release all orders that arrived up to now into the backlog."""
+        now = self.environment.get_seconds() if now is None else now
+
+        while True:
+            end = self._cursor + int(np.searchsorted(self._times[self._cursor:], now, side="right"))
+            for i in range(self._cursor, end):
+                self.backlog.append(Order(
+                    self.environment,
+                    int(self._pickups[i, 0]), int(self._pickups[i, 1]), int(self._depths[i]),
+                    int(self._deliveries[i, 0]), int(self._deliveries[i, 1]),
+                    created_at=float(self._times[i])
+                ))
+            self.total_arrivals += end - self._cursor
+            self._cursor = end
+
+            if self.horizon > now:
+                break
+            self._generate()
+
+        if self.max_backlog is not None:
+            while len(self.backlog) > self.max_backlog:
+                self.backlog.popleft()
+                self.total_dropped += 1
+
+    def pull(self):
+        """Oldest waiting order, or None when the backlog is empty."""
+        return self.backlog.popleft() if self.backlog else None
+
+    def requeue(self, order):
+        """Return an aborted order to the front of the backlog."""
+        self.backlog.appendleft(order)
+
+    def __len__(self):
+        return len(self.backlog)
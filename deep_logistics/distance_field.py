@@ -0,0 +1,142 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from deep_logistics.action_space import ActionSpace
+
+
+def bfs(walkable, x, y):
+    """
+    Breadth-first search from (x, y) over the walkable cells using 4-connectivity. Each BFS layer is expanded as one
+    vectorized operation over the whole grid.
+    :param walkable: (height, width) bool array
+    :return: (height, width) int32 array of distances. Unreachable cells are -1.
+    """
+    height, width = walkable.shape
+    distance = np.full(shape=(height, width), fill_value=-1, dtype=np.int32)
+    if not walkable[y, x]:
+        return distance
+
+    frontier = np.zeros(shape=(height, width), dtype=np.bool_)
+    frontier[y, x] = True
+    visited = frontier.copy()
+    distance[y, x] = 0
+
+    expanded = np.empty_like(frontier)
+    d = 0
+    while True:
+        expanded[:] = False
+        expanded[1:, :] |= frontier[:-1, :]
+        expanded[:-1, :] |= frontier[1:, :]
+        expanded[:, 1:] |= frontier[:, :-1]
+        expanded[:, :-1] |= frontier[:, 1:]
+        expanded &= walkable
+        expanded &= ~visited
+
+        if not expanded.any():
+            break
+
+        d += 1
+        distance[expanded] = d
+        visited |= expanded
+        frontier, expanded = expanded, frontier
+
+    return distance
+
+
+def descent(distance):
+    """
+    Direction map for a distance field. Every cell gets the action that moves one step closer to the target.
+    Horizontal moves are preferred over vertical moves, which on an open grid gives the same route as ManhattanAgent.
+    :param distance: (height, width) int32 distance field from bfs()
+    :return: (height, width) int8 array of ActionSpace actions. NOOP at the target and on unreachable cells.
+    """
+    height, width = distance.shape
+    padded = np.full(shape=(height + 2, width + 2), fill_value=-1, dtype=np.int32)
+    padded[1:-1, 1:-1] = distance
+
+    neighbours = [
+        (ActionSpace.LEFT, padded[1:-1, :-2]),
+        (ActionSpace.RIGHT, padded[1:-1, 2:]),
+        (ActionSpace.UP, padded[:-2, 1:-1]),
+        (ActionSpace.DOWN, padded[2:, 1:-1]),
+    ]
+
+    directions = np.full(shape=(height, width), fill_value=ActionSpace.NOOP, dtype=np.int8)
+    moving = distance > 0
+    for action, neighbour in reversed(neighbours):
+        directions[moving & (neighbour == distance - 1)] = action
+
+    return directions
+
+
+class DistanceFieldCache:
+    """
+    Cache of BFS distance fields over the static obstacle layer of a grid.
+    Fields for the given targets (the delivery points) are precomputed once, or passed in through fields when they
+    are shared (See Layout). Fields for other targets (pickup points) are computed on first use and kept in a LRU cache
+    of max_fields entries.
+    """
+
+    def __init__(self, grid, targets=(), max_fields=1024, fields=None):
+        self.grid = grid
+        self.max_fields = max_fields
+        self.walkable = ~grid.obstacles
+
+        self.static = {} if fields is None else dict(fields)
+        self.dynamic = OrderedDict()
+        self._pickup_cells = None
+
+        for target in targets:
+            key = (target.x, target.y)
+            if key not in self.static:
+                self.static[key] = self._compute(*key)
+
+    def _compute(self, x, y):
+        distance = bfs(self.walkable, x, y)
+        return distance, descent(distance)
+
+    def field(self, target):
+        """
+        :param target: Object with x and y attributes (Cell or Order.Coordinate)
+        :return: (distance, directions) arrays for the target
+        """
+        key = (target.x, target.y)
+        try:
+            return self.static[key]
+        except KeyError:
+            pass
+
+        try:
+            self.dynamic.move_to_end(key)
+            return self.dynamic[key]
+        except KeyError:
+            data = self._compute(*key)
+            self.dynamic[key] = data
+            if len(self.dynamic) > self.max_fields:
+                self.dynamic.popitem(last=False)
+            return data
+
+    def pickup_cells(self):
+        """
+        (n, 2) array of the (x, y) cells orders can be picked up from: walkable cells below the two top rows from which
+        at least one delivery point (the precomputed targets) can be reached.
+        """
+        if self._pickup_cells is None:
+            cells = self.walkable.copy()
+            cells[:2, :] = False
+            if self.static:
+                cells &= np.any([distance >= 0 for distance, _ in self.static.values()], axis=0)
+
+            ys, xs = np.nonzero(cells)
+            self._pickup_cells = np.stack([xs, ys], axis=1)
+
+        return self._pickup_cells
+
+    def distance(self, cell, target):
+        """Shortest path length from cell to target around obstacles. -1 if the target cannot be reached."""
+        return int(self.field(target)[0][cell.y, cell.x])
+
+    def next_step(self, cell, target):
+        """The ActionSpace action that moves cell one step along a shortest path to target. NOOP when there is none."""
+        return int(self.field(target)[1][cell.y, cell.x])
@@ -1,11 +1,17 @@
-import time
 import numpy as np
 from deep_logistics.action_space import ActionSpace
 from deep_logistics.agent import ManhattanAgent, Agent
+from deep_logistics.clock import Clock
+from deep_logistics.congestion import CongestionMap
 from deep_logistics.delivery_points import DeliveryPointGenerator
+from deep_logistics.demand import DemandEngine
+from deep_logistics.distance_field import DistanceFieldCache
 from deep_logistics.graphics import PygameGraphics
 from deep_logistics.grid import Grid
+from deep_logistics.layout import Layout
 from deep_logistics.scheduler import OnDemandScheduler
+from deep_logistics.telemetry import Telemetry
+from deep_logistics.video import VideoSink
 
 from deep_logistics.agent_storage import AgentStore
 from deep_logistics.spawn_strategy import RandomSpawnStrategy, LocationSpawnStrategy
@@ -21,20 +27,39 @@ class Environment:
                  width,
                  depth,
                  ups=None,
+                 render_fps=None,
                  ticks_per_second=10,
                  taxi_n=1,
                  taxi_agent=ManhattanAgent,
                  taxi_respawn=False,
                  taxi_control="constant",
+                 simultaneous_moves=False,
                  scheduler=OnDemandScheduler,
+                 demand=None,
+                 demand_seed=None,
                  delivery_locations=None,
+                 obstacles=None,
                  spawn_strategy=LocationSpawnStrategy,
+                 layout_cache=None,
+                 telemetry=False,
+                 congestion=False,
+                 congestion_window=None,
+                 congestion_overlay=None,
                  graphics_render=False,
                  graphics_tile_width=32,
                  graphics_tile_height=32
                  ):
         super().__init__()
 
+        """Constructor arguments, used to rebuild the environment (See EpisodeReplayer)."""
+        self.config = {name: value for name, value in locals().items() if name not in ("self", "__class__")}
+
+        """EpisodeRecorder attached to the environment, if any."""
+        self.recorder = None
+
+        """VideoSink that rendered frames are written to (See record_video)."""
+        self.video = None
+
         self.width = width
         self.height = height
         self.depth = depth
@@ -42,9 +67,14 @@ class Environment:
         self.taxi_respawn = taxi_respawn
         self.taxi_control = taxi_control
 
+        """Resolve the moves of all agents at once instead of one agent at a time (See _update_simultaneous)."""
+        self.simultaneous_moves = simultaneous_moves
+
         """Updates per second."""
         self.ups = ups
-        self.ups_interval = 0 if self.ups is None else 1.0 / self.ups
+
+        """Clock for the update rate (unbounded when ups is None) and the decoupled render rate."""
+        self.clock = Clock(ups=ups, fps=render_fps)
 
         """Ticks per second."""
         self.tick_ps = ticks_per_second
@@ -54,11 +84,39 @@ class Environment:
         """The grid is the global internal state of all cells in the environment."""
         self.grid = Grid(width=width, height=height)
 
-        """Spawn-points is the location where agent can spawn."""
-        self.spawn_points = spawn_strategy(self, seed=12)
-
-        """Delivery points is a (TODO) static definition for where agents can deliver scheduled tasks."""
-        self.delivery_points = DeliveryPointGenerator(self, override=delivery_locations, seed=555)
+        """Congestion heatmap recorded by Grid.move, decayed over congestion_window ticks (See CongestionMap).
+        congestion_overlay is the layer drawn over the rendered frames."""
+        if congestion or congestion_overlay:
+            self.grid.congestion = CongestionMap(self.grid, window=congestion_window, tick_seconds=self.tick_ps_ratio)
+        self.congestion_overlay = congestion_overlay
+
+        """Shared layout. When layout_cache is set (True for the default directory, or a path), the static layout is
+        attached read-only from the cache instead of being generated for this environment."""
+        self.layout = None
+        if layout_cache:
+            self.layout = Layout.get(width=width, height=height, seed=555, delivery_locations=delivery_locations,
+                                     spawn_strategy=spawn_strategy, obstacles=obstacles,
+                                     cache_dir=None if layout_cache is True else layout_cache)
+            self.layout.apply(self.grid)
+            self.spawn_points = spawn_strategy(self, seed=12, override=self.layout.spawn_locations())
+            self.delivery_points = DeliveryPointGenerator(self, override=self.layout.delivery_locations(), seed=555)
+            self.distance_fields = self.layout.distance_fields(self.grid)
+        else:
+            """Static obstacles (walls and shelves). See Grid.load_obstacles for the layout format."""
+            if obstacles is not None:
+                self.grid.load_obstacles(obstacles)
+
+            """Spawn-points is the location where agent can spawn."""
+            self.spawn_points = spawn_strategy(self, seed=12)
+
+            """Delivery points is a (TODO) static definition for where agents can deliver scheduled tasks."""
+            self.delivery_points = DeliveryPointGenerator(self, override=delivery_locations, seed=555)
+
+            """BFS distance fields around the obstacles, precomputed for every delivery point."""
+            self.distance_fields = DistanceFieldCache(self.grid, targets=self.delivery_points.data)
+
+        """Order arrivals (An ArrivalProcess, see deep_logistics.demand). Used by BacklogScheduler."""
+        self.demand = None if demand is None else DemandEngine(self, demand, seed=demand_seed)
 
         """The scheduler is a engine for scheduling tasks to agents."""
         self.scheduler = scheduler(self)
@@ -85,6 +143,9 @@ class Environment:
                                        has_window=graphics_render
                                        )
 
+        """Order latency and fleet KPIs (See Telemetry). The previous episode is exported on reset."""
+        self.telemetry = Telemetry(self) if telemetry else None
+
         """Reset environment."""
         self.reset()
 
@@ -102,8 +163,32 @@ class Environment:
         return False
 
     def update(self):
+        if self.recorder is not None:
+            self.recorder.on_update()
+
         self.tick_ps_counter += 1
 
+        if self.demand is not None:
+            self.demand.update()
+
+        if self.simultaneous_moves:
+            self._update_simultaneous()
+        else:
+            self._update_sequential()
+
+        if self.telemetry is not None:
+            self.telemetry.update()
+
+        if self.grid.congestion is not None:
+            self.grid.congestion.tick()
+
+        if self.recorder is not None:
+            self.recorder.on_updated()
+
+        self.clock.tick()
+
+    def _update_sequential(self):
+
         """Process agent s."""
         for agent in self.agents:
 
@@ -116,10 +201,44 @@ class Environment:
             else:
                 agent.request_task()
 
-        if self.ups:
-            time.sleep(self.ups_interval)
+    def _update_simultaneous(self):
+        """
+        Order-independent update. All agents act on the same state, then every intended move is resolved in one
+        vectorized pass (Grid.resolve_moves) and the outcomes, including crashes, are applied together.
+        """
+        agents = list(self.agents)
+        for agent in agents:
+            agent.automate()
+
+        moves = [agent.intend_move() for agent in agents]
+
+        on_grid = [i for i, agent in enumerate(agents) if agent.cell is not None]
+        dx = np.zeros(len(on_grid), dtype=np.int64)
+        dy = np.zeros(len(on_grid), dtype=np.int64)
+        for j, i in enumerate(on_grid):
+            if moves[i] is not None:
+                dx[j], dy[j] = moves[i]
+
+        codes, crashed = self.grid.move_simultaneous([agents[i] for i in on_grid], dx, dy)
+
+        for j, i in enumerate(on_grid):
+            if moves[i] is not None:
+                agents[i].complete_move(codes[j])
+            elif crashed[j]:
+                """Run into while standing still."""
+                agents[i].crash()
+
+        for agent in agents:
+            """Evaluate task objective."""
+            if agent.task:
+                agent.task.evaluate()
+            else:
+                agent.request_task()
 
     def render(self):
+        if not self.clock.should_render():
+            return
+
         self.graphics.reset()
         for agent in self.agents:
             self.graphics.draw_agent(agent)
@@ -129,23 +248,51 @@ class Environment:
 
         self.graphics.blit()
 
+        if self.congestion_overlay:
+            self.graphics.draw_overlay(self.grid.congestion.normalized(self.congestion_overlay))
+
+        if self.video is not None and self.video.due():
+            self.video.write(self.graphics.frame())
+
+    def record_video(self, path, fps=30, stride=1, queue_size=64, block=False):
+        """
+        Write every stride-th rendered frame to a video file (MP4 or GIF, see VideoSink) until stop_video is called.
+        Frames are encoded in a background thread. Frames are only produced by render, which also works without a
+        window (graphics_render=False).
+        """
+        self.stop_video()
+        self.video = VideoSink(path, fps=fps, stride=stride, queue_size=queue_size, block=block)
+        return self.video
+
+    def stop_video(self):
+        """Finish the current video, if any, and return its VideoSink."""
+        video = self.video
+        if video is not None:
+            self.video = None
+            video.close()
+        return video
+
     def deploy_agents(self):
 
         """
         Deploy agent if there are any in the queue.
         :return:
         """
+        spawn_points = None
         for agent in self.agents:
             if agent.state != Agent.INACTIVE:
                 continue
 
-            spawn_points = self.spawn_points.get_available()
+            """Available spawn points are collected once. Taken points are removed as agents are deployed."""
+            if spawn_points is None:
+                spawn_points = self.spawn_points.get_available()
+
             if len(spawn_points) == 0:
                 """No available spawn points. """
                 raise RuntimeWarning("There is no available spawn points!")
                 continue
 
-            spawn_point = np.random.choice(spawn_points)
+            spawn_point = spawn_points.pop(np.random.randint(len(spawn_points)))
             agent.spawn(spawn_point)
 
     def task_assignment(self):
@@ -160,6 +307,15 @@ class Environment:
             self.scheduler.give_task(agent)
 
     def reset(self):
+        if self.recorder is not None:
+            self.recorder.on_reset()
+
+        if self.telemetry is not None and self.telemetry.ticks > 0:
+            self.telemetry.end_episode()
+
+        if self.demand is not None:
+            self.demand.reset()
+
         for agent in self.agents:
             agent.despawn()
         self.deploy_agents()
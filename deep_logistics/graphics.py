@@ -16,6 +16,7 @@ class PygameGraphics:
         self.changes_cells = []
         self.changes_rects = []
         self.has_window = has_window
+        self._overlay = None  # Surface of draw_overlay, allocated on first use
         self.rectangles = []
         for x in range(self.game_width):
             for y in range(self.game_height):
@@ -38,6 +39,8 @@ class PygameGraphics:
         self.SPRITE_PICKUP_POINT = self._init_sprite(self.bgr2rgb(cell_types.OrderPickup.COLOR), borders=True)
         self.SPRITE_SPAWN_POINT = self._init_sprite(self.bgr2rgb(cell_types.SpawnPoint.COLOR), borders=True)
         self.SPRITE_AGENT = self._init_sprite(self.bgr2rgb(cell_types.Agent.COLOR), borders=True)
+        self.SPRITE_WALL = self._init_sprite(self.bgr2rgb(cell_types.Wall.COLOR), borders=True)
+        self.SPRITE_SHELF = self._init_sprite(self.bgr2rgb(cell_types.Shelf.COLOR), borders=True)
 
         self._init_canvas()
 
@@ -58,6 +61,10 @@ class PygameGraphics:
                     self.draw_sprite(self.SPRITE_SPAWN_POINT, x=x, y=y, setup=True)
                 elif cell.type == cell_types.OrderDelivery:
                     self.draw_sprite(self.SPRITE_DELIVERY_POINT, x=x, y=y, setup=True)
+                elif cell.type == cell_types.Wall:
+                    self.draw_sprite(self.SPRITE_WALL, x=x, y=y, setup=True)
+                elif cell.type == cell_types.Shelf:
+                    self.draw_sprite(self.SPRITE_SHELF, x=x, y=y, setup=True)
 
 
         #if self.has_window:
@@ -100,6 +107,10 @@ class PygameGraphics:
                 self.canvas.blit(self.SPRITE_DELIVERY_POINT_ACTIVE, rect)
             elif cell.type == cell_types.OrderPickup:
                 self.canvas.blit(self.SPRITE_PICKUP_POINT, rect)
+            elif cell.type == cell_types.Wall:
+                self.canvas.blit(self.SPRITE_WALL, rect)
+            elif cell.type == cell_types.Shelf:
+                self.canvas.blit(self.SPRITE_SHELF, rect)
 
         if self.has_window:
             pygame.display.update(self.changes_rects)
@@ -107,6 +118,36 @@ class PygameGraphics:
         self.changes_rects.clear()
         self.changes_cells.clear()
 
+    def draw_overlay(self, heat, color=(255, 0, 0), alpha=0.6):
+        """
+        Blend a (height, width) array of values in [0, 1] over the canvas, e.g. CongestionMap.normalized().
+        The overlay lasts until the next blit, which repaints the cells the overlay covered (cells with zero heat are
+        left untouched, so they are not repainted).
+        """
+        opacity = (heat * alpha * 255).astype(np.uint8)
+        ys, xs = np.nonzero(opacity)
+        if len(xs) == 0:
+            return
+
+        if self._overlay is None:
+            self._overlay = pygame.Surface((self.canvas_shape[1], self.canvas_shape[0]), pygame.SRCALPHA)
+        self._overlay.fill(color)
+        pygame.surfarray.pixels_alpha(self._overlay)[:] = np.repeat(
+            np.repeat(opacity.T, self.cell_width, axis=0), self.cell_height, axis=1
+        )
+        self.canvas.blit(self._overlay, (0, 0))
+
+        if self.has_window:
+            pygame.display.flip()
+
+        cell = self.environment.grid.cell
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.on_cell_change(cell(x, y))
+
+    def frame(self):
+        """Copy of the canvas as a BGR uint8 (height, width, 3) array, the framebuffer layout of the HTTPRenderer."""
+        return np.ascontiguousarray(pygame.surfarray.pixels3d(self.canvas).transpose(1, 0, 2)[..., ::-1])
+
     def reset(self):
         if self.has_window:
             pygame.display.flip()
@@ -1,5 +1,6 @@
 import numpy as np
 
+from deep_logistics import cell_types
 from deep_logistics.cell import Cell
 
 
@@ -8,6 +9,12 @@ class Grid:
     MOVE_AGENT_COLLISION = 2
     MOVE_WALL_COLLISION = 3
 
+    """Symbols for obstacles in text layouts. Any other symbol is walkable."""
+    OBSTACLE_SYMBOLS = {
+        "#": cell_types.Wall,
+        "=": cell_types.Shelf
+    }
+
     def __init__(self, width, height):
         self.grid = np.ndarray(shape=(height, width), dtype=np.object)
         self.width = width
@@ -16,6 +23,14 @@ class Grid:
         for (y, x), index in np.ndenumerate(self.grid):
                 self.grid[y, x] = Cell(self, x=x, y=y)
 
+        """Static obstacle layer. True for cells that agents cannot enter."""
+        self.obstacles = np.zeros(shape=(height, width), dtype=np.bool_)
+        self.has_obstacles = False
+        self._shortest_paths = None
+
+        """Optional CongestionMap, recorded on every move."""
+        self.congestion = None
+
     def cell(self, x, y):
         return self.grid[y, x]
 
@@ -26,18 +41,159 @@ class Grid:
         return self.move(agent, agent.cell.x + x, agent.cell.y + y)
 
     def move(self, agent, x, y):
+        congestion = self.congestion
 
-        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+        if x < 0 or x >= self.width or y < 0 or y >= self.height or self.obstacles[y, x]:
+            if congestion is not None and agent.cell is not None:
+                congestion.collisions[agent.cell.y, agent.cell.x] += congestion.scale
             return Grid.MOVE_WALL_COLLISION
 
         cell = self.grid[y, x]
 
         if cell.occupant and cell.occupant != agent:
+            if congestion is not None:
+                congestion.collisions[y, x] += congestion.scale
             return Grid.MOVE_AGENT_COLLISION
         else:
+            if congestion is not None:
+                if cell.occupant is agent:
+                    congestion.wait[y, x] += congestion.wait_scale
+                else:
+                    congestion.visits[y, x] += congestion.scale
             agent.cell = cell
             cell.occupant = agent
             return Grid.MOVE_OK
 
+    def resolve_moves(self, x0, y0, x1, y1):
+        """
+        Resolve simultaneous moves of n agents from (x0, y0) to (x1, y1) without depending on the order of the agents.
+        Every agent sees the grid as it was before any of the moves:
+        - Moves off the grid or into an obstacle are wall collisions. The agent stays.
+        - Agents moving into the same cell, into the cell of an agent that stays, or swapping cells head-on collide.
+          The agents that are run into collide as well, and every colliding agent stays.
+        - Following an agent that moves away, and rotating along a cycle of cells, is allowed.
+        Blocked agents stay where they are, which can block the agents behind them, so conflicts are resolved in
+        vectorized passes until no more agents are blocked.
+        :return: (codes, crashed) where codes is an int8 array of MOVE_* codes and crashed is a bool array of the
+        agents that collided.
+        """
+        x0 = np.asarray(x0, dtype=np.int64)
+        y0 = np.asarray(y0, dtype=np.int64)
+        x1 = np.asarray(x1, dtype=np.int64)
+        y1 = np.asarray(y1, dtype=np.int64)
+        n = len(x0)
+
+        wall = (x1 < 0) | (x1 >= self.width) | (y1 < 0) | (y1 >= self.height)
+        inside = ~wall
+        wall[inside] = self.obstacles[y1[inside], x1[inside]]
+
+        src = y0 * self.width + x0
+        dst = np.where(wall, src, y1 * self.width + x1)
+
+        """Index of the agent in each cell before the moves, -1 for free cells."""
+        occupant = np.full(self.width * self.height, -1, dtype=np.int64)
+        occupant[src] = np.arange(n)
+
+        crashed = wall.copy()
+        while n > 0:
+            moving = dst != src
+
+            _, inverse, counts = np.unique(dst, return_inverse=True, return_counts=True)
+            conflict = counts[inverse] > 1
+
+            occ = occupant[dst]
+            entering = moving & (occ >= 0)
+            occ = np.where(entering, occ, 0)
+            hit_still = entering & ~moving[occ]
+            swap = entering & (dst[occ] == src)
+
+            blocked = moving & (conflict | hit_still | swap)
+            if not blocked.any():
+                break
+
+            crashed |= blocked | conflict
+            crashed[occ[blocked & hit_still]] = True
+            dst[blocked] = src[blocked]
+
+        codes = np.full(n, Grid.MOVE_OK, dtype=np.int8)
+        codes[crashed] = Grid.MOVE_AGENT_COLLISION
+        codes[wall] = Grid.MOVE_WALL_COLLISION
+        return codes, crashed
+
+    def move_simultaneous(self, agents, dx, dy):
+        """
+        Move all agents at once, see resolve_moves. Agents that collide are left in place, crashing them is up to the
+        caller (Agent.complete_move).
+        :param agents: Agents on the grid
+        :param dx: Relative x move per agent
+        :param dy: Relative y move per agent
+        :return: (codes, crashed) from resolve_moves
+        """
+        x0 = np.fromiter((agent.cell.x for agent in agents), dtype=np.int64, count=len(agents))
+        y0 = np.fromiter((agent.cell.y for agent in agents), dtype=np.int64, count=len(agents))
+        x1 = x0 + np.asarray(dx, dtype=np.int64)
+        y1 = y0 + np.asarray(dy, dtype=np.int64)
+
+        codes, crashed = self.resolve_moves(x0, y0, x1, y1)
+        if self.congestion is not None:
+            self.congestion.record(codes, x0, y0, x1, y1)
+        moved = np.nonzero((codes == Grid.MOVE_OK) & ((x1 != x0) | (y1 != y0)))[0]
+
+        """Vacate all source cells before entering the destinations, so agents can follow each other."""
+        for i in moved:
+            agents[i].cell = None
+        for i in moved:
+            cell = self.grid[y1[i], x1[i]]
+            agents[i].cell = cell
+            cell.occupant = agents[i]
+
+        return codes, crashed
+
     def has_occupant(self,x, y):
         return self.grid[y, x].occupant
+
+    def shortest_paths(self, cache_dir=None):
+        """All-pairs shortest path table over the walkable cells. Only for small grids (See ShortestPathTable)."""
+        if self._shortest_paths is None:
+            """Imported here, as the table shares its disk cache with Layout, which depends on Grid."""
+            from deep_logistics.shortest_paths import ShortestPathTable
+            self._shortest_paths = ShortestPathTable.get(~self.obstacles, cache_dir=cache_dir)
+        return self._shortest_paths
+
+    def distance(self, x0, y0, x1, y1):
+        """Exact travel distance in cells between two walkable cells, around obstacles."""
+        return self.shortest_paths().distance(x0, y0, x1, y1)
+
+    def is_walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and not self.obstacles[y, x]
+
+    def add_obstacle(self, x, y, cell_type=cell_types.Wall):
+        if cell_type not in cell_types.OBSTACLES:
+            raise ValueError("The cell type %s is not an obstacle." % cell_type.__name__)
+        cell = self.grid[y, x]
+        cell.type = cell_type
+        cell.original_type = cell_type
+        self.obstacles[y, x] = True
+        self.has_obstacles = True
+        self._shortest_paths = None
+
+    def load_obstacles(self, obstacles):
+        """
+        Load the static obstacle layer.
+        :param obstacles: Either a sequence of (x, y) wall coordinates, or a text layout given as a list of rows (or a
+        single newline separated string) where "#" is a wall and "=" is a shelf.
+        """
+        if isinstance(obstacles, str):
+            obstacles = obstacles.strip("\n").split("\n")
+
+        if len(obstacles) > 0 and isinstance(obstacles[0], str):
+            if len(obstacles) != self.height or any(len(row) != self.width for row in obstacles):
+                raise ValueError("The obstacle layout must be %sx%s (width x height)." % (self.width, self.height))
+
+            for y, row in enumerate(obstacles):
+                for x, symbol in enumerate(row):
+                    if symbol in Grid.OBSTACLE_SYMBOLS:
+                        self.add_obstacle(x, y, Grid.OBSTACLE_SYMBOLS[symbol])
+        else:
+            for x, y in obstacles:
+                self.add_obstacle(x, y)
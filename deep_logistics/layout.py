@@ -0,0 +1,178 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+from deep_logistics import cell_types
+from deep_logistics.delivery_points import DeliveryPointGenerator
+from deep_logistics.distance_field import DistanceFieldCache
+from deep_logistics.grid import Grid
+
+
+def default_cache_dir():
+    return os.environ.get("DEEP_LOGISTICS_CACHE", os.path.join(tempfile.gettempdir(), "deep_logistics"))
+
+
+def save_arrays(cache_dir, key, arrays):
+    """
+    Store a dict of arrays as .npy files in cache_dir/key. The directory is written under a temporary name and
+    renamed into place, so concurrent writers and readers never see a partial entry.
+    :return: Path of the entry
+    """
+    path = os.path.join(cache_dir, key)
+    if os.path.isdir(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".%s." % key, dir=cache_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), array)
+
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        """Another process stored the same entry first."""
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return path
+
+
+def load_arrays(path, names):
+    """Attach to the arrays of a stored entry as read-only memory maps."""
+    return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in names}
+
+
+class Layout:
+    """
+    Static layout of an environment: cell types, spawn cells, delivery cells and the distance fields derived from them.
+    A layout is built once per (width, height, seed, delivery_locations, spawn_strategy, obstacles) and stored as .npy
+    files in a cache directory. Every environment and process attaches to the same files read-only through mmap, so
+    the layout is only generated once and its memory is shared through the page cache.
+    """
+    VERSION = 1
+
+    """Cell type codes in the cell_types array."""
+    CELL_TYPES = [
+        cell_types.Empty,
+        cell_types.SpawnPoint,
+        cell_types.OrderDelivery,
+        cell_types.Wall,
+        cell_types.Shelf
+    ]
+
+    FILES = ["cell_types", "spawn", "delivery", "distances", "directions"]
+
+    """Layouts attached in this process, by key."""
+    _attached = {}
+
+    def __init__(self, key, cell_types, spawn, delivery, distances, directions):
+        """
+        :param key: Layout hash
+        :param cell_types: (height, width) uint8 array of indices into CELL_TYPES
+        :param spawn: (n_spawn, 2) int32 array of spawn point (x, y)
+        :param delivery: (n_delivery, 2) int32 array of delivery point (x, y)
+        :param distances: (n_delivery, height, width) int32 distance fields of the delivery points
+        :param directions: (n_delivery, height, width) int8 direction fields of the delivery points
+        """
+        self.key = key
+        self.cell_types = cell_types
+        self.spawn = spawn
+        self.delivery = delivery
+        self.distances = distances
+        self.directions = directions
+
+        self.height, self.width = cell_types.shape
+
+    @staticmethod
+    def hash(width, height, seed, delivery_locations, spawn_strategy, obstacles):
+        spawn_strategy_name = "%s.%s" % (spawn_strategy.__module__, spawn_strategy.__qualname__)
+        delivery_locations = None if delivery_locations is None else [tuple(x) for x in delivery_locations]
+        obstacles = None if obstacles is None else [x if isinstance(x, str) else tuple(x) for x in obstacles]
+        data = repr((Layout.VERSION, width, height, seed, delivery_locations, spawn_strategy_name, obstacles))
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def build(width, height, seed, delivery_locations, spawn_strategy, obstacles, key=None):
+        """Generate the layout in memory using the same generators as Environment."""
+        grid = Grid(width=width, height=height)
+        if obstacles is not None:
+            grid.load_obstacles(obstacles)
+
+        """Minimal environment for the spawn and delivery point generators."""
+        env = SimpleNamespace(width=width, height=height, grid=grid)
+        spawn_points = spawn_strategy(env, seed=12)
+        delivery_points = DeliveryPointGenerator(env, override=delivery_locations, seed=seed)
+
+        codes = {t: i for i, t in enumerate(Layout.CELL_TYPES)}
+        types = np.zeros(shape=(height, width), dtype=np.uint8)
+        for (y, x), cell in np.ndenumerate(grid.grid):
+            types[y, x] = codes[cell.original_type]
+
+        spawn = np.array([(cell.x, cell.y) for cell in spawn_points.data], dtype=np.int32).reshape(-1, 2)
+        delivery = np.array([(cell.x, cell.y) for cell in delivery_points.data], dtype=np.int32).reshape(-1, 2)
+
+        fields = DistanceFieldCache(grid, targets=delivery_points.data)
+        distances = np.zeros(shape=(len(delivery), height, width), dtype=np.int32)
+        directions = np.zeros(shape=(len(delivery), height, width), dtype=np.int8)
+        for i, (x, y) in enumerate(delivery):
+            distances[i], directions[i] = fields.static[(x, y)]
+
+        if key is None:
+            key = Layout.hash(width, height, seed, delivery_locations, spawn_strategy, obstacles)
+
+        return Layout(key, types, spawn, delivery, distances, directions)
+
+    def save(self, cache_dir):
+        return save_arrays(cache_dir, self.key, {name: getattr(self, name) for name in Layout.FILES})
+
+    @staticmethod
+    def load(path):
+        """Attach to a stored layout. The arrays are read-only memory maps."""
+        return Layout(key=os.path.basename(path), **load_arrays(path, Layout.FILES))
+
+    @staticmethod
+    def get(width, height, seed, delivery_locations, spawn_strategy, obstacles, cache_dir=None):
+        """Attach to the cached layout for these parameters. The layout is built and stored on the first request."""
+        key = Layout.hash(width, height, seed, delivery_locations, spawn_strategy, obstacles)
+        try:
+            return Layout._attached[key]
+        except KeyError:
+            pass
+
+        cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+        path = os.path.join(cache_dir, key)
+
+        if not os.path.isdir(path):
+            layout = Layout.build(width, height, seed, delivery_locations, spawn_strategy, obstacles, key=key)
+            path = layout.save(cache_dir)
+
+        layout = Layout.load(path)
+        Layout._attached[key] = layout
+        return layout
+
+    def apply(self, grid):
+        """Write the static cell types and obstacles of the layout into a fresh grid."""
+        for y, x in zip(*np.nonzero(self.cell_types)):
+            cell_type = Layout.CELL_TYPES[self.cell_types[y, x]]
+            if cell_type in cell_types.OBSTACLES:
+                grid.add_obstacle(x, y, cell_type)
+            else:
+                cell = grid.cell(x, y)
+                cell.type = cell_type
+                cell.original_type = cell_type
+
+    def spawn_locations(self):
+        return [(int(x), int(y)) for x, y in self.spawn]
+
+    def delivery_locations(self):
+        return [(int(x), int(y)) for x, y in self.delivery]
+
+    def distance_fields(self, grid):
+        """DistanceFieldCache for grid backed by the shared distance fields of the layout."""
+        fields = {
+            (int(x), int(y)): (self.distances[i], self.directions[i]) for i, (x, y) in enumerate(self.delivery)
+        }
+        return DistanceFieldCache(grid, fields=fields)
@@ -0,0 +1,173 @@
+import numpy as np
+
+from deep_logistics.environment import Environment
+from deep_logistics.reward_functions import RewardFunction
+
+
+class MultiAgentEnvironment:
+    """
+    Array-native multi-agent interface for the environment.
+    Actions are given as an int array of shape (n_agents, ) and observations, rewards and terminals are returned as
+    arrays in the same agent order as Environment.agents.
+    """
+
+    def __init__(self, env: Environment, state, reward, render=False, frame_skip=1, gamma=1.0):
+        """
+        :param env: The Environment instance to control.
+        :param state: State representation class. Must implement generate_batch(agents, out).
+        :param reward: A RewardFunction class, which is instantiated for this environment and evaluates all agents
+        in one call, or a per-agent function called as reward(agent) which returns (reward, terminal).
+        :param render: Render the environment after every step.
+        :param frame_skip: Number of environment updates per step. The actions are held for every update: the motion
+        model stops an agent whose action is not renewed, so they are applied again on the skipped updates, but
+        counted once in Agent.total_actions.
+        :param gamma: Discount applied to the rewards of consecutive updates within a step. 1.0 sums the rewards.
+        """
+        if frame_skip < 1:
+            raise ValueError("frame_skip must be at least 1.")
+
+        self.env = env
+        self.state_representation = state(self.env)
+        self._render = render
+        self.frame_skip = frame_skip
+        self.gamma = gamma
+
+        if isinstance(reward, type) and issubclass(reward, RewardFunction):
+            self.reward_function = reward(self.env)
+            self.vectorized_reward = True
+        else:
+            self.reward_function = reward
+            self.vectorized_reward = False
+
+        self.n_agents = len(self.env.agents)
+
+        self.rewards = np.zeros(shape=(self.n_agents, ), dtype=np.float64)
+        self.terminals = np.zeros(shape=(self.n_agents, ), dtype=np.bool_)
+        self.returns = np.zeros(shape=(self.n_agents, ), dtype=np.float64)
+
+        self.total_steps = 0
+
+    @property
+    def observation_shape(self):
+        return self.state_representation.generate_batch().shape[1:]
+
+    def act(self, actions, mask=None, repeat=False):
+        """
+        Apply actions to the agents without updating the environment.
+        :param actions: int array of shape (n_agents, )
+        :param mask: Optional bool array of shape (n_agents, ). Agents that are masked out do not act.
+        :param repeat: The actions repeat the ones of the previous update (See Agent.do_action)
+        """
+        agents = self.env.agents
+        if mask is None:
+            for agent, action in zip(agents, actions):
+                agent.do_action(action=action, repeat=repeat)
+        else:
+            for agent, action, active in zip(agents, actions, mask):
+                if active:
+                    agent.do_action(action=action, repeat=repeat)
+
+    def evaluate(self):
+        """Evaluate reward and terminal for all agents into the reward and terminal arrays."""
+        if self.vectorized_reward:
+            rewards, terminals = self.reward_function()
+            self.rewards[:] = rewards
+            self.terminals[:] = terminals
+            return self.rewards, self.terminals
+
+        rewards = self.rewards
+        terminals = self.terminals
+        for i, agent in enumerate(self.env.agents):
+            rewards[i], terminals[i] = self.reward_function(agent)
+        return rewards, terminals
+
+    def step(self, actions, mask=None):
+        """
+        Perform a single step for all agents. With frame_skip > 1 the actions are repeated for frame_skip updates and
+        the rewards are accumulated with discount gamma. The step ends early on the first update where any agent is
+        terminal. Observations are only generated, and the environment only rendered, after the last update.
+        The returned arrays are reused between steps. Copy them if they must outlive the next call to step().
+        :param actions: int array of shape (n_agents, )
+        :param mask: Optional bool array of shape (n_agents, ). Agents that are masked out do not act.
+        :return: observations (n_agents, F), rewards (n_agents, ), terminals (n_agents, ), info
+        """
+        self.total_steps += 1
+
+        returns = self.returns
+        returns[:] = 0
+        discount = 1.0
+        ticks = 0
+
+        while ticks < self.frame_skip:
+            ticks += 1
+
+            """Perform actions in environment."""
+            self.act(actions, mask=mask, repeat=ticks > 1)
+
+            """Update the environment"""
+            self.env.update()
+
+            """Evaluate score"""
+            rewards, terminals = self.evaluate()
+            returns += discount * rewards
+            discount *= self.gamma
+
+            if terminals.any():
+                break
+
+        if self._render:
+            self.env.render()
+
+        return self.state_representation.generate_batch(), returns, self.terminals, dict(ticks=ticks)
+
+    def reset(self):
+        self.env.reset()
+        self.total_steps = 0
+        self.rewards[:] = 0
+        self.returns[:] = 0
+        self.terminals[:] = False
+        if self.vectorized_reward:
+            self.reward_function.reset()
+        return self.state_representation.generate_batch()
+
+
+class DictAdapter:
+    """
+    Thin adapter between the array interface of MultiAgentEnvironment and the dict format used by RLlib,
+    where every agent is keyed by "agent_<index>".
+    """
+
+    def __init__(self, env: MultiAgentEnvironment, prefix="agent_"):
+        self.env = env
+        self.names = ["%s%s" % (prefix, i) for i in range(env.n_agents)]
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        self._actions = np.zeros(shape=(env.n_agents, ), dtype=np.int64)
+        self._mask = np.zeros(shape=(env.n_agents, ), dtype=np.bool_)
+
+    def step(self, action_dict):
+        actions = self._actions
+        mask = self._mask
+        mask[:] = False
+
+        indices = [self.index[agent_name] for agent_name in action_dict.keys()]
+        actions[indices] = list(action_dict.values())
+        mask[indices] = True
+
+        observations, rewards, terminals, info = self.env.step(actions, mask=mask)
+
+        state_dict = {}
+        reward_dict = {}
+        terminal_dict = {}
+        for agent_name, i in zip(action_dict.keys(), indices):
+            state_dict[agent_name] = observations[i].copy()
+            reward_dict[agent_name] = float(rewards[i])
+            terminal_dict[agent_name] = bool(terminals[i])
+
+        terminal_dict["__all__"] = bool(terminals[indices].any())
+
+        return state_dict, reward_dict, terminal_dict, {}
+
+    def reset(self):
+        observations = self.env.reset()
+        return {agent_name: observations[i].copy() for i, agent_name in enumerate(self.names)}
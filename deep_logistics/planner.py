@@ -0,0 +1,380 @@
+import heapq
+from collections import deque
+
+from deep_logistics.action_space import ActionSpace
+from deep_logistics.agent import Agent
+
+
+class ReservationPlanner:
+    """
+    Prioritized multi-agent path planner with a space-time reservation table.
+
+    Time is measured in plan steps, where one step is one cell move. Every agent reserves a path of cells for
+    consecutive steps, followed by dwell steps on its last cell. Paths are found with space-time A* in the order agents
+    ask for them, so agents that planned earlier have priority. A cell may not be used by another agent one step before,
+    during or one step after a reservation, which rules out vertex, swap and follow conflicts. Agents move
+    asynchronously within a step, so the follow rule is what keeps the sequential Grid.move free of collisions.
+
+    Steps are synchronized with a barrier: the planner only advances to the next step when every agent has reached its
+    cell for the current step. Replanning is incremental: only agents whose target changed, whose reservations run out
+    or who drifted from their plan are replanned, with at most max_plans_per_step searches per step. Agents over the
+    budget hold their cell instead. An agent that has to hold a cell that others planned to pass through later bumps
+    them, so they replan around it.
+    """
+
+    def __init__(self, env, max_plans_per_step=64, max_expansions=5000, dwell=3, clearance=2, stall_ticks=None):
+        """
+        :param env: Environment
+        :param max_plans_per_step: Maximum number of A* searches per plan step
+        :param max_expansions: Maximum number of nodes expanded by one search
+        :param dwell: Number of steps an agent reserves its last cell for, after the path
+        :param clearance: Partial paths do not end within this distance of the target, which keeps the cells around
+        busy targets free for the agents leaving them
+        :param stall_ticks: Ticks to wait on the barrier before agents that did not reach their cell are replanned
+        """
+        self.env = env
+        self.grid = env.grid
+        self.max_plans_per_step = max_plans_per_step
+        self.max_expansions = max_expansions
+        self.dwell = max(2, dwell)
+        self.clearance = clearance
+        self.stall_ticks = 4 * env.tick_ps + 4 if stall_ticks is None else stall_ticks
+
+        self.t = 0  # Current plan step
+        self._tick = None  # Environment tick of the last update
+        self._stalled = 0  # Ticks spent waiting on the barrier
+
+        """(x, y, t) => agent id"""
+        self.reservations = {}
+
+        self.plans = {}  # agent id => (start step, [(x, y), ...])
+        self.ends = {}  # agent id => last reserved step
+        self.keys = {}  # agent id => reserved (x, y, t) keys
+        self.targets = {}  # agent id => target (x, y) of the current plan
+
+        self.queue = deque()
+        self.queued = set()
+
+        self.agents = []
+        self.by_id = {}
+
+        """Statistics."""
+        self.total_plans = 0
+        self.total_failures = 0
+        self.total_partial = 0
+        self.total_holds = 0
+        self.total_bumps = 0
+        self.total_expansions = 0
+
+    def register(self, agent):
+        self.agents.append(agent)
+        self.by_id[agent.id] = agent
+
+    def position(self, agent_id, t):
+        """Planned cell of the agent at step t."""
+        start, path = self.plans[agent_id]
+        return path[min(max(t - start, 0), len(path) - 1)]
+
+    def automate(self, agent):
+        """Returns the action that moves the agent towards its cell for the next step."""
+        if self._tick != self.env.tick_ps_counter:
+            self._tick = self.env.tick_ps_counter
+            self.update()
+
+        if agent.cell is None or agent.id not in self.plans:
+            return ActionSpace.NOOP
+
+        x, y = self.position(agent.id, self.t + 1)
+        dx = x - agent.cell.x
+        dy = y - agent.cell.y
+        if dx < 0:
+            return ActionSpace.LEFT
+        elif dx > 0:
+            return ActionSpace.RIGHT
+        elif dy < 0:
+            return ActionSpace.UP
+        elif dy > 0:
+            return ActionSpace.DOWN
+        return ActionSpace.NOOP
+
+    def update(self):
+        """Called once per environment tick. Advances the plan step when all agents reached their next cell."""
+        t = self.t
+        for agent in self.agents:
+            cell = agent.cell
+            if cell is None or agent.id not in self.plans:
+                continue
+            if (cell.x, cell.y) != self.position(agent.id, t + 1):
+                self._stalled += 1
+                if self._stalled < self.stall_ticks:
+                    return
+                break
+
+        self._stalled = 0
+        self.t = t + 1
+        self._step()
+
+    def _step(self):
+        """Synchronize the table with the agents and replan the agents that need it."""
+        t = self.t
+        lost = []
+        expiring = []
+        for agent in self.agents:
+            a = agent.id
+            cell = agent.cell
+
+            if cell is None:
+                """Destroyed or inactive agents do not hold reservations."""
+                if a in self.plans:
+                    self._release(a)
+                continue
+
+            if a not in self.plans or self.position(a, t) != (cell.x, cell.y):
+                """New, respawned or drifted agent. Its cell is reserved before anyone plans."""
+                self._release(a)
+                self._reserve(a, [(cell.x, cell.y)], t, None)
+                lost.append(agent)
+            elif self.ends[a] <= t + 1:
+                expiring.append(agent)
+            elif self._target(agent) != self.targets[a]:
+                self._enqueue(a)
+
+        """Others may have planned through the cells of lost agents."""
+        for agent in lost:
+            self._hold(agent)
+            expiring.append(agent)
+
+        budget = self.max_plans_per_step
+
+        """Agents whose reservations run out must get a new plan, or hold their cell, now."""
+        for agent in expiring:
+            if budget > 0 and self._target(agent) is not None:
+                budget -= 1
+                self._plan(agent)
+            else:
+                self._hold(agent)
+
+        while self.queue and budget > 0:
+            a = self.queue.popleft()
+            self.queued.discard(a)
+            agent = self.by_id[a]
+            if agent.cell is None or self.targets.get(a, None) == self._target(agent):
+                continue
+            budget -= 1
+            self._plan(agent)
+
+    @staticmethod
+    def _target(agent):
+        target = agent.task.get_coordinates() if agent.task else None
+        return None if target is None else (target.x, target.y)
+
+    def _enqueue(self, a):
+        if a not in self.queued:
+            self.queued.add(a)
+            self.queue.append(a)
+
+    def _release(self, a):
+        reservations = self.reservations
+        for key in self.keys.pop(a, ()):
+            if reservations.get(key) == a:
+                del reservations[key]
+        self.plans.pop(a, None)
+        self.ends.pop(a, None)
+        self.targets.pop(a, None)
+
+    def _reserve(self, a, path, start, target):
+        """Reserve path from step start, followed by dwell steps on the last cell."""
+        keys = []
+        for i, (x, y) in enumerate(path):
+            key = (x, y, start + i)
+            self.reservations[key] = a
+            keys.append(key)
+
+        x, y = path[-1]
+        end = start + len(path) - 1
+        for t in range(end + 1, end + 1 + self.dwell):
+            key = (x, y, t)
+            self.reservations[key] = a
+            keys.append(key)
+
+        self.keys[a] = keys
+        self.plans[a] = (start, path)
+        self.ends[a] = end + self.dwell
+        self.targets[a] = target
+
+    def _is_free(self, a, x, y, t):
+        reservations = self.reservations
+        for key in ((x, y, t - 1), (x, y, t), (x, y, t + 1)):
+            other = reservations.get(key)
+            if other is not None and other != a:
+                return False
+        return True
+
+    def _can_dwell(self, a, x, y, t):
+        for s in range(t, t + self.dwell + 1):
+            if not self._is_free(a, x, y, s):
+                return False
+        return True
+
+    def _hold(self, agent):
+        """
+        Keep the agent on its cell for the next dwell steps. Agents that planned to use the cell in that window are
+        bumped: their plans are dropped and they replan from where they are.
+        """
+        a = agent.id
+        t = self.t
+        x, y = agent.cell.x, agent.cell.y
+        target = self.targets.get(a, None) if a in self.plans and self.position(a, t) == (x, y) else None
+
+        self._release(a)
+        self.total_holds += 1
+
+        bumped = set()
+        for s in range(t - 1, t + self.dwell + 2):
+            other = self.reservations.get((x, y, s))
+            if other is not None and other != a:
+                bumped.add(other)
+
+        """Bumped agents replan one at a time, the others keep their reservations meanwhile."""
+        self._reserve(a, [(x, y)], t, target)
+        for other in bumped:
+            self.total_bumps += 1
+            self._plan(self.by_id[other])
+
+    def _heuristic(self, target):
+        """Exact static distance when the target has a precomputed distance field, otherwise manhattan distance."""
+        tx, ty = target
+        field = self.env.distance_fields.static.get(target)
+        if field is not None:
+            distance = field[0]
+            return lambda x, y: int(distance[y, x]) if distance[y, x] >= 0 else None
+        return lambda x, y: abs(x - tx) + abs(y - ty)
+
+    def _plan(self, agent):
+        """Plan a path from the agent's cell to its target. The agent holds its cell when no path was found."""
+        a = agent.id
+        t = self.t
+        start = (agent.cell.x, agent.cell.y)
+        target = self._target(agent)
+
+        self._release(a)
+        self.total_plans += 1
+
+        if target is None or target == start:
+            path = [start] if self._can_dwell(a, start[0], start[1], t) else None
+        else:
+            path = self._search(a, start, target, t)
+
+        if path is None:
+            self.total_failures += 1
+            """Retried when the hold runs out."""
+            self._hold(agent)
+            return False
+
+        self._reserve(a, path, t, target)
+        return True
+
+    def _search(self, a, start, target, t0):
+        """
+        Space-time A* from start at step t0 to target, avoiding the reservations of other agents. The search is
+        bounded to a few times the heuristic distance. When the target cannot be reached within the bound (usually
+        because other agents occupy it), the path to the expanded cell closest to the target where the agent can wait,
+        outside the clearance, is returned instead, so the agent keeps closing in and replans from there.
+        """
+        heuristic = self._heuristic(target)
+        h0 = heuristic(*start)
+        if h0 is None:
+            return None
+
+        width = self.grid.width
+        height = self.grid.height
+        obstacles = self.grid.obstacles
+        reservations = self.reservations
+        horizon = t0 + 2 * h0 + 32
+        max_expansions = min(self.max_expansions, 4 * h0 + 256)
+
+        origin = (start[0], start[1], t0)
+        came_from = {origin: None}
+        frontier = [(h0, 0, origin)]
+        expansions = 0
+        closest = None
+        closest_h = h0
+
+        while frontier:
+            """Depths are pushed negated, so ties are broken towards deeper nodes."""
+            _, neg_g, node = heapq.heappop(frontier)
+            g = -neg_g
+            x, y, t = node
+            h = heuristic(x, y)
+
+            if h < closest_h and (h == 0 or h > self.clearance) and self._can_dwell(a, x, y, t):
+                closest = node
+                closest_h = h
+                if h == 0:
+                    break
+
+            expansions += 1
+            if expansions > max_expansions:
+                break
+            if t >= horizon:
+                continue
+
+            nt = t + 1
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1), (x, y)):
+                if nx < 0 or nx >= width or ny < 0 or ny >= height or obstacles[ny, nx]:
+                    continue
+                child = (nx, ny, nt)
+                if child in came_from:
+                    continue
+                """Inlined _is_free."""
+                other = reservations.get((nx, ny, t), a)
+                if other == a:
+                    other = reservations.get(child, a)
+                if other == a:
+                    other = reservations.get((nx, ny, nt + 1), a)
+                if other != a:
+                    continue
+                h = heuristic(nx, ny)
+                if h is None:
+                    continue
+                came_from[child] = node
+                heapq.heappush(frontier, (g + 1 + h, -(g + 1), child))
+
+        self.total_expansions += expansions
+        if closest is None:
+            return None
+
+        if heuristic(closest[0], closest[1]) > 0:
+            self.total_partial += 1
+
+        path = []
+        node = closest
+        while node is not None:
+            path.append(node[:2])
+            node = came_from[node]
+        path.reverse()
+        return path
+
+
+class ReservationAgent(Agent):
+    """
+    Scripted agent driven by the ReservationPlanner of its environment. All ReservationAgents of an environment share
+    one planner, which keeps them free of collisions with each other.
+    Requires taxi_control="constant", where an agent can change direction on every tick.
+    """
+
+    def __init__(self, env):
+        super().__init__(env)
+        if self.environment.taxi_control != "constant":
+            raise NotImplementedError("ReservationAgent requires taxi_control='constant'.")
+
+        if getattr(env, "planner", None) is None:
+            env.planner = ReservationPlanner(env)
+        self.planner = env.planner
+        self.planner.register(self)
+
+    def automate(self, perform_action=True):
+        action = self.planner.automate(self)
+        if perform_action:
+            self.do_action(action)
+        return action
@@ -0,0 +1,384 @@
+import io
+import pickle
+import random
+import struct
+import zlib
+
+import numpy as np
+
+from deep_logistics.agent import Agent
+from deep_logistics.cell import Cell
+from deep_logistics.environment import Environment
+from deep_logistics.scheduler import Order
+
+"""
+Episode file format. An append-only sequence of records, each a RECORD header (kind, payload length, tick, count)
+followed by a zlib compressed payload. Every record is flushed when written, so the file of a crashed process stays
+readable up to its last complete record.
+- HEADER: Pickled dict with the seed and the Environment config.
+- KEYFRAME: Pickled mutable environment state after tick updates (See EpisodeRecorder.keyframe).
+- ACTIONS: Actions of the count ticks starting at tick. An int8 (count, n_agents) array of actions (-1 for agents
+  without an action) followed by a bool (count, ) array of resets.
+Headers and keyframes are pickles, and unpickling can execute arbitrary code. Only replay episode files from trusted
+sources.
+"""
+MAGIC = b"DLEPISODE1"
+RECORD = struct.Struct("<BIqI")
+
+HEADER = 0
+KEYFRAME = 1
+ACTIONS = 2
+
+"""
+Environment attributes that are not simulation state, or that do not change after the environment is built. They
+belong to the environment that loads a keyframe. The mutable state of the grid (occupants, order cell types and the
+congestion counters) is stored separately (See _grid_state).
+"""
+STATIC_ATTRIBUTES = ["config", "recorder", "video", "clock", "graphics", "layout", "distance_fields", "action_space",
+                     "grid", "spawn_points", "delivery_points"]
+
+
+def _static_objects(environment):
+    """Objects that are referenced by the state but are not stored in keyframes, by name."""
+    objects = {name: getattr(environment, name) for name in STATIC_ATTRIBUTES}
+    objects["environment"] = environment
+    objects["shortest_paths"] = environment.grid._shortest_paths
+    return {name: obj for name, obj in objects.items() if obj is not None}
+
+
+def _grid_state(grid):
+    """
+    Mutable state of the grid: the cells whose type differs from their original type (order pickups and active
+    deliveries) and the congestion counters. Occupants are restored from the cells of the agents.
+    """
+    changed = [(cell.x, cell.y, cell.type, cell.order_type) for cell in grid.grid.flat
+               if cell.type is not cell.original_type or cell.order_type is not None]
+    return dict(cells=changed, congestion=grid.congestion)
+
+
+def _load_grid_state(grid, state, agents):
+    for cell in grid.grid.flat:
+        cell.type = cell.original_type
+        cell.order_type = None
+        cell._occupant = None
+
+    for x, y, cell_type, order_type in state["cells"]:
+        cell = grid.cell(x, y)
+        cell.type = cell_type
+        cell.order_type = order_type
+
+    for agent in agents:
+        if agent._cell is not None:
+            agent._cell._occupant = agent
+
+    grid.congestion = state["congestion"]
+
+
+class _StatePickler(pickle.Pickler):
+
+    def __init__(self, file, environment):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.grid = environment.grid
+        self.static = {id(obj): name for name, obj in _static_objects(environment).items()}
+
+    def persistent_id(self, obj):
+        if type(obj) is Cell and obj.grid is self.grid:
+            """Cells are referenced by position, e.g. by agents and spawn points."""
+            return obj.x, obj.y
+        return self.static.get(id(obj))
+
+
+class _StateUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, environment):
+        super().__init__(file)
+        self.grid = environment.grid
+        self.static = _static_objects(environment)
+
+    def persistent_load(self, pid):
+        if isinstance(pid, tuple):
+            return self.grid.cell(*pid)
+        return self.static.get(pid)
+
+
+class EpisodeRecorder:
+    """
+    Records an episode of an Environment into a compact binary file (See EpisodeReplayer).
+    Only the seed, the environment config and the actions given to the agents from outside Environment.update
+    (Agent.do_action) are logged for every tick. Everything else follows deterministically and is reproduced by
+    re-simulation, with a keyframe of the mutable environment state every keyframe_interval ticks to seek from. The
+    static parts (grid layout, spawn and delivery points, distance fields) are rebuilt from the config instead.
+    Actions are logged per tick as one int8 per agent; when an agent is given several actions between two updates, the
+    last one is kept. Resets (Environment.reset) are logged as well.
+    The random and numpy.random global generators are part of the recorded state, so controllers that give the actions
+    must use generators of their own for the episode to replay.
+    """
+
+    def __init__(self, environment, path, seed=None, keyframe_interval=1000, chunk=1000, level=6):
+        """
+        :param environment: Environment to record. Must not have been updated by anything but the recorder's caller.
+        :param path: Episode file. Overwritten.
+        :param seed: Seed for the random and numpy.random global generators, set before the first keyframe
+        :param keyframe_interval: Ticks between keyframes. Seeking re-simulates at most this many ticks.
+        :param chunk: Ticks of actions buffered before they are written
+        :param level: zlib compression level
+        """
+        if environment.recorder is not None:
+            raise RuntimeError("The environment is already being recorded.")
+
+        self.environment = environment
+        self.path = path
+        self.seed = seed
+        self.keyframe_interval = keyframe_interval
+        self.chunk = chunk
+        self.level = level
+
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self._write(HEADER, 0, pickle.dumps(dict(seed=seed, config=environment.config), pickle.HIGHEST_PROTOCOL))
+
+        """Recorded ticks, i.e. calls to Environment.update."""
+        self.ticks = 0
+        self.capturing = True
+        self._index = {}
+        self._pending = np.full(len(environment.agents), -1, dtype=np.int8)
+        self._pending_reset = False
+        self._actions = []
+        self._resets = []
+
+        self.keyframe()
+        environment.recorder = self
+
+    def _write(self, kind, tick, payload, count=0):
+        payload = zlib.compress(payload, self.level)
+        self.file.write(RECORD.pack(kind, len(payload), tick, count))
+        self.file.write(payload)
+        self.file.flush()
+
+    def keyframe(self):
+        """
+        Write the mutable environment state: the agents (cells, states and tasks), the pending orders of the scheduler
+        or demand engine, the grid state (See _grid_state), the telemetry and the random generators. Seeking starts
+        from the closest keyframe before the target tick.
+        """
+        self._flush_actions()
+
+        environment = self.environment
+        state = {name: value for name, value in environment.__dict__.items() if name not in STATIC_ATTRIBUTES}
+
+        buffer = io.BytesIO()
+        _StatePickler(buffer, environment).dump(dict(
+            state=state,
+            grid=_grid_state(environment.grid),
+            agent_id=Agent.id,
+            order_id=Order.id,
+            random=random.getstate(),
+            numpy=np.random.get_state()
+        ))
+        self._write(KEYFRAME, self.ticks, buffer.getvalue())
+
+    def _flush_actions(self):
+        if not self._actions:
+            return
+
+        n_agents = max(len(row) for row in self._actions)
+        actions = np.full((len(self._actions), n_agents), -1, dtype=np.int8)
+        for i, row in enumerate(self._actions):
+            actions[i, :len(row)] = row
+        resets = np.array(self._resets, dtype=np.bool_)
+
+        self._write(ACTIONS, self.ticks - len(self._actions), actions.tobytes() + resets.tobytes(), count=len(resets))
+        self._actions = []
+        self._resets = []
+
+    def on_action(self, agent, action):
+        """Called by Agent.do_action."""
+        if not self.capturing:
+            """Actions taken inside Environment.update (Agent.automate) are reproduced by the update itself."""
+            return
+
+        i = self._index.get(agent.id)
+        if i is None:
+            self._index = {a.id: j for j, a in enumerate(self.environment.agents)}
+            i = self._index[agent.id]
+        if i >= len(self._pending):
+            self._pending = np.concatenate([self._pending, np.full(i + 1 - len(self._pending), -1, dtype=np.int8)])
+        self._pending[i] = action
+
+    def on_reset(self):
+        """Called by Environment.reset. Actions given before the reset are cleared by it (Agent.despawn)."""
+        self._pending[:] = -1
+        self._pending_reset = True
+
+    def on_update(self):
+        """Called by Environment.update before the agents are updated."""
+        self.capturing = False
+        self._actions.append(self._pending.copy())
+        self._resets.append(self._pending_reset)
+        self._pending[:] = -1
+        self._pending_reset = False
+
+    def on_updated(self):
+        """Called by Environment.update after the agents are updated."""
+        self.ticks += 1
+        self.capturing = True
+
+        if self.ticks % self.keyframe_interval == 0:
+            self.keyframe()
+        elif len(self._actions) >= self.chunk:
+            self._flush_actions()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._flush_actions()
+        self.file.close()
+        self.environment.recorder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class EpisodeReplayer:
+    """
+    Reconstructs any tick of an episode recorded by EpisodeRecorder, by loading the closest keyframe before the tick
+    and re-simulating the recorded actions from there. The replay runs in a new Environment built from the recorded
+    config, unbounded and without a window unless overridden. Loading a keyframe sets the random and numpy.random
+    global generators.
+    Episode files are unpickled, so only replay files from trusted sources (See the module docstring).
+    """
+
+    def __init__(self, path, **overrides):
+        """
+        :param path: Episode file
+        :param overrides: Environment arguments that replace the recorded config, e.g. graphics_render=True
+        """
+        self.path = path
+        self.keyframes = []  # (tick, offset)
+        self.chunks = []  # (first tick, n_ticks, offset)
+
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not an episode file." % path)
+
+            size = file.seek(0, io.SEEK_END)
+            offset = file.seek(len(MAGIC))
+            header = None
+            while offset + RECORD.size <= size:
+                kind, length, tick, count = RECORD.unpack(file.read(RECORD.size))
+                if offset + RECORD.size + length > size:
+                    """Truncated record, written by a process that did not finish."""
+                    break
+
+                if kind == HEADER:
+                    header = pickle.loads(zlib.decompress(file.read(length)))
+                elif kind == KEYFRAME:
+                    self.keyframes.append((tick, offset))
+                elif kind == ACTIONS:
+                    self.chunks.append((tick, count, offset))
+
+                offset = file.seek(offset + RECORD.size + length)
+
+        if header is None or not self.keyframes:
+            raise ValueError("%s does not contain a complete episode header." % path)
+
+        self.seed = header["seed"]
+        self.config = dict(header["config"])
+        self.config.update(dict(ups=None, render_fps=None, graphics_render=False))
+        self.config.update(overrides)
+
+        """Number of recorded ticks."""
+        self.ticks = max(
+            [tick for tick, _ in self.keyframes] + [tick + n_ticks for tick, n_ticks, _ in self.chunks]
+        )
+
+        self.environment = Environment(**self.config)
+        self.tick = None
+        self._chunk = None
+        self.seek(0)
+
+    def _read(self, offset):
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            _, length, _, count = RECORD.unpack(file.read(RECORD.size))
+            return zlib.decompress(file.read(length)), count
+
+    def _load_keyframe(self, offset):
+        environment = self.environment
+        keyframe = _StateUnpickler(io.BytesIO(self._read(offset)[0]), environment).load()
+
+        environment.__dict__.update(keyframe["state"])
+        _load_grid_state(environment.grid, keyframe["grid"], environment.agents)
+        Agent.id = keyframe["agent_id"]
+        Order.id = keyframe["order_id"]
+        random.setstate(keyframe["random"])
+        np.random.set_state(keyframe["numpy"])
+
+        """Repaint everything on the next render."""
+        for cell in environment.grid.grid.flat:
+            environment.graphics.on_cell_change(cell)
+
+    def _actions(self, tick):
+        """(actions, reset) of a tick."""
+        if self._chunk is None or not self._chunk[0] <= tick < self._chunk[0] + len(self._chunk[1]):
+            for first, n_ticks, offset in self.chunks:
+                if first <= tick < first + n_ticks:
+                    payload, n_ticks = self._read(offset)
+                    actions = np.frombuffer(payload[:-n_ticks], dtype=np.int8).reshape(n_ticks, -1)
+                    resets = np.frombuffer(payload[-n_ticks:], dtype=np.bool_)
+                    self._chunk = (first, actions, resets)
+                    break
+            else:
+                raise ValueError("Tick %s is not in the episode (%s ticks)." % (tick, self.ticks))
+
+        first, actions, resets = self._chunk
+        return actions[tick - first], resets[tick - first]
+
+    def _reset_if_recorded(self):
+        """Apply a reset that was recorded between the current tick and the next."""
+        if self.tick < self.ticks and self._actions(self.tick)[1]:
+            self.environment.reset()
+
+    def step(self):
+        """Re-simulate the next tick."""
+        if self.tick >= self.ticks:
+            raise ValueError("The episode ends at tick %s." % self.ticks)
+
+        actions, _ = self._actions(self.tick)
+        environment = self.environment
+        for i in np.nonzero(actions >= 0)[0]:
+            environment.agents[i].do_action(int(actions[i]))
+        environment.update()
+
+        self.tick += 1
+        self._reset_if_recorded()
+        return environment
+
+    def seek(self, tick):
+        """
+        Reconstruct the environment after tick updates, as it was before the actions of the next tick were given.
+        :return: Environment
+        """
+        if not 0 <= tick <= self.ticks:
+            raise ValueError("Tick %s is not in the episode (%s ticks)." % (tick, self.ticks))
+
+        keyframe_tick, offset = max((k for k in self.keyframes if k[0] <= tick), key=lambda k: k[0])
+        if self.tick is None or not keyframe_tick <= self.tick <= tick:
+            """Continue from the current tick instead when it lies between the keyframe and the target."""
+            self._load_keyframe(offset)
+            self.tick = keyframe_tick
+            self._reset_if_recorded()
+
+        while self.tick < tick:
+            self.step()
+        return self.environment
+
+    def __len__(self):
+        return self.ticks
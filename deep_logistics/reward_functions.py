@@ -0,0 +1,109 @@
+import numpy as np
+
+from deep_logistics.agent import Agent
+from deep_logistics.agent_storage import AgentStore
+
+
+class RewardFunction:
+    """
+    Vectorized reward function. Computes reward and terminal for all agents in a single call from the state codes
+    and positions of the agents (See AgentStore.gather). Per-agent shaping state is kept in arrays on the instance,
+    so every environment owns its own reward state.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.n_agents = len(self.env.agents)
+
+        self.rewards = np.zeros(shape=(self.n_agents, ), dtype=np.float64)
+        self.terminals = np.zeros(shape=(self.n_agents, ), dtype=np.bool_)
+        self._raw = np.zeros(shape=(self.n_agents, AgentStore.N_COLUMNS), dtype=np.int64)
+
+    def __call__(self):
+        raw = self.env.agents.gather(out=self._raw)
+        return self.compute(raw)
+
+    def compute(self, raw):
+        """
+        :param raw: (n_agents, AgentStore.N_COLUMNS) int array from AgentStore.gather
+        :return: rewards (n_agents, ), terminals (n_agents, )
+        """
+        raise NotImplementedError("reward.*compute()* must be implemented.")
+
+    def reset(self):
+        """Reset per-agent reward state. Called when the environment is reset."""
+        self.rewards[:] = 0
+        self.terminals[:] = False
+
+
+class Reward0(RewardFunction):
+    """Vectorized version of experiments.experiment_3.reward_functions.Reward0."""
+
+    REWARDS = {
+        Agent.IDLE: -0.00001,
+        Agent.MOVING: 0.00001,
+        Agent.PICKUP: 1,
+        Agent.DELIVERY: 5,
+        Agent.DESTROYED: -10,
+        Agent.INACTIVE: 0
+    }
+
+    TERMINALS = {
+        Agent.IDLE: False,
+        Agent.MOVING: False,
+        Agent.PICKUP: False,
+        Agent.DELIVERY: False,
+        Agent.DESTROYED: True,
+        Agent.INACTIVE: True
+    }
+
+    def __init__(self, env):
+        super().__init__(env)
+
+        """Lookup tables indexed by the agent state code."""
+        self.reward_table = np.zeros(shape=(len(Agent.ALL_STATES), ), dtype=np.float64)
+        self.terminal_table = np.zeros(shape=(len(Agent.ALL_STATES), ), dtype=np.bool_)
+        for state in Agent.ALL_STATES:
+            self.reward_table[state] = Reward0.REWARDS[state]
+            self.terminal_table[state] = Reward0.TERMINALS[state]
+
+    def compute(self, raw):
+        states = raw[:, AgentStore.STATE]
+        np.take(self.reward_table, states, out=self.rewards)
+        np.take(self.terminal_table, states, out=self.terminals)
+        return self.rewards, self.terminals
+
+
+class DistanceCloser(RewardFunction):
+    """
+    Vectorized version of the shaping in experiments.experiment_3.reward_functions.RewardState.update.
+    Yields a reward of 1 when the manhattan distance to the current target decreased since the last call, else 0.
+    Never terminal.
+    """
+
+    def __init__(self, env):
+        super().__init__(env)
+        self.last_position = np.zeros(shape=(self.n_agents, 2), dtype=np.int64)
+        self.has_last = np.zeros(shape=(self.n_agents, ), dtype=np.bool_)
+
+    def compute(self, raw):
+        has_cell = raw[:, AgentStore.HAS_CELL] == 1
+        has_task = raw[:, AgentStore.HAS_TASK] == 1
+        position = raw[:, AgentStore.X:AgentStore.Y + 1]
+        target = raw[:, AgentStore.TARGET_X:AgentStore.TARGET_Y + 1]
+
+        distance = np.abs(position - target).sum(axis=1)
+        distance_old = np.abs(self.last_position - target).sum(axis=1)
+
+        closer = has_cell & has_task & self.has_last & (distance < distance_old)
+        self.rewards[:] = closer
+
+        """Agents without a cell (destroyed or inactive) start over when they spawn again."""
+        self.last_position[:] = position
+        self.has_last[:] = has_cell
+
+        return self.rewards, self.terminals
+
+    def reset(self):
+        super().reset()
+        self.has_last[:] = False
@@ -1,19 +1,34 @@
 import abc
 import random
-import uuid
 from collections import namedtuple
 
 from deep_logistics import cell_types
 from deep_logistics.agent import Agent
 
 
+"""Module level, so orders can be pickled (See EpisodeRecorder)."""
+Coordinate = namedtuple("Coordinate", ["x", "y", "z"])
+
+
 class Order:
-    Coordinate = namedtuple("Coordinate", ["x", "y", "z"])
+    Coordinate = Coordinate
+
+    """Id of the next order. Sequential, so ids are reproduced when an episode is replayed (See EpisodeRecorder)."""
+    id = 0
+
+    @staticmethod
+    def new_id():
+        _id = Order.id
+        Order.id += 1
+        return _id
 
-    def __init__(self, environment, order_x, order_y, depth, delivery_x, delivery_y):
-        self.id = str(uuid.uuid4())
+    def __init__(self, environment, order_x, order_y, depth, delivery_x, delivery_y, created_at=None):
+        self.id = Order.new_id()
         self.environment = environment
 
+        """Arrival time in environment seconds, when the order comes from a DemandEngine."""
+        self.created_at = created_at
+
         self.agent = None
 
         self.x_0 = order_x
@@ -28,6 +43,22 @@ class Order:
         self.has_finished = False
         self.has_started = False
 
+        """Environment seconds of the order events (See Telemetry)."""
+        self.started_at = None
+        self.picked_up_at = None
+        self.delivered_at = None
+
+        self.c_0 = Order.Coordinate(x=self.x_0, y=self.y_0, z=self.z_0)
+        self.c_1 = Order.Coordinate(x=self.x_1, y=self.y_1, z=self.z_1)
+
+    def __getstate__(self):
+        """Pickled without the coordinates, which are rebuilt from the fields (See EpisodeRecorder.keyframe)."""
+        state = dict(self.__dict__)
+        del state["c_0"], state["c_1"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
         self.c_0 = Order.Coordinate(x=self.x_0, y=self.y_0, z=self.z_0)
         self.c_1 = Order.Coordinate(x=self.x_1, y=self.y_1, z=self.z_1)
 
@@ -36,6 +67,7 @@ class Order:
 
     def start(self):
         self.has_started = True
+        self.started_at = self.environment.get_seconds()
 
         """Set Target cell to pickup and destination to delivery"""
         cell_0 = self.environment.grid.cell(self.x_0, self.y_0)
@@ -53,7 +85,7 @@ class Order:
         self.has_finished = False
         self.has_started = False
         self.agent = None
-        self.environment.scheduler.generator.queue.append(self)
+        self.environment.scheduler.requeue(self)
 
         """Set Target cell to pickup and destination to delivery"""
         cell_0 = self.environment.grid.cell(self.x_0, self.y_0)
@@ -76,6 +108,9 @@ class Order:
 
         if self.has_picked_up:
             self.has_finished = True
+            self.delivered_at = self.environment.get_seconds()
+            if self.environment.telemetry is not None:
+                self.environment.telemetry.on_delivered(self)
             self.agent.task = None
             self.agent.state = Agent.DELIVERY
             self.agent.total_deliveries += 1
@@ -87,6 +122,7 @@ class Order:
 
         else:
             self.has_picked_up = True
+            self.picked_up_at = self.environment.get_seconds()
             cell_0 = self.environment.grid.cell(self.x_0, self.y_0)
             cell_0.update_type(reset=True)
             cell_0.trigger_callback()
@@ -102,6 +138,10 @@ class OrderGenerator:
         self.queue = list()
         self.task_frequency = task_frequency
         self.task_init_size = task_init_size
+
+        if environment.grid.has_obstacles and len(environment.distance_fields.pickup_cells()) == 0:
+            raise ValueError("There is no walkable cell below the two top rows that can reach a delivery point.")
+
         self.generate(init=True)
 
     def generate(self, init=False):
@@ -112,8 +152,13 @@ class OrderGenerator:
         self.add_task()
 
     def add_task(self):
-        x = random.randint(0, self.environment.width - 1)
-        y = random.randint(2, self.environment.height - 1)
+        if self.environment.grid.has_obstacles:
+            """Pickup points are never placed on obstacles or in pockets without a path to a delivery point."""
+            cells = self.environment.distance_fields.pickup_cells()
+            x, y = (int(v) for v in cells[random.randrange(len(cells))])
+        else:
+            x = random.randint(0, self.environment.width - 1)
+            y = random.randint(2, self.environment.height - 1)
         depth = random.randint(0, self.environment.depth)
 
         delivery_point = random.choice(self.environment.delivery_points.data)
@@ -124,14 +169,22 @@ class OrderGenerator:
 
 class Scheduler(abc.ABC):
 
-    def __init__(self, environment):
+    def __init__(self, environment, generator=True):
+        """
+        :param generator: Build the OrderGenerator orders are drawn from. Schedulers with another source of orders
+        (e.g. the demand engine) pass False.
+        """
         self.environment = environment
-        self.generator = OrderGenerator(environment=environment)
+        self.generator = OrderGenerator(environment=environment) if generator else None
 
     def give_task(self, agent):
         raise NotImplemented("The give_task function must be implemented in an non abstract version. Example: "
                              "RandomScheduler or DistanceScheduler")
 
+    def requeue(self, order):
+        """Put an aborted order back in line."""
+        self.generator.queue.append(order)
+
 
 class OnDemandScheduler(Scheduler):
     """Gives tasks when the agent demands."""
@@ -143,3 +196,28 @@ class OnDemandScheduler(Scheduler):
         agent.task = task
         agent.task.agent = agent
         task.start()
+
+
+class BacklogScheduler(Scheduler):
+    """
+    Gives the oldest waiting order of the demand engine (Environment(demand=...)) to agents that ask for a task.
+    Agents stay without a task while the backlog is empty.
+    """
+
+    def __init__(self, environment):
+        if getattr(environment, "demand", None) is None:
+            raise ValueError("BacklogScheduler requires an environment with a demand process.")
+        super().__init__(environment, generator=False)
+        self.demand = environment.demand
+
+    def give_task(self, agent):
+        task = self.demand.pull()
+        if task is None:
+            return
+
+        agent.task = task
+        agent.task.agent = agent
+        task.start()
+
+    def requeue(self, order):
+        self.demand.requeue(order)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+import numpy as np
+
+from deep_logistics.layout import default_cache_dir, save_arrays, load_arrays
+
+
+class ShortestPathTable:
+    """
+    All-pairs shortest path lengths between the walkable cells of a small grid.
+    The table is a (n_walkable, n_walkable) uint16 array. Cells are numbered in row-major order through the
+    (height, width) index array, where obstacles are -1. The table is built with a vectorized multi-source BFS, stored
+    on disk under the hash of the obstacle layer and attached read-only through mmap.
+    """
+    VERSION = 1
+    MAX_CELLS = 64 * 64
+    UNREACHABLE = np.iinfo(np.uint16).max
+
+    FILES = ["index", "table"]
+
+    """Tables attached in this process, by key."""
+    _attached = {}
+
+    def __init__(self, key, index, table):
+        self.key = key
+        self.index = index
+        self.table = table
+
+    @staticmethod
+    def hash(walkable):
+        data = repr((ShortestPathTable.VERSION, walkable.shape)).encode("utf-8") + np.packbits(walkable).tobytes()
+        return hashlib.sha1(data).hexdigest()
+
+    @staticmethod
+    def build(walkable, chunk_size=256, key=None):
+        """
+        Run BFS from chunk_size sources at a time. Each BFS layer expands all sources of the chunk in one operation
+        over a (chunk_size, height, width) array.
+        """
+        height, width = walkable.shape
+        if height * width > ShortestPathTable.MAX_CELLS:
+            raise ValueError("All-pairs shortest paths are limited to grids of %s cells. Use DistanceFieldCache for "
+                             "larger grids." % ShortestPathTable.MAX_CELLS)
+
+        ys, xs = np.nonzero(walkable)
+        n = len(ys)
+
+        index = np.full(shape=(height, width), fill_value=-1, dtype=np.int32)
+        index[ys, xs] = np.arange(n)
+        table = np.full(shape=(n, n), fill_value=ShortestPathTable.UNREACHABLE, dtype=np.uint16)
+
+        for start in range(0, n, chunk_size):
+            sources = np.arange(start, min(n, start + chunk_size))
+            m = len(sources)
+
+            frontier = np.zeros(shape=(m, height, width), dtype=np.bool_)
+            frontier[np.arange(m), ys[sources], xs[sources]] = True
+            visited = frontier.copy()
+            expanded = np.empty_like(frontier)
+
+            distance = np.full(shape=(m, height, width), fill_value=ShortestPathTable.UNREACHABLE, dtype=np.uint16)
+            distance[frontier] = 0
+
+            d = 0
+            while True:
+                expanded[:] = False
+                expanded[:, 1:, :] |= frontier[:, :-1, :]
+                expanded[:, :-1, :] |= frontier[:, 1:, :]
+                expanded[:, :, 1:] |= frontier[:, :, :-1]
+                expanded[:, :, :-1] |= frontier[:, :, 1:]
+                expanded &= walkable
+                expanded &= ~visited
+
+                if not expanded.any():
+                    break
+
+                d += 1
+                distance[expanded] = d
+                visited |= expanded
+                frontier, expanded = expanded, frontier
+
+            table[sources] = distance[:, ys, xs]
+
+        if key is None:
+            key = ShortestPathTable.hash(walkable)
+
+        return ShortestPathTable(key, index, table)
+
+    def save(self, cache_dir):
+        return save_arrays(cache_dir, self.key, {name: getattr(self, name) for name in ShortestPathTable.FILES})
+
+    @staticmethod
+    def load(path):
+        """Attach to a stored table. The arrays are read-only memory maps."""
+        return ShortestPathTable(key=os.path.basename(path), **load_arrays(path, ShortestPathTable.FILES))
+
+    @staticmethod
+    def get(walkable, cache_dir=None):
+        """Attach to the cached table for this obstacle layer. The table is built and stored on the first request."""
+        key = ShortestPathTable.hash(walkable)
+        try:
+            return ShortestPathTable._attached[key]
+        except KeyError:
+            pass
+
+        cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+        path = os.path.join(cache_dir, key)
+
+        if not os.path.isdir(path):
+            path = ShortestPathTable.build(walkable, key=key).save(cache_dir)
+
+        table = ShortestPathTable.load(path)
+        ShortestPathTable._attached[key] = table
+        return table
+
+    def distance(self, x0, y0, x1, y1):
+        """Shortest path length from (x0, y0) to (x1, y1). UNREACHABLE when there is no path or a cell is blocked."""
+        i = self.index[y0, x0]
+        j = self.index[y1, x1]
+        if i < 0 or j < 0:
+            return ShortestPathTable.UNREACHABLE
+        return int(self.table[i, j])
+
+    def distances(self, x0, y0, x1, y1):
+        """Vectorized distance() over arrays of coordinates. Returns an int64 array."""
+        i = self.index[y0, x0]
+        j = self.index[y1, x1]
+        blocked = (i < 0) | (j < 0)
+        result = self.table[np.maximum(i, 0), np.maximum(j, 0)].astype(np.int64)
+        result[blocked] = ShortestPathTable.UNREACHABLE
+        return result
@@ -6,10 +6,10 @@ from deep_logistics import cell_types
 
 class SpawnStrategy(abc.ABC):
 
-    def __init__(self, environment, seed=None):
+    def __init__(self, environment, seed=None, override=None):
         self.env = environment
         self.rnd = Random() if seed is None else Random(x=seed)
-        self.data = self.generate()
+        self.data = [self.env.grid.cell(x, y) for x, y in override] if override is not None else self.generate()
 
     def generate(self):
         raise NotImplementedError("generate must be implemented!")
@@ -26,6 +26,8 @@ class RandomSpawnStrategy(SpawnStrategy):
         data = []
         for y in height:
             for x in width:
+                if self.env.grid.obstacles[y, x]:
+                    continue
                 cell = self.env.grid.cell(x, y)
                 #cell.type = cell_types.SpawnPoint
                 #cell.original_type = cell_types.SpawnPoint
@@ -46,6 +48,8 @@ class LocationSpawnStrategy(SpawnStrategy):
         data = []
         for y in height:
             for x in width:
+                if self.env.grid.obstacles[y, x]:
+                    continue
                 cell = self.env.grid.cell(x, y)
                 cell.type = cell_types.SpawnPoint
                 cell.original_type = cell_types.SpawnPoint
@@ -0,0 +1,234 @@
+import numpy as np
+
+
+class StreamingHistogram:
+    """
+    Fixed-memory histogram with log-spaced bins between low and high, plus an underflow and an overflow bin.
+    Percentiles are interpolated geometrically inside a bin, so the relative error is bounded by the bin width
+    ((high / low) ** (1 / bins), about 5% for the defaults).
+    """
+
+    def __init__(self, low=0.1, high=1e5, bins=256):
+        self.low = low
+        self.high = high
+        self.edges = np.geomspace(low, high, bins + 1)
+        self.counts = np.zeros(bins + 2, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        """Add a value or an array of values."""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if len(values) == 0:
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, values, side="right"), minlength=len(self.counts))
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0 - 100)."""
+        if self.count == 0:
+            return float("nan")
+
+        rank = q / 100.0 * self.count
+        cumulative = np.cumsum(self.counts)
+        i = min(int(np.searchsorted(cumulative, rank, side="left")), len(self.counts) - 1)
+
+        """Bounds of bin i. The underflow and overflow bins are bounded by the observed min and max."""
+        if i == 0:
+            lower, upper = self.min, self.low
+        elif i == len(self.counts) - 1:
+            lower, upper = self.high, self.max
+        else:
+            lower, upper = self.edges[i - 1], self.edges[i]
+        lower = max(lower, self.min)
+        upper = max(min(upper, self.max), lower)
+
+        before = cumulative[i - 1] if i > 0 else 0
+        fraction = (rank - before) / self.counts[i] if self.counts[i] else 0.0
+        if lower > 0:
+            value = lower * (upper / lower) ** fraction
+        else:
+            value = lower + (upper - lower) * fraction
+        return float(min(max(value, self.min), self.max))
+
+    def export(self, percentiles=(50, 90, 95, 99)):
+        data = dict(count=self.count, mean=self.mean(), min=self.min if self.count else float("nan"),
+                    max=self.max if self.count else float("nan"))
+        for q in percentiles:
+            data["p%s" % q] = self.percentile(q)
+        return data
+
+
+class Telemetry:
+    """
+    Order latency and fleet KPIs for an Environment (Environment(telemetry=True)), aggregated with fixed memory:
+    streaming histograms for the order latencies and per-agent counters for the fleet.
+
+    Order latencies, in environment seconds:
+    - queue_wait: Arrival (Order.created_at) to assignment. Zero for orders created on demand.
+    - pickup_time: Assignment to pickup.
+    - delivery_time: Pickup to delivery.
+    - total_time: Arrival to delivery.
+
+    Every tick each agent is counted in one of the AGENT_STATES: inactive (not on the grid), moving (the agent changed
+    cell or made progress towards the next cell this tick), idle (no task) or waiting (has a task but did not move).
+    Deliveries are counted per delivered order (on_delivered) and crashes from the Agent.total_crashes counters
+    (Agent.crash), not from the agent states, so events are neither missed between ticks nor counted on every tick a
+    state lasts. The crash ratio is crashes per tick on the grid.
+    """
+    LATENCIES = ["queue_wait", "pickup_time", "delivery_time", "total_time"]
+
+    INACTIVE = 0
+    IDLE = 1
+    MOVING = 2
+    WAITING = 3
+    AGENT_STATES = ["inactive", "idle", "moving", "waiting"]
+
+    def __init__(self, environment, low=0.1, high=1e5, bins=256, percentiles=(50, 90, 95, 99)):
+        self.environment = environment
+        self.percentiles = percentiles
+        self.latencies = {name: StreamingHistogram(low=low, high=high, bins=bins) for name in Telemetry.LATENCIES}
+
+        self.agent_ticks = np.zeros(shape=(0, len(Telemetry.AGENT_STATES)), dtype=np.int64)
+        self.agent_crashes = np.zeros(0, dtype=np.int64)
+        self.agent_deliveries = np.zeros(0, dtype=np.int64)
+        self._position = np.zeros(0, dtype=np.int64)
+        self._progress = np.zeros(0, dtype=np.float64)
+        self._total_crashes = np.zeros(0, dtype=np.int64)  # Agent.total_crashes at the last update, kept on reset
+        self._index = {}  # Agent id => index into the per-agent counters
+
+        """Export of the last finished episode."""
+        self.last_episode = None
+
+        self.reset()
+
+    def reset(self):
+        for histogram in self.latencies.values():
+            histogram.reset()
+        self.agent_ticks[:] = 0
+        self.agent_crashes[:] = 0
+        self.agent_deliveries[:] = 0
+        self._position[:] = -1
+        self._progress[:] = 0
+
+        self.ticks = 0
+        self.deliveries = 0
+        self.start_seconds = self.environment.get_seconds()
+
+    def _resize(self, n):
+        """Grow the per-agent counters when agents were added."""
+        grow = n - len(self.agent_crashes)
+        self.agent_ticks = np.concatenate([self.agent_ticks, np.zeros((grow, len(Telemetry.AGENT_STATES)), np.int64)])
+        self.agent_crashes = np.concatenate([self.agent_crashes, np.zeros(grow, dtype=np.int64)])
+        self.agent_deliveries = np.concatenate([self.agent_deliveries, np.zeros(grow, dtype=np.int64)])
+        self._position = np.concatenate([self._position, np.full(grow, -1, dtype=np.int64)])
+        self._progress = np.concatenate([self._progress, np.zeros(grow, dtype=np.float64)])
+        self._total_crashes = np.concatenate([self._total_crashes, np.zeros(grow, dtype=np.int64)])
+
+    def on_delivered(self, order):
+        """Called by Order.evaluate when an order is delivered."""
+        created = order.started_at if order.created_at is None else order.created_at
+        self.latencies["queue_wait"].add(order.started_at - created)
+        self.latencies["pickup_time"].add(order.picked_up_at - order.started_at)
+        self.latencies["delivery_time"].add(order.delivered_at - order.picked_up_at)
+        self.latencies["total_time"].add(order.delivered_at - created)
+        self.deliveries += 1
+
+        i = self._index.get(order.agent.id)
+        if i is None:
+            agents = self.environment.agents
+            self._index = {agent.id: j for j, agent in enumerate(agents)}
+            i = self._index[order.agent.id]
+            if len(agents) > len(self.agent_deliveries):
+                self._resize(len(agents))
+        self.agent_deliveries[i] += 1
+
+    def update(self):
+        """Called by Environment.update after every tick."""
+        agents = self.environment.agents
+        n = len(agents)
+        if n > len(self.agent_crashes):
+            self._resize(n)
+
+        width = self.environment.width
+        position = np.full(n, -1, dtype=np.int64)
+        has_task = np.zeros(n, dtype=np.bool_)
+        total_crashes = np.zeros(n, dtype=np.int64)
+        progress = np.zeros(n, dtype=np.float64)
+        for i, agent in enumerate(agents):
+            cell = agent._cell
+            if cell is not None:
+                position[i] = cell.y * width + cell.x
+            has_task[i] = agent.task is not None
+            total_crashes[i] = agent.total_crashes
+            progress[i] = agent.action_progress
+
+        on_grid = position >= 0
+        moved = on_grid & (self._position[:n] >= 0) & (
+            (position != self._position[:n]) | (progress != self._progress[:n])
+        )
+        state = np.where(~on_grid, Telemetry.INACTIVE, np.where(~has_task, Telemetry.IDLE, Telemetry.WAITING))
+        state[moved] = Telemetry.MOVING
+
+        self.agent_ticks[np.arange(n), state] += 1
+        self.agent_crashes[:n] += total_crashes - self._total_crashes[:n]
+        self._position[:n] = position
+        self._progress[:n] = progress
+        self._total_crashes[:n] = total_crashes
+        self.ticks += 1
+
+    def export(self):
+        """KPIs of the current episode as a dict of plain Python values."""
+        seconds = self.environment.get_seconds() - self.start_seconds
+        hours = seconds / 3600.0
+
+        """Ratios are over the ticks an agent was on the grid."""
+        active = self.agent_ticks.sum(axis=1) - self.agent_ticks[:, Telemetry.INACTIVE]
+        ratios = {
+            name: self.agent_ticks[:, i] / np.maximum(active, 1)
+            for i, name in enumerate(Telemetry.AGENT_STATES) if i != Telemetry.INACTIVE
+        }
+        ratios["crash"] = self.agent_crashes / np.maximum(active, 1)
+
+        fleet_active = max(int(active.sum()), 1)
+        crashes = int(self.agent_crashes.sum())
+        active_hours = fleet_active * self.environment.tick_ps_ratio / 3600.0
+        return dict(
+            ticks=self.ticks,
+            seconds=seconds,
+            deliveries=self.deliveries,
+            crashes=crashes,
+            throughput_per_hour=self.deliveries / hours if hours > 0 else float("nan"),
+            latency={name: histogram.export(self.percentiles) for name, histogram in self.latencies.items()},
+            fleet=dict(
+                crashes_per_agent_hour=crashes / active_hours,
+                crash_ratio=crashes / fleet_active,
+                **{
+                    "%s_ratio" % name: int(self.agent_ticks[:, i].sum()) / fleet_active
+                    for i, name in enumerate(Telemetry.AGENT_STATES) if i != Telemetry.INACTIVE
+                }
+            ),
+            agents=dict(
+                crashes=self.agent_crashes.tolist(),
+                deliveries=self.agent_deliveries.tolist(),
+                **{"%s_ratio" % name: ratio.tolist() for name, ratio in ratios.items()}
+            )
+        )
+
+    def end_episode(self):
+        """Export the finished episode into last_episode and start a new one."""
+        self.last_episode = self.export()
+        self.reset()
+        return self.last_episode
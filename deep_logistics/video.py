@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+
+import numpy as np
+
+
+class VideoSink:
+    """
+    Streams rendered frames to an MP4 (or AVI) file through OpenCV, or to a GIF through imageio (optional, only
+    needed for GIFs).
+    Frames are BGR uint8 arrays of shape (height, width, 3), the layout of PygameGraphics.frame and the HTTPRenderer
+    framebuffer. Every stride-th frame is put on a bounded queue that a background thread encodes, so the simulation
+    only pays for copying the frame. When the encoder falls behind and the queue is full, frames are dropped (counted in
+    dropped) instead of blocking the simulation, unless block is set.
+    """
+
+    FORMATS = {
+        ".mp4": "mp4v",
+        ".avi": "XVID",
+        ".gif": None
+    }
+
+    def __init__(self, path, fps=30, stride=1, queue_size=64, block=False):
+        """
+        :param path: Output file. The format follows the extension (See FORMATS).
+        :param fps: Frame rate of the video
+        :param stride: Write every stride-th frame
+        :param queue_size: Maximum number of frames waiting to be encoded
+        :param block: Wait for room in the queue instead of dropping frames
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in VideoSink.FORMATS:
+            raise ValueError("Unsupported video format %s. Supported formats: %s" % (
+                extension, list(VideoSink.FORMATS.keys())
+            ))
+        if stride < 1:
+            raise ValueError("The frame stride must be >= 1, got %s." % stride)
+
+        """Import the encoder up front, so a missing dependency fails before the episode runs."""
+        if extension == ".gif":
+            try:
+                import imageio
+            except ImportError:
+                raise ImportError("Writing GIF videos requires imageio (pip install imageio). Use .mp4 or .avi to "
+                                  "encode through OpenCV instead.")
+            self._backend = imageio
+        else:
+            import cv2
+            self._backend = cv2
+
+        self.path = path
+        self.extension = extension
+        self.fps = fps
+        self.stride = stride
+        self.block = block
+
+        self.frames = 0  # Frames seen by due()
+        self.written = 0  # Frames encoded
+        self.dropped = 0  # Frames dropped because the queue was full
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="VideoSink", daemon=True)
+        self._thread.start()
+
+    def due(self):
+        """Count a rendered frame. Returns True when the frame should be written."""
+        self.frames += 1
+        return (self.frames - 1) % self.stride == 0
+
+    def write(self, frame):
+        """Queue a frame for encoding. The frame must not be modified afterwards."""
+        if self._error is not None:
+            raise RuntimeError("The video encoder failed: %s" % self._error)
+
+        try:
+            self._queue.put(frame, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self, frame):
+        height, width = frame.shape[:2]
+        if self.extension == ".gif":
+            return self._backend.get_writer(self.path, mode="I", fps=self.fps)
+
+        cv2 = self._backend
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*VideoSink.FORMATS[self.extension]), self.fps,
+                                 (width, height))
+        if not writer.isOpened():
+            raise RuntimeError("Could not open %s for writing." % self.path)
+        return writer
+
+    def _encode(self, writer, frame):
+        if self.extension == ".gif":
+            writer.append_data(np.ascontiguousarray(frame[..., ::-1]))
+        else:
+            writer.write(frame)
+
+    def _run(self):
+        writer = None
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                """Keep draining, so a blocking producer does not hang."""
+                continue
+
+            try:
+                if writer is None:
+                    writer = self._open(frame)
+                self._encode(writer, frame)
+                self.written += 1
+            except Exception as e:
+                self._error = e
+
+        if writer is not None:
+            if self.extension == ".gif":
+                writer.close()
+            else:
+                writer.release()
+
+    def close(self):
+        """Encode the remaining frames and finish the file."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+
+        if self._error is not None:
+            raise RuntimeError("The video encoder failed: %s" % self._error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -4,6 +4,8 @@ from torch.distributions import Categorical
 import gym
 import warnings
 
+from experiments.experiment_5.per_rl.returns import discounted_returns
+
 warnings.simplefilter('ignore')
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
@@ -87,14 +89,10 @@ class PPO:
 
     def update(self):
         # Monte Carlo estimate of state rewards:
-        rewards = []
-        discounted_reward = 0
-        for reward in reversed(self.policy_old.rewards):
-            discounted_reward = reward + (self.gamma * discounted_reward)
-            rewards.insert(0, discounted_reward)
+        rewards = discounted_returns(self.policy_old.rewards, self.gamma)
 
         # Normalizing the rewards:
-        rewards = torch.tensor(rewards).to(device)
+        rewards = torch.tensor(rewards, dtype=torch.float32).to(device)
         rewards = (rewards - rewards.mean()) / (rewards.std() + 1e-5)
 
         # convert list in tensor
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+
+"""Run from anywhere without installing the package: the repository root is two levels up."""
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from deep_logistics import DeepLogistics
+from deep_logistics import SpawnStrategies
+from deep_logistics.agent import Agent
+from deep_logistics.planner import ReservationAgent
+
+"""
+Benchmark for the ReservationPlanner fleet: ticks per second and collisions for a large fleet of ReservationAgents.
+python experiments/dev/benchmark_planner.py --size 256 --agents 1000 --ticks 2000
+Agents advance one cell every tick (--ticks-per-second 1), so within the default horizon most agents finish several
+orders and the planner replans on every pickup and delivery. With the environment default of 10 ticks per second an
+agent needs ten ticks per cell, and a few hundred ticks are not enough for a single delivery on a large map.
+"""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--ticks-per-second", type=int, default=1)
+    parser.add_argument("--max-plans-per-step", type=int, default=64)
+    args = parser.parse_args()
+
+    t_start = time.perf_counter()
+    env = DeepLogistics(width=args.size,
+                        height=args.size,
+                        depth=3,
+                        taxi_n=args.agents,
+                        taxi_agent=ReservationAgent,
+                        ups=None,
+                        ticks_per_second=args.ticks_per_second,
+                        graphics_render=False,
+                        delivery_locations=[
+                            (args.size // 4, args.size // 4),
+                            (3 * args.size // 4, args.size // 4),
+                            (args.size // 4, 3 * args.size // 4),
+                            (3 * args.size // 4, 3 * args.size // 4)
+                        ],
+                        spawn_strategy=SpawnStrategies.RandomSpawnStrategy
+                        )
+    env.planner.max_plans_per_step = args.max_plans_per_step
+    print("Setup: %.2fs" % (time.perf_counter() - t_start))
+
+    report = max(1, args.ticks // 10)
+    t_start = time.perf_counter()
+    t_report = t_start
+    for tick in range(1, args.ticks + 1):
+        env.update()
+
+        if tick % report == 0:
+            now = time.perf_counter()
+            crashed = sum(1 for agent in env.agents if agent.state in (Agent.DESTROYED, Agent.INACTIVE))
+            print("Tick %s, %.1f ticks/s, Plan step: %s, Plans: %s, Failed plans: %s, Crashed: %s" % (
+                tick, report / (now - t_report), env.planner.t, env.planner.total_plans,
+                env.planner.total_failures, crashed
+            ))
+            t_report = now
+
+    elapsed = time.perf_counter() - t_start
+    delivered = sum(agent.total_deliveries for agent in env.agents)
+    crashed = sum(1 for agent in env.agents if agent.state in (Agent.DESTROYED, Agent.INACTIVE))
+    print("Total: %.1f ticks/s, Deliveries: %s, Crashed: %s, A* expansions: %s" % (
+        args.ticks / elapsed, delivered, crashed, env.planner.total_expansions
+    ))
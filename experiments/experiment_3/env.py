@@ -4,18 +4,18 @@ from ray.tune import register_env
 
 from deep_logistics.agent import Agent
 from deep_logistics.environment import Environment
-from deep_logistics import spawn_strategy
+from deep_logistics.multi_agent import MultiAgentEnvironment, DictAdapter
+from deep_logistics import spawn_strategy, reward_functions
 import os
 import numpy as np
 
-from experiments.experiment_3.reward_functions import Reward0
 from experiments.experiment_3.state_representations import State0
 
 
 class BaseDeepLogisticsMultiEnv(MultiAgentEnv):
 
     def __init__(self, state, reward, width, height, depth, taxi_n, group_type="individual", graphics_render=False,
-                 delivery_locations=None):
+                 delivery_locations=None, frame_skip=1):
         os.environ["MKL_NUM_THREADS"] = "1"
 
         self.env = Environment(width=width,
@@ -29,21 +29,23 @@ class BaseDeepLogisticsMultiEnv(MultiAgentEnv):
                                spawn_strategy=spawn_strategy.RandomSpawnStrategy
                                )
 
-        self.state_representation = state(self.env)
-        self.reward_function = reward
-        self._render = graphics_render
+        """Array-native multi-agent environment, exposed to RLlib through the dict adapter."""
+        self.multi_env = MultiAgentEnvironment(self.env, state=state, reward=reward, render=graphics_render,
+                                               frame_skip=frame_skip)
+        self.adapter = DictAdapter(self.multi_env)
+
+        self.state_representation = self.multi_env.state_representation
+        self.reward_function = self.multi_env.reward_function
 
         self.observation_space = Box(
             low=-1,
             high=1,
-            shape=self.state_representation.generate(self.env.agents[0]).shape,
+            shape=self.multi_env.observation_shape,
             dtype=np.float32
         )
         self.action_space = Discrete(self.env.action_space.N_ACTIONS)
 
-        self.agents = {"agent_%s" % i: self.env.agents[i] for i in range(taxi_n)}
-
-        self.total_steps = 0
+        self.agents = {agent_name: self.env.agents[i] for agent_name, i in self.adapter.index.items()}
 
         """Set up grouping for the environments."""
         if group_type == "individual":
@@ -64,50 +66,17 @@ class BaseDeepLogisticsMultiEnv(MultiAgentEnv):
         )
 
     def step(self, action_dict):
-        self.total_steps += 1
-
         # TODO this loop does not make sense when using multiple policies.
         #  Now we do 1 action for all taxis with a single policy (i think) instead of 1 action per policy
         # Cluster: https://ray.readthedocs.io/en/latest/install-on-docker.html#launch-ray-in-docker<
-        info_dict = {}
-        reward_dict = {}
-        terminal_dict = {"__all__": False}
-        state_dict = {}
-
-        """Perform actions in environment."""
-        for agent_name, action in action_dict.items():
-            self.agents[agent_name].do_action(action=action)
-
-        """Update the environment"""
-        self.env.update()
-        if self._render:
-            self.env.render()
-
-        """Evaluate score"""
-        t__all__ = False
-        for agent_name, agent in action_dict.items():
-            reward, terminal = self.reward_function(self.agents[agent_name])
-
-            reward_dict[agent_name] = reward
-            terminal_dict[agent_name] = terminal
-
-            if terminal:
-                t__all__ = terminal
-
-            state_dict[agent_name] = self.state_representation.generate(self.agents[agent_name])
-
-        """Update terminal dict"""
-        terminal_dict["__all__"] = t__all__
-
-        return state_dict, reward_dict, terminal_dict, info_dict
+        return self.adapter.step(action_dict)
 
     def reset(self):
-        self.env.reset()
-        self.total_steps = 0
+        return self.adapter.reset()
 
-        return {
-            agent_name: self.state_representation.generate(agent) for agent_name, agent in self.agents.items()
-        }
+    @property
+    def total_steps(self):
+        return self.multi_env.total_steps
 
     @staticmethod
     def on_episode_end(info):
@@ -132,7 +101,7 @@ class DeepLogisticsMultiEnv1(BaseDeepLogisticsMultiEnv):
     def __init__(self, config=dict()):
         c = dict(
             state=State0,
-            reward=Reward0,
+            reward=reward_functions.Reward0,
             width=10,
             height=10,
             depth=3,
@@ -1,5 +1,8 @@
 import numpy as np
 
+from deep_logistics.agent import Agent
+from deep_logistics.agent_storage import AgentStore
+
 
 class BaseState:
 
@@ -9,6 +12,29 @@ class BaseState:
     def generate(self, player):
         raise NotImplementedError("state.*generate()* must be implemented.")
 
+    def generate_batch(self, agents=None, out=None):
+        """
+        Generate the state of every agent as a single (n_agents, F) float32 array.
+        The default implementation stacks generate() row by row. Subclasses override this with a vectorized version.
+        :param agents: Sequence of agents. Defaults to all agents in the environment.
+        :param out: Optional preallocated (n_agents, F) float32 array that is written in place.
+        :return: out
+        """
+        agents = self.env.agents if agents is None else agents
+        rows = [self.generate(agent) for agent in agents]
+        out = self._batch_buffer(len(rows), rows[0].shape[0]) if out is None else out
+        for i, row in enumerate(rows):
+            out[i] = row
+        return out
+
+    def _batch_buffer(self, n, features):
+        """Return the preallocated output buffer, reallocated only when the fleet size changes."""
+        buffer = getattr(self, "_buffer", None)
+        if buffer is None or buffer.shape != (n, features):
+            buffer = np.zeros(shape=(n, features), dtype=np.float32)
+            self._buffer = buffer
+        return buffer
+
     def get_shape(self):
         return self.generate(self.env.selected_agent).shape
 
@@ -56,6 +82,64 @@ class StateFull(BaseState):
 
 class State0(BaseState):
     """Generate state representation of the environment."""
+    N_FEATURES = 12
+
+    def _gather(self, agents):
+        """Read the raw per-agent values (See AgentStore.gather) and the action intensity into flat arrays."""
+        n = len(agents)
+        raw = getattr(self, "_raw", None)
+        if raw is None or raw.shape[0] != n:
+            raw = np.zeros(shape=(n, AgentStore.N_COLUMNS), dtype=np.int64)
+            self._raw = raw
+            self._intensity = np.zeros(shape=(n, ), dtype=np.float64)
+
+        self.env.agents.gather(agents, out=raw)
+        intensity = self._intensity
+        for i, agent in enumerate(agents):
+            intensity[i] = agent.action_intensity
+
+        return raw, intensity
+
+    def _direction_hint(self, d):
+        """Vectorized version of the direction hint in generate(): -1 => -0.1, 0 => 0.1, 1 => 1."""
+        return np.select([d < 0, d == 0], [-0.1, 0.1], 1.0)
+
+    def generate_batch(self, agents=None, out=None):
+        agents = self.env.agents if agents is None else agents
+        raw, intensity = self._gather(agents)
+        out = self._batch_buffer(len(raw), self.N_FEATURES) if out is None else out
+
+        width = self.env.grid.width
+        height = self.env.grid.height
+
+        has_cell = raw[:, 0] == 1
+        has_task = raw[:, 3] == 1
+        x = raw[:, 1]
+        y = raw[:, 2]
+
+        """1. Position [x, y]"""
+        out[:, 0] = x / width
+        out[:, 1] = y / height
+
+        """2. Target [target_x, target_y]"""
+        out[:, 2] = raw[:, 4] / width
+        out[:, 3] = raw[:, 5] / height
+
+        """3. Direction hint [direction_hint_x, direction_hint_y]"""
+        out[:, 4] = np.where(has_task, self._direction_hint(x - raw[:, 4]), 0)
+        out[:, 5] = np.where(has_task, self._direction_hint(y - raw[:, 5]), 0)
+
+        """4. Border distances [left, right, up, down]"""
+        out[:, 6] = np.where(has_cell, x / width, -1)
+        out[:, 7] = np.where(has_cell, (width - x) / width, -1)
+        out[:, 8] = np.where(has_cell, y / height, -1)
+        out[:, 9] = np.where(has_cell, (height - y) / height, -1)
+
+        """5. State and speed"""
+        out[:, 10] = (raw[:, 6] - Agent.IDLE) / (Agent.INACTIVE - Agent.IDLE)
+        out[:, 11] = intensity
+
+        return out
 
     def generate(self, player):
         state_features = []
@@ -203,6 +287,37 @@ class State1(State0):
 
         return np.concatenate((super().generate(player), state_features))
 
+    def generate_batch(self, agents=None, out=None):
+        agents = self.env.agents if agents is None else agents
+        out = self._batch_buffer(len(agents), self.N_FEATURES + 4) if out is None else out
+        super().generate_batch(agents, out=out[:, :self.N_FEATURES])
+
+        raw = self._raw
+        has_cell = raw[:, 0] == 1
+        x = raw[:, 1]
+        y = raw[:, 2]
+
+        width = self.env.grid.width
+        height = self.env.grid.height
+
+        occupied = np.zeros(shape=(height, width), dtype=np.bool_)
+        occupied[y[has_cell], x[has_cell]] = True
+
+        radius = agents[0].sensor_radius if len(agents) > 0 else 0
+
+        """Columns: left, right, up, down. Negative offsets wrap around like Grid.relative_cell does."""
+        for column, (dx, dy) in enumerate([(-1, 0), (1, 0), (0, -1), (0, 1)]):
+            distance = np.full(shape=(len(raw), ), fill_value=-1, dtype=np.int64)
+            for r in reversed(range(1, radius + 1)):
+                nx = x + dx * r
+                ny = y + dy * r
+                valid = has_cell & (nx < width) & (nx >= -width) & (ny < height) & (ny >= -height)
+                hit = valid & occupied[ny % height, nx % width]
+                distance[hit] = r
+            out[:, self.N_FEATURES + column] = distance
+
+        return out
+
 
 
 class State2(BaseState):
@@ -1,54 +1,15 @@
-import time
-
-import gym
-from gym_deep_logistics import gym_deep_logistics
-import tensorflow as tf
 import ray
-import sys
-
-
-
-class Environment:
-
-    def __init__(self, env, episodes=sys.maxsize):
-
-        if isinstance(env, str):
-            self.env = gym.make(env)
-        else:
-            self.env = env
-            # TODO - Make has attribute checks for step, reset.. etc
-        self.episode = 0
-        self.max_episode = episodes
-        self.steps = 0
-
-        self.state = self.env.reset()
-        self.next_state = None
-        self.reward = None
-        self.terminal = None
-        self.info = None
-
-    def step(self, action):
-        self.state, self.reward, self.terminal, self.info = self.env.step(action)
-        #self.reward = 0 if self.terminal else self.reward # Discounting should handle this anyway.
 
-        self.steps += 1
-        if self.terminal:
-            self.steps = 0
-            self.state = self.env.reset()
-            self.episode += 1
-
-        # S, A, R, T
-        #state = self.state
-        #self.state = self.next_state
-        return self.state, self.reward, self.terminal, self.info
-
-    def reset(self):
-        return self.env.reset()
+from experiments.experiment_5.per_rl.inference import InferenceBatcher
+from experiments.experiment_5.per_rl.parameters import ParameterStore, ParameterSubscriber
+from experiments.experiment_5.per_rl.utils import flatten_weights, unflatten_weights
+from experiments.experiment_5.rollout import Environment, RolloutActor
 
 
 class Agent:
 
-    def __init__(self, algorithm, algorithm_config, environment, num_agents, num_environments, sample_delay):
+    def __init__(self, algorithm, algorithm_config, environment, num_agents, num_environments, sample_delay,
+                 batched_inference=False, inference_latency=0.005, numpy_rollouts=False):
         self.algorithm = algorithm
         self.algorithm_config = algorithm_config
         self.environment = environment
@@ -59,71 +20,123 @@ class Agent:
 
         self.total_steps = 0
 
+        if batched_inference and numpy_rollouts:
+            raise ValueError("batched_inference and numpy_rollouts can not be combined.")
+
+        """Explore with RolloutActors, which run an exported copy of the policy with NumPy and never import
+        TensorFlow."""
+        self.numpy_rollouts = numpy_rollouts
+
+        """The trainer publishes its weights to the ParameterStore once per version, the workers pull them when they
+        start an episode on older weights."""
+        self.parameters = ParameterStore.remote()
+
+        """One InferenceServer predicting for all environments in batches, instead of one prediction per step in every
+        environment."""
+        self.inference = InferenceServer.options(max_concurrency=num_environments + 1).remote(
+            algorithm, algorithm_config, max_batch_size=num_environments, max_latency=inference_latency,
+            parameters=self.parameters
+        ) if batched_inference else None
+
         self.local = dict(
             actor=self.createActor(),
             tasks=[],
             accumulated_steps=0
         )
-        self.local_task = None
 
         self.remotes = [dict(
             actor=self.createActor(local=self.local["actor"]),
             tasks=[],
             accumulated_steps=0
         ) for _ in range(self.num_environments)]
+        self.owners = dict()  # Remote of every queued task
 
     def createActor(self, local=None):
-        return EnvActor.remote(self.environment, self.algorithm, self.algorithm_config, local)
+        if local is None:
+            return EnvActor.remote(self.environment, self.algorithm, self.algorithm_config, inference=self.inference,
+                                   parameters=self.parameters, export=self.numpy_rollouts)
 
-    def train(self):
+        if self.numpy_rollouts:
+            return RolloutActor.remote(self.environment, local.export_policy.remote(), local,
+                                       local.batch_config.remote(), parameters=self.parameters)
 
-        for remote in self.remotes:
-            # Inference on remotes
+        return EnvActor.remote(self.environment, self.algorithm, self.algorithm_config, local,
+                               inference=self.inference, parameters=self.parameters)
 
-            actor = remote["actor"]
+    def train(self):
+        """
+        Keep task_queue_size episodes queued on every worker, and block until at least one of them is done. The
+        trainer trains when the pushed batches fill its buffer (See EnvActor.push_batch), and the workers pull the
+        published weights by themselves.
+        """
+        for remote in self.remotes:
             tasks = remote["tasks"]
+            for _ in range(self.task_queue_size - len(tasks)):
+                task = remote["actor"].train.remote()
+                tasks.append(task)
+                self.owners[task] = remote
 
-            # Create new tasks if there is few in queue.
-            if len(tasks) < self.task_queue_size:
-                n_new = self.task_queue_size - len(tasks)
-                tasks.extend([actor.train.remote() for _ in range(n_new)])
-
-            completed_ids, _ = ray.wait(tasks, self.task_queue_size, timeout=.01)
+        pending = list(self.owners.keys())
+        ray.wait(pending, num_returns=1)
+        completed_ids, _ = ray.wait(pending, num_returns=len(pending), timeout=0)
 
-            for completed_id in completed_ids:
-                episode_steps = ray.get(completed_id)  # the completed task should return number of steps performed
-                self.total_steps += episode_steps
-                remote["accumulated_steps"] += episode_steps
-                tasks.remove(completed_id)
+        # The completed tasks return the number of steps performed
+        for completed_id, episode_steps in zip(completed_ids, ray.get(completed_ids)):
+            remote = self.owners.pop(completed_id)
+            remote["tasks"].remove(completed_id)
+            remote["accumulated_steps"] += episode_steps
+            self.total_steps += episode_steps
 
-        # Process global worker
-        if self.local_task is None:
-            self.local_task = self.local["actor"].train.remote()
 
-        local_complete, _ = ray.wait([self.local_task], 1, timeout=.01)
-        if len(local_complete) > 0:
-            # Training task is done. Update weights on remotes
-            self.local_task = None
+@ray.remote
+class InferenceServer:
+    """
+    Serves the predictions of many EnvActors with one policy. Concurrent predict calls (the actor needs
+    max_concurrency of at least the number of environments) are batched into one forward pass (See InferenceBatcher).
+    """
+
+    def __init__(self, agent, agent_config, max_batch_size=64, max_latency=0.005, parameters=None):
+        self.agent = agent(**agent_config)
+        self.batcher = InferenceBatcher(self.agent.predict_batch, max_batch_size=max_batch_size,
+                                        max_latency=max_latency)
+        self.subscriber = ParameterSubscriber(parameters)
 
-            if ray.get(local_complete[0]):
+    def predict(self, state):
+        """(action, outputs) for one observation. See Agent.predict_batch."""
+        return self.batcher(state)
 
-                for remote in self.remotes:
-                    remote["actor"].set_weights.remote(
-                        self.local["actor"].get_weights.remote()
-                    )
+    def set_weights(self, weights):
+        with self.batcher.lock:
+            self.agent.policy.master.set_weights(weights)
+        return True
 
-        time.sleep(.01)
+    def sync(self):
+        """Pull the latest published weights. The trainer calls this after it published."""
+        weights = self.subscriber.pull()
+        if weights is not None:
+            self.set_weights(unflatten_weights(*weights))
+        return self.subscriber.version
 
+    def mean_batch_size(self):
+        return self.batcher.mean_batch_size()
 
 
 @ray.remote
 class EnvActor:
 
-    def __init__(self, env, agent, agent_config, remote=None):
-        """1. If env is a string, use as gym environment. If its a class, use "as is"."""
+    def __init__(self, env, agent, agent_config, remote=None, inference=None, parameters=None, export=False):
+        """
+        1. If env is a string, use as gym environment. If its a class, use "as is".
+        :param inference: InferenceServer the explorer predicts with, which the trainer keeps in sync
+        :param parameters: ParameterStore the trainer publishes to, and the explorers pull from
+        :param export: The trainer publishes the export of the policy (for RolloutActors) instead of its weights
+        """
         self.env = Environment(env)
         self.episodes = 1000
         self.remote = remote
+        self.inference = inference
+        self.subscriber = ParameterSubscriber(parameters)
+        self.export = export
 
         if remote:
             self.has_remote_agent = True
@@ -136,6 +149,10 @@ class EnvActor:
         """Initialize Agent"""
         self.agent = self._agent_class(**agent_config)
 
+        """The explorers start from the weights of the trainer."""
+        if not self.has_remote_agent:
+            self.publish()
+
     def set_weights(self, weights):
         print("Setting weights.")
         self.agent.policy.master.set_weights(weights)
@@ -145,13 +162,54 @@ class EnvActor:
     def get_weights(self):
         return self.agent.policy.master.get_weights()
 
+    def export_policy(self):
+        return self.agent.policy.master.export()
+
+    def publish(self):
+        """Put the weights into the object store once, flattened, and publish them as a new version."""
+        if self.subscriber.store is None:
+            return None
+
+        if self.export:
+            weights = self.export_policy()
+        else:
+            weights = self.get_weights()
+            weights = flatten_weights(weights), [w.shape for w in weights]
+        self.subscriber.version = ray.get(self.subscriber.store.publish.remote([ray.put(weights)]))
+
+        if self.inference is not None:
+            self.inference.sync.remote()
+        return self.subscriber.version
+
+    def sync(self):
+        """Pull the weights of the trainer, when it published since the last pull."""
+        weights = self.subscriber.pull()
+        if weights is not None:
+            self.set_weights(unflatten_weights(*weights))
+
+    def batch_config(self):
+        """Batch settings of the agent, for RolloutActors pushing to this actor."""
+        return dict(
+            buffer_mode=self.agent.buffer_mode,
+            buffer_size=self.agent.buffer_size,
+            batch_size=self.agent.batch_size
+        )
+
     def predict(self, state):
-        return self.agent.predict(state)
+        if self.inference is None:
+            return self.agent.predict(state)
 
-    def push_batch(self, batch):
+        action, outputs = ray.get(self.inference.predict.remote(state))
+        self.agent.set_prediction(state, outputs)
+        return action
 
+    def push_batch(self, batch):
+        """Add a batch of an explorer, and train (and publish the new weights) when the buffer is full."""
         self.agent.batch.extend(batch)
 
+        if self.trainer():
+            self.publish()
+
     def train(self):
         return self.run_episode()
 
@@ -169,15 +227,18 @@ class EnvActor:
         return True
 
     def explorer(self):
+        if self.inference is None:
+            self.sync()
+
         steps = 0
         self.env.reset()
         terminal = False
         while not terminal:
 
-            action = self.agent.predict(self.env.state)
+            action = self.predict(self.env.state)
             state1, reward, terminal, _ = self.env.step(action)
             self.agent.observe(
-                actions=tf.one_hot(action, self.agent.action_space),
+                actions=action,
                 rewards=reward,
                 terminals=terminal
             )
@@ -191,3 +252,6 @@ class EnvActor:
         if self.has_remote_agent and self.agent.batch.ready():
             self.remote.push_batch.remote(self.agent.batch.get())
             self.agent.batch.done()
+
+            if self.inference is None:
+                self.sync()
@@ -10,6 +10,7 @@ import numpy as np
 from experiments.experiment_5.per_rl import utils
 from experiments.experiment_5.per_rl.agents.configuration.models import PolicyManager
 from experiments.experiment_5.per_rl.storage.batch_handler import DynamicBatch
+from experiments.experiment_5.per_rl.storage.minibatch import MinibatchIterator
 from experiments.experiment_5.per_rl.utils.metrics import Metrics
 
 FLAGS = flags.FLAGS
@@ -47,6 +48,7 @@ def DecoratedAgent(cls, **kwargs):
 
 class Agent:
     SUPPORTED_BATCH_MODES = ["episodic", "steps"]
+    SUPPORTED_BATCH_PIPELINES = ["numpy", "tf.data"]
     SUPPORTED_PROCESSORS = ["batch", "mini-batch", "loss", "post"]
     DEFAULTS = dict()
 
@@ -59,6 +61,7 @@ class Agent:
                  buffer_size: int = 2048,
                  batch_shuffle=False,
                  batch_size: int = 32,
+                 batch_pipeline: str = "numpy",
                  epochs: int = 1,
                  grad_clipping=None,
                  dtype=tf.float32,
@@ -68,6 +71,7 @@ class Agent:
                  **kwargs):
         self.name = self.__class__.__name__
 
+        self.writer = None
         if tensorboard_enabled:
             logdir = os.path.join(
                 tensorboard_path, "%s_%s" %
@@ -75,8 +79,8 @@ class Agent:
                                       self.name + name_prefix if name_prefix else self.name,
                                       datetime.datetime.now().strftime("%m_%d_%Y_%H_%M_%S"))
             )
-            writer = tf.summary.create_file_writer(logdir)
-            writer.set_as_default()
+            self.writer = tf.summary.create_file_writer(logdir)
+            self.writer.set_as_default()
 
         """Define properties."""
         self.obs_space = obs_space
@@ -95,6 +99,7 @@ class Agent:
         self.buffer_size = buffer_size
         self.batch_size = batch_size
         self.batch_shuffle = batch_shuffle
+        self.batch_pipeline = batch_pipeline
 
         self.dtype = dtype
         self.grad_clipping = grad_clipping
@@ -125,6 +130,10 @@ class Agent:
             raise NotImplementedError("The batch mode %s is not supported. Use one of the following: %s" %
                                       (buffer_mode, Agent.SUPPORTED_BATCH_MODES))
 
+        if batch_pipeline not in Agent.SUPPORTED_BATCH_PIPELINES:
+            raise NotImplementedError("The batch pipeline %s is not supported. Use one of the following: %s" %
+                                      (batch_pipeline, Agent.SUPPORTED_BATCH_PIPELINES))
+
         self.batch = DynamicBatch(
             agent=self,
             obs_space=obs_space,
@@ -191,15 +200,37 @@ class Agent:
         """
         if inputs.ndim == 1:
             inputs = inputs[None, :]
-        self.data["inputs"] = inputs
 
         pred = self.policy(inputs)
-        self.data.update({
+        self.set_prediction(inputs, {
             "old_%s" % k: v for k, v in pred.items()
         })
 
         return pred
 
+    def set_prediction(self, inputs, outputs):
+        """
+        Record the inputs and policy outputs of a step for the next observe.
+        :param outputs: Policy outputs prefixed with old_, as returned by predict_batch
+        """
+        if inputs.ndim == 1:
+            inputs = inputs[None, :]
+        self.data["inputs"] = inputs
+        self.data.update(outputs)
+
+    def sample(self, pred):
+        """Sample one action per row from the policy outputs."""
+        raise NotImplementedError("The agent %s does not implement sample." % self.name)
+
+    def predict_batch(self, inputs):
+        """
+        Predict a batch of observations from many environments at once (See InferenceServer). Nothing is recorded, the
+        environment workers record their row with set_prediction.
+        :return: (actions, outputs) where outputs are the policy outputs prefixed with old_
+        """
+        pred = self.policy(inputs)
+        return self.sample(pred), {"old_%s" % k: np.asarray(v) for k, v in pred.items()}
+
     def predict(self, inputs):
         start = time.perf_counter()
         pred = self._predict(inputs)
@@ -311,27 +342,21 @@ class Agent:
         # Preprocess the data
         self._preprocessing(batch, ptype="batch", **kwargs)
 
-        # Retrieve batch indices for this batch
-        batch_indices = np.arange(self.batch.counter)
+        # Convert the batch once, minibatches are sliced or gathered from it.
+        minibatches = MinibatchIterator(batch, self.batch.batch_size, shuffle=self.batch_shuffle)
 
-        # Run number of epochs on the batch
+        # Run number of epochs on the batch, keeping the mean of every loss per epoch
+        epoch_losses = []
         for epoch in range(self.epochs):
 
-            #  Shuffle the batch indices if set
-            if self.batch_shuffle:
-                np.random.shuffle(batch_indices)
-
             # Iterate over mini-batches
+            iterator = minibatches.dataset() if self.batch_pipeline == "tf.data" else minibatches.epoch()
 
-            for i in range(0, self.batch.counter, self.batch.batch_size):
+            losses = [self._backprop(**mb, **kwargs) for mb in iterator]
+            epoch_losses.append(np.mean(losses, axis=0))
 
-                # Sample indices for the mini-batch
-                mb_indexes = batch_indices[i:i + self.batch.batch_size]
-
-                # Cast all elements to numpy arrays
-                mb = {k: np.asarray(v)[mb_indexes] for k, v in batch.items()}
-
-                losses = self._backprop(**mb, **kwargs)
+            """Update metrics for training"""
+            self.metrics.add("total", np.mean(losses), ["mean"], "loss", epoch=True, total=True)
 
         self.metrics.add("epochs", 1, ["sum"], "time/training", total=True, episode=True)
         self.metrics.done(epoch=True)
@@ -340,9 +365,5 @@ class Agent:
         self.udata.clear()
         self.epoch += 1
 
-
-        """Update metrics for training"""
-        self.metrics.add("total", np.mean(losses), ["mean"], "loss", epoch=True, total=True)
-        #self.metrics.add("backprop", time.perf_counter() - train_start, ["mean"], "time", epoch=True)
-
-        return losses
+        # Mean of every loss per epoch, (epochs, losses)
+        return np.asarray(epoch_losses)
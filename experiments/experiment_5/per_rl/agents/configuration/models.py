@@ -1,3 +1,4 @@
+import numpy as np
 import tensorflow as tf
 from tensorflow.python.training.tracking.data_structures import _DictWrapper
 
@@ -25,6 +26,10 @@ class PolicyManager:
         self.master = policy
         self.slaves = []
 
+        """Flat parameter and gradient buffers of the slaves and master (See _allocate)."""
+        self.weights = None
+        self.grads = None
+
         if self.double:
             policy_class = policy.__class__
             policy_classname = policy.__class__.__name__
@@ -50,12 +55,46 @@ class PolicyManager:
         """
         return self.master(*args)
 
+    def _allocate(self):
+        """
+        Allocate one flat float32 buffer for the parameters and one for the gradients, with a row per slave and a last
+        row for the master, and per-layer views into the master rows. Averaging over the slaves is then one mean over
+        the rows. Done on the first update, when the policies are built.
+        The master row holds the master weights between updates: with type "weights", the master (double only) is only
+        changed through set_weights from it, so it is not read back from TensorFlow. The slaves train in TensorFlow
+        and are read into their rows on every update.
+        """
+        weights = self.master.get_weights()
+        self.weight_shapes = [w.shape for w in weights]
+        self.weights = np.empty((len(self.slaves) + 1, sum(w.size for w in weights)), dtype=np.float32)
+        self.master_weights = utils.unflatten_weights(self.weights[-1], self.weight_shapes)
+        utils.flatten_weights(weights, out=self.weights[-1])
+
+        self.grad_shapes = [tuple(v.shape) for v in self.master.trainable_variables]
+        self.grads = np.empty((len(self.slaves) + 1, sum(int(np.prod(s)) for s in self.grad_shapes)),
+                              dtype=np.float32)
+        self.master_grads = utils.unflatten_weights(self.grads[-1], self.grad_shapes)
+
     def _master_optimize_grads(self):
 
         grads = [slave.grads for slave in self.slaves]
 
         if self.n_trainers > 1:
-            self.master.grads = utils.average_gradients(grads)
+            if self.grads is None:
+                self._allocate()
+
+            """tape.gradient returns None for variables a slave did not use. They count as zero in the mean, and stay
+            None for the master when no slave used them."""
+            unused = [all(slave_grads[j] is None for slave_grads in grads) for j in range(len(self.grad_shapes))]
+            for i, slave_grads in enumerate(grads):
+                utils.flatten_weights([
+                    np.zeros(shape, dtype=np.float32) if g is None else g
+                    for g, shape in zip(slave_grads, self.grad_shapes)
+                ], out=self.grads[i])
+            np.mean(self.grads[:-1], axis=0, out=self.grads[-1])
+
+            self.master.grads = [None if unused[j] else tf.convert_to_tensor(g)
+                                 for j, g in enumerate(self.master_grads)]
         else:
             self.master.grads = grads[0]
 
@@ -75,22 +114,26 @@ class PolicyManager:
 
     def _master_optimize_weights(self):
 
-        if self.strategy == "mean":
+        if self.weights is None:
+            self._allocate()
 
-            slave_weights = [slave.get_weights() for slave in self.slaves]
-            master_weights = [self.master.get_weights()]
+        if self.strategy == "mean":
 
-            weights = utils.average_weights(slave_weights + master_weights)
+            for i, slave in enumerate(self.slaves):
+                utils.flatten_weights(slave.get_weights(), out=self.weights[i])
 
-            self.master.set_weights(weights)
+            np.mean(self.weights, axis=0, out=self.weights[-1])
+            self.master.set_weights(self.master_weights)
 
         elif self.strategy == "copy":
 
             if self.n_trainers > 1:
 
-                slave_weights = [slave.get_weights() for slave in self.slaves]
-                weights = utils.average_weights(slave_weights)
-                self.master.set_weights(weights)
+                for i, slave in enumerate(self.slaves):
+                    utils.flatten_weights(slave.get_weights(), out=self.weights[i])
+
+                np.mean(self.weights[:-1], axis=0, out=self.weights[-1])
+                self.master.set_weights(self.master_weights)
             else:
                 for trainer in self.slaves:
                     self.master.set_weights(trainer.get_weights())
@@ -127,6 +170,10 @@ class Policy(tf.keras.models.Model):
     DEFAULTS = dict()
     arguments = utils.arguments
 
+    """The outputs of call as chains of Dense layer attributes, for export(). Outputs in SQUEEZED are squeezed."""
+    OUTPUTS = dict()
+    SQUEEZED = ()
+
     def __init__(self,
                  agent,
                  alias="root",
@@ -143,6 +190,37 @@ class Policy(tf.keras.models.Model):
     def reset(self):
         self.grads = None
 
+    def export(self):
+        """
+        Snapshot of the weights as plain NumPy arrays, for evaluation without TensorFlow (See NumpyPolicy).
+        :return: dict(outputs, squeezed, layers) where layers holds the kernel, bias and activation name of every layer
+        """
+        if not self.OUTPUTS:
+            raise NotImplementedError("The policy %s does not define its OUTPUTS and can not be exported." %
+                                      self.__class__.__name__)
+
+        if not self.built:
+            self(tf.zeros((1, ) + tuple(self.agent.obs_space.shape), dtype=self.agent.dtype))
+
+        layers = dict()
+        for name in {name for chain in self.OUTPUTS.values() for name in chain}:
+            layer = getattr(self, name)
+            if not isinstance(layer, tf.keras.layers.Dense):
+                raise NotImplementedError("Only Dense layers can be exported, %s is a %s." %
+                                          (name, layer.__class__.__name__))
+
+            layers[name] = dict(
+                kernel=layer.kernel.numpy(),
+                bias=layer.bias.numpy() if layer.use_bias else None,
+                activation=tf.keras.activations.serialize(layer.activation)
+            )
+
+        return dict(
+            outputs={k: tuple(v) for k, v in self.OUTPUTS.items()},
+            squeezed=tuple(self.SQUEEZED),
+            layers=layers
+        )
+
     def set_grads(self, grads):
         self.grads = grads
 
@@ -213,6 +291,9 @@ class Policy(tf.keras.models.Model):
 
 class PGPolicy(Policy):
     DEFAULTS = dict()
+    OUTPUTS = dict(
+        logits=("h_1", "h_2", "h_3", "logits")
+    )
 
     def __init__(self, **kwargs):
         super(PGPolicy, self).__init__(**kwargs)
@@ -246,6 +327,11 @@ class A2CPolicy(PGPolicy):
     Nice resources:
     Blog: http://steven-anker.nl/blog/?p=184
     """
+    OUTPUTS = dict(
+        logits=("h_1", "h_2", "h_3", "logits"),
+        action_value=("h_1", "h_2", "h_3", "h_4", "h_5", "h_6", "action_value")
+    )
+    SQUEEZED = ("action_value", )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -1,6 +1,7 @@
 import numpy as np
 import tensorflow as tf
 from experiments.experiment_5.per_rl.agents.agent import Agent, DecoratedAgent
+from experiments.experiment_5.per_rl import returns
 from experiments.experiment_5.per_rl.agents.ppo import defaults
 from experiments.experiment_5.per_rl.agents.ppo.losses import PPOLosses
 from experiments.experiment_5.per_rl.distribution.categorical import Categorical
@@ -42,10 +43,10 @@ class PPOAgent(Agent, PPOLosses):
 
     def _predict(self, inputs):
         pred = super()._predict(inputs)
-        logits = pred["logits"]
+        return np.squeeze(self.sample(pred))
 
-        sampled = tf.squeeze(tf.random.categorical(logits, 1))
-        return sampled.numpy()
+    def sample(self, pred):
+        return tf.random.categorical(pred["logits"], 1)[:, 0].numpy()
 
     def mb_neglogp(self, old_logits, logits, actions, **kwargs):
 
@@ -55,36 +56,21 @@ class PPOAgent(Agent, PPOLosses):
         )
 
     def generalized_advantage_estimation(self, old_values, last_obs, policy, rewards, terminals, **kwargs):
-        V = np.concatenate((old_values, [policy([last_obs])["values"]]))
-        terminal = np.concatenate((terminals, [0]))
-        gamma = self.args["gamma"]
-        lam = self.args["gae_lambda"]
-        adv = np.zeros_like(rewards)
-        lastgaelam = 0
-        for t in reversed(range(self.batch.counter)):
-            nextnonterminal = 1 - terminal[t + 1]
-            delta = rewards[t] + gamma * (V[t + 1] * nextnonterminal) - V[t]
-            adv[t] = lastgaelam = delta + gamma * lam * nextnonterminal * lastgaelam
-
-        returns = adv + old_values
+        adv, returns_ = returns.generalized_advantage_estimation(
+            rewards, old_values, self.args["gamma"], self.args["gae_lambda"], terminals=terminals,
+            bootstrap=np.squeeze(policy([last_obs])["values"])
+        )
 
         return dict(
             advantages=adv,
-            returns=returns
+            returns=returns_
         )
 
     def discounted_returns(self, rewards, terminals, old_values, **kwargs):
-        discounted_rewards = np.zeros_like(rewards)
-        advantage = np.zeros_like(rewards)
-        cum_r = 0
-        for i in reversed(range(0, self.batch.counter)):
-            cum_r = rewards[i] + cum_r * self.args["gamma"] * (1 - terminals[i])
-
-            discounted_rewards[i] = cum_r
-            advantage[i] = cum_r + old_values[i]
+        discounted_rewards = returns.discounted_returns(rewards, self.args["gamma"], terminals=terminals)
 
         return dict(
-            advantages=advantage,
+            advantages=discounted_rewards + old_values,
             returns=discounted_rewards
         )
 
@@ -16,6 +16,7 @@ class PPOLosses:
         # approxkl = .5 * tf.reduce_mean(tf.square(neglogpac_new - neglogpac_old))
         # self.metrics.add("approxkl", approxkl, ["mean"], "train", epoch=True)
 
+        actions = Categorical.one_hot(actions, logits.shape[-1])
         logp = tf.math.softmax(logits, axis=1) * actions
         logq = tf.math.softmax(old_logits, axis=1) * actions
 
@@ -4,6 +4,11 @@ from experiments.experiment_5.per_rl.agents.configuration.models import Policy
 
 
 class PPOPolicy(Policy):
+    OUTPUTS = dict(
+        logits=("p_1", "p_2", "logits"),
+        values=("p_1", "p_2", "action_value")
+    )
+    SQUEEZED = ("values", )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
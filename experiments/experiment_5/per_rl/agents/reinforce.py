@@ -5,6 +5,7 @@ import time
 
 from experiments.experiment_5.per_rl.agents.agent import Agent, DecoratedAgent
 from experiments.experiment_5.per_rl.agents.configuration import defaults
+from experiments.experiment_5.per_rl.distribution.categorical import Categorical
 
 FLAGS = flags
 logging.set_verbosity(logging.DEBUG)
@@ -28,14 +29,11 @@ class REINFORCE(Agent):
     def _predict(self, inputs):
         pred = super()._predict(inputs)
         action = tf.squeeze(tf.random.categorical(pred["logits"], 1))
-        self.data["action"] = tf.one_hot(action, self.action_space)
+        self.data["action"] = action.numpy()
         return action.numpy()
 
     def policy_loss(self, logits, action, advantage, **kwargs):
-        assert logits.shape == action.shape
-
-        log_prob = tf.math.log_softmax(logits, axis=1)
-        log_prob = advantage * tf.reduce_sum(log_prob * action, axis=1)
+        log_prob = advantage * Categorical.logpac(logits, action)
 
         return -tf.reduce_mean(log_prob)
 
@@ -9,8 +9,20 @@ class Categorical:
         logp = tf.math.log(x=p)
         return logp
 
+    @staticmethod
+    def one_hot(actions, depth):
+        """One-hot actions from integer actions, for the whole batch at once. One-hot actions are returned as is."""
+        actions = tf.convert_to_tensor(actions)
+        if actions.dtype.is_integer:
+            return tf.one_hot(actions, depth)
+        return actions
+
     @staticmethod
     def logpac(logits, actions):
+        """Log-probability of the actions, given as integers or one-hot."""
+        actions = tf.convert_to_tensor(actions)
+        if actions.dtype.is_integer:
+            return -tf.nn.sparse_softmax_cross_entropy_with_logits(labels=actions, logits=logits)
         return tf.reduce_sum(tf.math.log_softmax(logits, axis=1) * actions, axis=1)
 
     @staticmethod
@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def _row(result, i):
+    """Row i of a (nested) prediction result."""
+    if isinstance(result, dict):
+        return {k: _row(v, i) for k, v in result.items()}
+    if isinstance(result, (tuple, list)):
+        return type(result)(_row(v, i) for v in result)
+    return result[i]
+
+
+class InferenceBatcher:
+    """
+    Batches single observations from many callers into one forward pass. A background thread takes the pending
+    observations, waits at most max_latency seconds after the first one for more (up to max_batch_size), runs
+    predict_fn on the stacked batch and hands every caller its row of the result.
+    The thread holds lock during predict_fn; take it to change the model (e.g. set weights) between batches.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_latency=0.005):
+        """
+        :param predict_fn: Called with a (batch, *observation shape) array. Returns an array, or a tuple/dict of
+        arrays, with one row per observation.
+        :param max_batch_size: Largest batch passed to predict_fn
+        :param max_latency: Seconds the first observation of a batch waits for the batch to fill
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.lock = threading.Lock()
+
+        self.batches = 0
+        self.requests = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="InferenceBatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, observation):
+        """Queue an observation. Returns a Future of its row of the prediction."""
+        future = Future()
+        self._queue.put((np.asarray(observation), future))
+        return future
+
+    def __call__(self, observation):
+        return self.submit(observation).result()
+
+    def mean_batch_size(self):
+        return self.requests / self.batches if self.batches else 0.0
+
+    def _collect(self, first):
+        """The batch started by first. Returns (batch, stop)."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+
+            try:
+                with self.lock:
+                    result = self.predict_fn(np.stack([observation for observation, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            for i, (_, future) in enumerate(batch):
+                future.set_result(_row(result, i))
+
+    def close(self):
+        """Serve the pending observations and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,98 @@
+import numpy as np
+
+"""
+Evaluation of exported policies with NumPy only. Nothing in this module may import TensorFlow, it is what keeps the
+rollout processes (See rollout.py) free of it.
+"""
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = dict(
+    linear=lambda x: x,
+    relu=lambda x: np.maximum(x, 0, out=x),
+    tanh=lambda x: np.tanh(x, out=x),
+    sigmoid=lambda x: 1.0 / (1.0 + np.exp(-x)),
+    softmax=_softmax,
+)
+
+
+class NumpyPolicy:
+    """
+    Forward pass of a policy exported with Policy.export(): the outputs of the policy (e.g. logits and values) are
+    chains of dense layers, evaluated with one matrix product per layer. Layers shared by several outputs are evaluated
+    once per call. The weights are swapped with set_weights when the learner publishes new ones.
+    """
+
+    def __init__(self, spec, seed=None):
+        """
+        :param spec: Policy.export() of the trained policy
+        :param seed: Seed of the action sampling
+        """
+        self.outputs = {name: tuple(chain) for name, chain in spec["outputs"].items()}
+        self.squeezed = frozenset(spec["squeezed"])
+        self.random = np.random.RandomState(seed)
+        self.layers = None
+        self.set_weights(spec)
+
+    def set_weights(self, spec):
+        """Swap in the layers of a newer export of the same policy."""
+        layers = {}
+        for name, layer in spec["layers"].items():
+            if layer["activation"] not in ACTIVATIONS:
+                raise NotImplementedError("The activation %s of layer %s is not supported. Use one of the following: "
+                                          "%s" % (layer["activation"], name, list(ACTIVATIONS.keys())))
+            layers[name] = (np.asarray(layer["kernel"]),
+                            None if layer["bias"] is None else np.asarray(layer["bias"]),
+                            ACTIVATIONS[layer["activation"]])
+
+        missing = {name for chain in self.outputs.values() for name in chain} - layers.keys()
+        if missing:
+            raise ValueError("The exported policy is missing the layers %s." % sorted(missing))
+
+        """One assignment, so a concurrent __call__ sees either the old or the new weights."""
+        self.layers = layers
+
+    def __call__(self, inputs):
+        """
+        :param inputs: (batch, *observation shape) array, or a single observation
+        :return: Dict of outputs, like the policy returns them
+        """
+        x = np.asarray(inputs)
+        if x.ndim == 1:
+            x = x[None, :]
+
+        layers = self.layers
+        x = x.reshape(len(x), -1).astype(next(iter(layers.values()))[0].dtype, copy=False)
+
+        evaluated = {(): x}
+        pred = {}
+        for name, chain in self.outputs.items():
+            for i in range(1, len(chain) + 1):
+                if chain[:i] in evaluated:
+                    continue
+
+                kernel, bias, activation = layers[chain[i - 1]]
+                y = evaluated[chain[:i - 1]] @ kernel
+                if bias is not None:
+                    y += bias
+                evaluated[chain[:i]] = activation(y)
+
+            y = evaluated[chain]
+            pred[name] = np.squeeze(y) if name in self.squeezed else y
+
+        return pred
+
+    def sample(self, pred):
+        """One action per row from the categorical distribution of the logits (Gumbel-max trick)."""
+        logits = pred["logits"]
+        gumbel = -np.log(-np.log(self.random.uniform(np.finfo(logits.dtype).tiny, 1.0, size=logits.shape)))
+        return np.argmax(logits + gumbel, axis=-1)
+
+    def predict_batch(self, inputs):
+        """(actions, outputs) with the outputs prefixed with old_, like Agent.predict_batch."""
+        pred = self(inputs)
+        return self.sample(pred), {"old_%s" % k: v for k, v in pred.items()}
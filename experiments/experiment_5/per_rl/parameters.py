@@ -0,0 +1,49 @@
+import ray
+
+
+@ray.remote
+class ParameterStore:
+    """
+    Latest version of the learner's weights. The learner puts its weights into the object store once per version and
+    publishes the reference here. Workers ask for the version they hold at the start of an episode, and fetch the
+    weights only when a newer one was published, so nothing is sent per worker when the learner publishes.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.weights = None
+
+    def publish(self, weights):
+        """
+        :param weights: [ObjectRef] of the weights. Wrapped in a list, so ray does not fetch them into the store.
+        :return: The new version
+        """
+        self.version += 1
+        self.weights = weights
+        return self.version
+
+    def pull(self, version):
+        """(version, [ObjectRef]) of the latest weights, or None when version is the latest."""
+        if version == self.version:
+            return None
+        return self.version, self.weights
+
+
+class ParameterSubscriber:
+    """Version held by a worker, and the lazy pull of newer weights from a ParameterStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.version = 0
+
+    def pull(self):
+        """The weights of a newer version than the one held, or None."""
+        if self.store is None:
+            return None
+
+        latest = ray.get(self.store.pull.remote(self.version))
+        if latest is None:
+            return None
+
+        self.version, (weights, ) = latest
+        return ray.get(weights)
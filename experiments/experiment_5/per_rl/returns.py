@@ -0,0 +1,90 @@
+import numpy as np
+from scipy.signal import lfilter
+
+"""
+Discounted returns and generalized advantage estimation for whole batches, without a Python loop over the steps.
+
+Arrays are time-major: (steps, ) for one environment, or (steps, n_envs) for environments stepped in lockstep. Flat
+batches of interleaved environments ([env_0 step_0, env_1 step_0, ..., env_0 step_1, ...]) are reshaped with n_envs.
+terminals[t] marks that step t ended an episode, so nothing after it is discounted back into step t.
+"""
+
+
+def discount(x, gamma, terminals=None, bootstrap=None):
+    """
+    Reverse discounted sum y[t] = x[t] + gamma * (1 - terminals[t]) * y[t + 1], where y after the last step is
+    bootstrap.
+
+    The sum over the whole array is one linear filter (lfilter), which ignores the terminals. Steps before a terminal
+    then have the tail after the terminal subtracted: y[t] = z[t] - gamma ** (e + 1 - t) * z[e + 1] with e the first
+    terminal at or after t. The correction never divides by powers of gamma, so it is stable for long arrays.
+    :param x: (steps, ) or (steps, n_envs) array
+    :param terminals: Array like x. None for no terminals.
+    :param bootstrap: Value after the last step, a scalar or one per environment. Defaults to 0.
+    :return: float64 array like x
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        return discount(x[:, None], gamma, None if terminals is None else np.asarray(terminals)[:, None],
+                        None if bootstrap is None else np.reshape(bootstrap, (1, )))[:, 0]
+
+    steps, n_envs = x.shape
+    tail = np.zeros(n_envs) if bootstrap is None else np.broadcast_to(bootstrap, (n_envs, ))
+    x = np.concatenate([x, np.asarray(tail, dtype=np.float64)[None]])
+
+    z = lfilter([1.0], [1.0, -gamma], x[::-1], axis=0)[::-1]
+    if terminals is None:
+        return z[:steps]
+
+    terminal = np.asarray(terminals, dtype=np.bool_).reshape(steps, n_envs)
+    if not terminal.any():
+        return z[:steps]
+
+    """Index of the first terminal at or after every step (steps when there is none)."""
+    t = np.arange(steps)[:, None]
+    end = np.where(terminal, t, steps)
+    end = np.minimum.accumulate(end[::-1], axis=0)[::-1]
+
+    has_end = end < steps
+    after = np.where(has_end, end + 1, steps)
+    leak = np.take_along_axis(z, after, axis=0) * np.power(gamma, (after - t).astype(np.float64))
+    return z[:steps] - np.where(has_end, leak, 0.0)
+
+
+def _time_major(x, n_envs):
+    x = np.asarray(x)
+    return x if n_envs is None else x.reshape(-1, n_envs)
+
+
+def discounted_returns(rewards, gamma, terminals=None, bootstrap=None, n_envs=None):
+    """
+    Returns R[t] = rewards[t] + gamma * (1 - terminals[t]) * R[t + 1].
+    :param n_envs: Number of interleaved environments in flat arrays. The result is flat as well.
+    """
+    rewards = np.asarray(rewards)
+    returns = discount(_time_major(rewards, n_envs), gamma,
+                       terminals=None if terminals is None else _time_major(terminals, n_envs), bootstrap=bootstrap)
+    return returns.reshape(rewards.shape)
+
+
+def generalized_advantage_estimation(rewards, values, gamma, lam, terminals=None, bootstrap=None, n_envs=None):
+    """
+    GAE(gamma, lambda) advantages and the matching value targets (advantages + values).
+    delta[t] = rewards[t] + gamma * (1 - terminals[t]) * values[t + 1] - values[t]
+    advantages[t] = delta[t] + gamma * lam * (1 - terminals[t]) * advantages[t + 1]
+    :param values: Value estimates of the states the steps were taken from
+    :param bootstrap: Value estimate of the state after the last step (per environment). Defaults to 0.
+    :param n_envs: Number of interleaved environments in flat arrays. The results are flat as well.
+    :return: (advantages, returns)
+    """
+    shape = np.shape(rewards)
+    r = _time_major(rewards, n_envs).astype(np.float64)
+    v = _time_major(values, n_envs).astype(np.float64).reshape(r.shape)
+    m = 1.0 if terminals is None else 1.0 - _time_major(terminals, n_envs).astype(np.float64).reshape(r.shape)
+
+    tail = np.zeros(r.shape[1:]) if bootstrap is None else np.broadcast_to(bootstrap, r.shape[1:])
+    v_next = np.concatenate([v[1:], np.asarray(tail, dtype=np.float64)[None]])
+    delta = r + gamma * m * v_next - v
+
+    advantages = discount(delta, gamma * lam, terminals=None if terminals is None else _time_major(terminals, n_envs))
+    return advantages.reshape(shape), (advantages + v).reshape(shape)
@@ -2,6 +2,7 @@ from absl import flags, app
 
 from deep_logistics.action_space import ActionSpace
 from deep_logistics.agent import ManhattanAgent
+from deep_logistics.dataset import DatasetWriter
 from experiments.experiment_5.environment import Environment
 from experiments.experiment_5.per_rl.agents.ppo.agent import PPOAgent
 from experiments.experiment_5.per_rl.agents.a2c import A2C
@@ -10,6 +11,10 @@ from experiments.experiment_5.per_rl.agents.reinforce import REINFORCE
 FLAGS = flags.FLAGS
 
 flags.DEFINE_boolean("callgraph", True, help="Creates a callgraph of the algorithm")
+flags.DEFINE_string("demonstrations", None, help="Dataset directory the expert transitions of the curriculum epochs "
+                                                 "are written to (See deep_logistics.dataset)")
+flags.DEFINE_integer("curriculum_epochs", 0, help="Number of epochs to do \"supervised\" learning (knowledge "
+                                                   "injection) with the actions of the ManhattanAgent expert")
 
 import gym
 import gym_deep_logistics.gym_deep_logistics
@@ -35,7 +40,7 @@ def main(argv):
         agent = AGENT(**spec)
 
         # Number of epochs to do "supervised" learning (knowledge injection)
-        curriculum_epochs = 0
+        curriculum_epochs = FLAGS.curriculum_epochs
 
         env = Environment(env_name)
         agent.set_env(env)
@@ -43,26 +48,45 @@ def main(argv):
         # Control set for manhattan distance
         manhattan_control = ManhattanAgent.automate
         is_deep_logisitcs = "deep-logistics" in env_name
-
-        while env.episode < episodes:
-
-            action = agent.predict(env.state)
-
-            if agent.epoch < curriculum_epochs and is_deep_logisitcs:
-                action = manhattan_control(env.env.agent, perform_action=False)
-            state1, reward, terminal, info = agent.step(action)
-
-            if is_deep_logisitcs and terminal:
-                agent.metrics.add("deliveries", info["deliveries"], ["sum"], "game", episode=True, epoch=False, total=False)
-                agent.metrics.add("pickups", info["pickups"], ["sum"], "game", episode=True, epoch=False, total=False)
-
-            agent.observe(
-                actions=tf.one_hot(action, agent.action_space),
-                rewards=reward,
-                terminals=terminal
-            )
-
-            agent.train()
+        if FLAGS.demonstrations and not (is_deep_logisitcs and curriculum_epochs > 0):
+            raise app.UsageError("--demonstrations records the expert actions of the curriculum. It requires a "
+                                 "deep-logistics environment and --curriculum_epochs > 0.")
+        demonstrations = DatasetWriter(FLAGS.demonstrations) if FLAGS.demonstrations else None
+
+        try:
+            while env.episode < episodes:
+
+                state = env.state
+                action = agent.predict(state)
+
+                expert = agent.epoch < curriculum_epochs and is_deep_logisitcs
+                if expert:
+                    action = manhattan_control(env.env.agent, perform_action=False)
+                state1, reward, terminal, info = agent.step(action)
+
+                if demonstrations is not None:
+                    if expert:
+                        demonstrations.add(state, action, reward, terminal)
+                    else:
+                        # The curriculum is over, write the last shard.
+                        demonstrations.close()
+                        demonstrations = None
+
+                if is_deep_logisitcs and terminal:
+                    agent.metrics.add("deliveries", info["deliveries"], ["sum"], "game", episode=True, epoch=False, total=False)
+                    agent.metrics.add("pickups", info["pickups"], ["sum"], "game", episode=True, epoch=False, total=False)
+
+                agent.observe(
+                    actions=action,
+                    rewards=reward,
+                    terminals=terminal
+                )
+
+                agent.train()
+        finally:
+            if demonstrations is not None:
+                # Training ended (or failed) during the curriculum, keep the transitions written so far.
+                demonstrations.close()
 
     env = gym.make(env_name)
     if not benchmark:
@@ -2,6 +2,15 @@ import numpy as np
 
 
 class DynamicBatch:
+    """
+    Columnar transition storage. Every key is one preallocated array whose row shape and dtype are inferred from the
+    first transition, and transitions are written into it in place. get() returns views of the filled rows, so they are
+    only valid until the next add/extend after done().
+
+    Steps mode preallocates buffer_size rows. Episodic mode starts at INITIAL_CAPACITY rows instead of its
+    1,000,000 row limit. Both grow geometrically when more rows are added (e.g. batches pushed by remote workers).
+    """
+    INITIAL_CAPACITY = 4096
 
     def __init__(self, agent, **kwargs):
         self.agent = agent
@@ -11,19 +20,47 @@ class DynamicBatch:
         self.batch_count = 1 if self.episodic else int(self.buffer_size / self.batch_size)
         self.dtype = agent.dtype
 
+        self.capacity = min(self.buffer_size, DynamicBatch.INITIAL_CAPACITY) if self.episodic else self.buffer_size
         self.counter = 0
-        self.data = {}  # Array of dicts.
+        self.data = {}  # Column per key, (capacity, *shape).
 
-    def add(self, **kwargs):
+    def _reserve(self, n):
+        """Grow all columns to hold at least n rows."""
+        if n <= self.capacity:
+            return
 
-        for k, v in kwargs.items():
-            try:
-                self.data[k]
-            except KeyError:
+        capacity = max(n, 2 * self.capacity)
+        for k, column in self.data.items():
+            grown = np.empty((capacity, ) + column.shape[1:], dtype=column.dtype)
+            grown[:self.counter] = column[:self.counter]
+            self.data[k] = grown
+        self.capacity = capacity
 
-                self.data[k] = []
+    def _column(self, k, dtype, shape):
+        """
+        Column of key k, allocated for the first row or promoted when dtype does not fit into it. A key that first
+        appears in the middle of a batch has no values for the rows before it, they are filled with zeros.
+        """
+        column = self.data.get(k)
+        if column is None:
+            column = self.data[k] = np.empty((self.capacity, ) + shape, dtype=dtype)
+            column[:self.counter] = 0
+        elif column.dtype != dtype and not np.can_cast(dtype, column.dtype, casting="same_kind"):
+            column = self.data[k] = column.astype(np.result_type(column.dtype, dtype))
+        return column
 
-            self.data[k].append(np.squeeze(v))
+    def add(self, **kwargs):
+        if self.counter >= self.capacity:
+            self._reserve(self.counter + 1)
+
+        i = self.counter
+        data = self.data
+        for k, v in kwargs.items():
+            v = np.squeeze(v)
+            column = data.get(k)
+            if column is None or column.dtype != v.dtype:
+                column = self._column(k, v.dtype, v.shape)
+            column[i] = v
 
         self.counter += 1
         if self.episodic:
@@ -38,16 +75,20 @@ class DynamicBatch:
         return self.counter >= self.buffer_size
 
     def get(self):
-        return {k: np.asarray(v) for k, v in self.data.items()}
+        return {k: column[:self.counter] for k, column in self.data.items()}
 
     def extend(self, data):
+        """Append a batch of rows, e.g. the get() of a remote worker, with one slice assignment per key."""
+        data = {k: np.asarray(v) for k, v in data.items()}
+        n = len(next(iter(data.values())))
+        self._reserve(self.counter + n)
+
         for k, v in data.items():
-            if k not in self.data:
-                self.data[k] = []
-            self.data[k].extend(v)
+            if len(v) == 0:
+                continue
+            self._column(k, v.dtype, v.shape[1:])[self.counter:self.counter + n] = v
 
-        self.counter += len(data[list(data.keys())[0]])
+        self.counter += n
 
     def done(self):
-        self.data = {k: [] for k in self.data.keys()}
         self.counter = 0
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class MinibatchIterator:
+    """
+    Minibatches of a training batch over several epochs. The batch is converted to arrays once. Minibatches of an
+    unshuffled batch are views into the columns. Shuffled minibatches are gathered with one shuffled index array, into
+    preallocated buffers for the multi-dimensional columns (e.g. observations). The buffers are reused by the next
+    minibatch.
+    """
+
+    def __init__(self, batch, batch_size, shuffle=False):
+        """
+        :param batch: Dict of per-row data, e.g. DynamicBatch.get() after the batch processors
+        :param batch_size: Rows per minibatch. The last minibatch of an epoch holds the remainder.
+        :param shuffle: Shuffle the rows every epoch
+        """
+        self.columns = {k: np.asarray(v) for k, v in batch.items()}
+        self.n = len(next(iter(self.columns.values()))) if self.columns else 0
+        self.batch_size = max(1, min(batch_size, self.n))
+        self.shuffle = shuffle
+
+        self.indices = np.arange(self.n)
+        self.buffers = {
+            k: np.empty((self.batch_size, ) + column.shape[1:], dtype=column.dtype)
+            for k, column in self.columns.items() if shuffle and column.ndim > 1
+        }
+
+        self._dataset = None
+
+    def __len__(self):
+        """Minibatches per epoch."""
+        return -(-self.n // self.batch_size)
+
+    def epoch(self):
+        """Iterate over the minibatches of one epoch, as dicts of arrays."""
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+        for start in range(0, self.n, self.batch_size):
+            end = min(start + self.batch_size, self.n)
+
+            if not self.shuffle:
+                yield {k: column[start:end] for k, column in self.columns.items()}
+                continue
+
+            indices = self.indices[start:end]
+            yield {
+                k: np.take(column, indices, axis=0, out=self.buffers[k][:end - start], mode="clip")
+                if k in self.buffers else column[indices]
+                for k, column in self.columns.items()
+            }
+
+    def dataset(self, prefetch=None):
+        """
+        The batch as one tf.data pipeline with prefetching, built once. Iterating over it runs one epoch and yields
+        minibatches as dicts of tensors. Shuffled pipelines are reshuffled every epoch.
+        TensorFlow is imported here, so the NumPy epoch() path does not depend on it.
+        :param prefetch: Minibatches to prefetch. Defaults to tf.data.experimental.AUTOTUNE.
+        """
+        import tensorflow as tf
+
+        if prefetch is None:
+            prefetch = tf.data.experimental.AUTOTUNE
+
+        if self._dataset is None:
+            dataset = tf.data.Dataset.from_tensor_slices(self.columns)
+            if self.shuffle:
+                dataset = dataset.shuffle(self.n, reshuffle_each_iteration=True)
+            self._dataset = dataset.batch(self.batch_size).prefetch(prefetch)
+
+        return self._dataset
@@ -1,9 +1,58 @@
+import atexit
+import threading
 from collections import deque
 from absl import logging
 import tensorflow as tf
 import numpy as np
 
 
+class SummaryWriter:
+    """
+    Writes summaries from a background thread. Summaries are buffered and written in batches every flush_interval
+    seconds, so a summary costs the caller one list append. tf.summary writers are set as default per thread, so the
+    thread writes with the writer it was given.
+    """
+
+    def __init__(self, writer, flush_interval=1.0):
+        self.writer = writer
+        self.flush_interval = flush_interval
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SummaryWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, fn, name, data, step):
+        """Write fn(name, data, step), e.g. tf.summary.scalar, on the next flush."""
+        with self._lock:
+            self._pending.append((fn, name, data, step))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        if not pending:
+            return
+
+        with self.writer.as_default():
+            for fn, name, data, step in pending:
+                fn(name, data, step)
+        self.writer.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Write the buffered summaries and stop the thread."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
 
 class Sum:
 
@@ -26,38 +75,79 @@ class Sum:
 
 
 class Mean:
+    """
+    Mean of the values since the last reset, and of the last 10 (series) and all (total) reset values. The values are
+    kept as running sums, not lists, so nothing grows with the number of steps or resets.
+    """
 
     def __init__(self, sum_at_reset=False):
-        self.data = []
+        self.sum = 0.0
+        self.count = 0
         self.series = deque(maxlen=10)
-        self.series_total = []
-        self.op = np.mean
-        self.reset_op = np.sum if sum_at_reset else np.mean
+        self.sum_at_reset = sum_at_reset
+
+        self.total_sum = 0.0
+        self.total_count = 0
 
     def __call__(self, v):
-        self.data.append(v)
+        self.sum += v
+        self.count += 1
+
+    def value(self):
+        """The value at reset: the sum, or the mean of the values since the last reset."""
+        if self.sum_at_reset:
+            return self.sum
+        return self.sum / self.count if self.count else np.nan
 
     def results(self, total=False):
 
-        if total and len(self.series_total) > 0:
-            return self.op(self.series_total)
+        if total and self.total_count > 0:
+            return self.total_sum / self.total_count
         elif not total and len(self.series) > 0:
-            return self.op(self.series)
+            return np.mean(self.series)
         else:
-            return self.op(self.data)
+            return self.sum / self.count if self.count else np.nan
 
     def reset_states(self):
-        calc = self.reset_op(self.data)
+        calc = self.value()
         self.series.append(calc)
-        self.series_total.append(calc)
-        self.data = []
+        self.total_sum += calc
+        self.total_count += 1
+        self.sum = 0.0
+        self.count = 0
+
+
+def _std(s, sq, n):
+    return np.sqrt(max(sq / n - (s / n) ** 2, 0.0)) if n else np.nan
 
 
 class Stddev(Mean):
+    """Standard deviation instead of the mean of Mean, from running sums of squares."""
 
     def __init__(self):
         super().__init__()
-        self.op = np.std
+        self.sumsq = 0.0
+        self.total_sumsq = 0.0
+
+    def __call__(self, v):
+        self.sum += v
+        self.sumsq += v * v
+        self.count += 1
+
+    def results(self, total=False):
+
+        if total and self.total_count > 0:
+            return _std(self.total_sum, self.total_sumsq, self.total_count)
+        elif not total and len(self.series) > 0:
+            return np.std(self.series)
+        else:
+            return _std(self.sum, self.sumsq, self.count)
+
+    def reset_states(self):
+        calc = self.value()
+        self.total_sumsq += calc * calc
+        self.sumsq = 0.0
+        super().reset_states()
 
 
 class GenericMetric:
@@ -82,7 +172,8 @@ class GenericMetric:
         self.data_types = dict(
             mean=Mean,
             sum=Sum,
-            sum_mean=lambda: Mean(sum_at_reset=True)
+            sum_mean=lambda: Mean(sum_at_reset=True),
+            stddev=Stddev
         )
 
         self.data = dict(
@@ -96,6 +187,10 @@ class GenericMetric:
         if self.epoch:
             self.data["epoch"](a)
 
+    def accumulators(self):
+        """The data the added values go to."""
+        return [self.data[t] for t, enabled in (("episode", self.episode), ("epoch", self.epoch)) if enabled]
+
     def done(self, episode=False, epoch=False):
 
         types = []
@@ -140,6 +235,12 @@ class Metrics:
 
         self.step_counter = dict()
 
+        """Accumulators of every metric name, so add does one lookup (See add)."""
+        self.accumulators = dict()
+
+        """Summaries are only written when the agent has a tensorboard writer."""
+        self.writer = None if agent.writer is None else SummaryWriter(agent.writer)
+
         self.metrics = {
             t: {} for t in Metrics.supported.keys()
         }
@@ -165,12 +266,28 @@ class Metrics:
         if epoch:
             summary_category = "epoch"
 
-        logging.log(logging.DEBUG, " | ".join(["%s: %s" % (k, v) for k, v in self.summary_data[summary_category].items()]))
+        if logging.level_debug():
+            logging.log(logging.DEBUG, " | ".join(["%s: %s" % (k, v) for k, v in self.summary_data[summary_category].items()]))
 
     def get(self, name):
         return self.metrics[name]
 
     def add(self, name, value, types, tags, episode=False, epoch=False, total=False):
+        """
+        Add a value to the metric name. The first add of a name creates its metrics, the types, tags and scopes of
+        later adds are not looked at.
+        """
+        try:
+            accumulators = self.accumulators[name]
+        except KeyError:
+            accumulators = self.accumulators[name] = self._create(name, types, tags, episode, epoch, total)
+
+        value = float(value)
+        for accumulator in accumulators:
+            accumulator(value)
+
+    def _create(self, name, types, tags, episode, epoch, total):
+        accumulators = []
 
         # There is no metric of that name
         for type in types:
@@ -188,7 +305,9 @@ class Metrics:
                     total=total
                 )
 
-            self.metrics[type][name](float(value))
+            accumulators.extend(self.metrics[type][name].accumulators())
+
+        return accumulators
 
     def done(self, episode=False, epoch=False):
         if episode:
@@ -205,15 +324,24 @@ class Metrics:
         try:
             measure_val = self.measures[measure]
             self.summary_data[measure][name] = data
-            tf.summary.scalar("%s" % name, data, measure_val)
         except KeyError:
             raise KeyError("Could not find the measure type %s in supported measures!" % measure)
 
+        if self.writer is not None:
+            self.writer.write(tf.summary.scalar, "%s" % name, data, measure_val)
+
     def text(self, name, data):
-        tf.summary.text(name, data, 0)
+        if self.writer is not None:
+            self.writer.write(tf.summary.text, name, data, 0)
 
     def histogram(self, name, distribution):
         if name not in self.step_counter:
             self.step_counter[name] = 0
-        tf.summary.histogram(name, distribution, self.step_counter[name])
+        if self.writer is not None:
+            self.writer.write(tf.summary.histogram, name, distribution, self.step_counter[name])
         self.step_counter[name] += 1
+
+    def close(self):
+        """Write the buffered summaries."""
+        if self.writer is not None:
+            self.writer.close()
@@ -31,3 +31,24 @@ def average_weights(weights):
     for weight in list(zip(*weights)):
         average_weights.append(tf.reduce_mean(weight, axis=0))
     return average_weights
+
+
+def flatten_weights(weights, out=None):
+    """
+    The weights (arrays or tensors, e.g. Model.get_weights()) as one contiguous array.
+    :param out: Flat array to write into, e.g. a row of a preallocated buffer
+    """
+    if not weights:
+        return np.empty(0) if out is None else out
+    return np.concatenate([np.ravel(w) for w in weights], out=out)
+
+
+def unflatten_weights(flat, shapes):
+    """The weights of flatten_weights, as views into flat."""
+    weights = []
+    offset = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        weights.append(flat[offset:offset + size].reshape(shape))
+        offset += size
+    return weights
@@ -0,0 +1,118 @@
+import sys
+
+import gym
+import numpy as np
+import ray
+from gym_deep_logistics import gym_deep_logistics
+
+from experiments.experiment_5.per_rl.numpy_policy import NumpyPolicy
+from experiments.experiment_5.per_rl.parameters import ParameterSubscriber
+from experiments.experiment_5.per_rl.storage.batch_handler import DynamicBatch
+
+"""
+Rollout workers that do not import TensorFlow. Keep the imports of this module (and of everything it imports) free of
+it, the RolloutActor processes import nothing else.
+"""
+
+
+class Environment:
+
+    def __init__(self, env, episodes=sys.maxsize):
+
+        if isinstance(env, str):
+            self.env = gym.make(env)
+        else:
+            self.env = env
+            # TODO - Make has attribute checks for step, reset.. etc
+        self.episode = 0
+        self.max_episode = episodes
+        self.steps = 0
+
+        self.state = self.env.reset()
+        self.next_state = None
+        self.reward = None
+        self.terminal = None
+        self.info = None
+
+    def step(self, action):
+        self.state, self.reward, self.terminal, self.info = self.env.step(action)
+        #self.reward = 0 if self.terminal else self.reward # Discounting should handle this anyway.
+
+        self.steps += 1
+        if self.terminal:
+            self.steps = 0
+            self.state = self.env.reset()
+            self.episode += 1
+
+        # S, A, R, T
+        #state = self.state
+        #self.state = self.next_state
+        return self.state, self.reward, self.terminal, self.info
+
+    def reset(self):
+        return self.env.reset()
+
+
+@ray.remote
+class RolloutActor:
+    """
+    Explorer like EnvActor, but acting with a NumpyPolicy exported from the trainer instead of a TensorFlow agent. The
+    transitions are the ones the agent would have observed, and are pushed to the trainer when the batch is full.
+    Episode metrics are not recorded, as they are written to tensorboard by the agent.
+    """
+
+    def __init__(self, env, policy, trainer, batch_config, parameters=None, seed=None):
+        """
+        :param policy: Policy.export() of the trainer policy
+        :param trainer: EnvActor which trains on the pushed batches
+        :param batch_config: EnvActor.batch_config() of the trainer
+        :param parameters: ParameterStore the trainer publishes its exports to
+        """
+        self.env = Environment(env)
+        self.policy = NumpyPolicy(policy, seed=seed)
+        self.remote = trainer
+        self.subscriber = ParameterSubscriber(parameters)
+
+        """Batch settings of the trainer agent, read by DynamicBatch."""
+        self.buffer_mode = batch_config["buffer_mode"]
+        self.buffer_size = batch_config["buffer_size"]
+        self.batch_size = batch_config["batch_size"]
+        self.dtype = np.float32
+        self.batch = DynamicBatch(agent=self)
+
+    def set_weights(self, policy):
+        self.policy.set_weights(policy)
+        self.batch.done()
+        return True
+
+    def sync(self):
+        """Swap in the policy the trainer published since the last pull."""
+        policy = self.subscriber.pull()
+        if policy is not None:
+            self.set_weights(policy)
+
+    def train(self):
+        self.sync()
+
+        steps = 0
+        terminal = False
+        while not terminal:
+
+            inputs = np.asarray(self.env.state)[None, :]
+            action, outputs = self.policy.predict_batch(inputs)
+            state1, reward, terminal, _ = self.env.step(action[0])
+            self.batch.add(
+                inputs=inputs,
+                actions=action[0],
+                rewards=reward,
+                terminals=terminal,
+                **outputs
+            )
+            steps += 1
+
+            if self.batch.ready():
+                self.remote.push_batch.remote(self.batch.get())
+                self.batch.done()
+                self.sync()
+
+        return steps
@@ -39,14 +39,23 @@ class DeepLogisticsNormal(gym.Env):
 
     def step(self, action):
 
-        self.agent.do_action(action)
+        """
+        Hold the action for frame_skip updates (counted once, see Agent.do_action). Rewards are summed, the loop stops
+        early on terminal and the environment is rendered after the last update.
+        """
+        reward = 0
+        terminal = False
+        for tick in range(self.frame_skip):
+            self.agent.do_action(action, repeat=tick > 0)
+            self.env.update()
 
-        #for _ in range(self.frame_skip):  # TODO will fuck up reward
-        self.env.update()
+            r, terminal = Reward0(self.agent)
+            reward += r
+            if terminal:
+                break
         self.env.render()
 
         state1 = self.sgen.generate(self.agent)
-        reward, terminal = Reward0(self.agent)
         if terminal:
             info = dict(
                 deliveries=self.agent.total_deliveries,
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from experiments.experiment_5.per_rl.storage.batch_handler import DynamicBatch
+
+
+class Agent:
+    buffer_mode = "steps"
+    buffer_size = 16
+    batch_size = 4
+    dtype = np.float32
+
+
+def test_add_and_get():
+    batch = DynamicBatch(agent=Agent())
+    for i in range(Agent.buffer_size):
+        full = batch.add(inputs=np.full((1, 3), i, dtype=np.float32), actions=i, terminals=i % 5 == 4)
+        assert full == (i == Agent.buffer_size - 1)
+
+    data = batch.get()
+    np.testing.assert_array_equal(data["inputs"], np.repeat(np.arange(16, dtype=np.float32)[:, None], 3, axis=1))
+    np.testing.assert_array_equal(data["actions"], np.arange(16))
+    np.testing.assert_array_equal(data["terminals"], np.arange(16) % 5 == 4)
+
+
+@pytest.mark.parametrize("value", [1.5, np.ones(2, dtype=np.int64), True])
+def test_key_added_mid_batch(value):
+    batch = DynamicBatch(agent=Agent())
+    for i in range(5):
+        if i < 3:
+            batch.add(inputs=np.ones(3))
+        else:
+            batch.add(inputs=np.ones(3), late=value)
+
+    late = batch.get()["late"]
+    assert len(late) == 5
+    assert not late[:3].any()
+    np.testing.assert_array_equal(late[3:], [value, value])
+
+
+def test_extend_grows_and_promotes():
+    batch = DynamicBatch(agent=Agent())
+    batch.add(rewards=np.int8(1))
+    batch.extend(dict(rewards=np.linspace(0, 1, 40), values=np.ones(40)))
+
+    data = batch.get()
+    assert batch.capacity >= 41
+    assert data["rewards"].dtype == np.float64
+    np.testing.assert_array_equal(data["rewards"], np.concatenate([[1.0], np.linspace(0, 1, 40)]))
+    np.testing.assert_array_equal(data["values"], np.concatenate([[0.0], np.ones(40)]))
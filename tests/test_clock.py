@@ -0,0 +1,119 @@
+import pytest
+
+from deep_logistics.clock import Clock
+
+
+class FakeTime:
+    """Manual time source. sleep advances it, work is simulated with advance."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def clock(**kwargs):
+    fake = FakeTime()
+    return Clock(time_fn=fake.time, sleep_fn=fake.sleep, **kwargs), fake
+
+
+def test_updates_due_accumulates_fixed_steps():
+    c, fake = clock(ups=10)
+    assert c.updates_due() == 0
+
+    fake.advance(0.25)
+    assert c.updates_due() == 2
+    assert c.accumulator == pytest.approx(0.05)
+
+    fake.advance(0.06)
+    assert c.updates_due() == 1
+    assert c.accumulator == pytest.approx(0.01)
+
+    fake.advance(0.05)
+    assert c.updates_due(max_updates=5) == 0
+
+
+def test_updates_due_resyncs_after_max_lag():
+    c, fake = clock(ups=10, max_lag=0.25)
+    c.updates_due()
+
+    fake.advance(1.0)
+    assert c.updates_due() == 2  # int(max_lag / interval)
+    assert c.resyncs == 1
+    assert c.accumulator == 0.0
+
+    fake.advance(0.15)
+    assert c.updates_due() == 1
+
+
+def test_tick_compensates_for_update_time():
+    c, fake = clock(ups=10)
+    c.reset()
+    start = fake.now
+
+    for work in [0.02, 0.05, 0.09, 0.0, 0.03]:
+        fake.advance(work)
+        c.tick()
+
+    """Every update ends on its absolute deadline, however long the update took."""
+    assert fake.now == pytest.approx(start + 0.5)
+    assert fake.sleeps == pytest.approx([0.08, 0.05, 0.01, 0.1, 0.07])
+    assert c.updates == 5 and c.resyncs == 0
+
+
+def test_tick_catches_up_then_resyncs_after_max_lag():
+    c, fake = clock(ups=10, max_lag=0.25)
+    c.tick()
+
+    """Behind by 0.05 s: the next update runs without sleeping and the deadline is kept."""
+    fake.advance(0.15)
+    c.tick()
+    assert len(fake.sleeps) == 1 and c.resyncs == 0
+    c.tick()
+    assert fake.sleeps[-1] == pytest.approx(0.05)
+
+    """Behind by more than max_lag: the backlog is dropped and the schedule restarts from now."""
+    fake.advance(1.0)
+    c.tick()
+    assert c.resyncs == 1
+    now = fake.now
+    c.tick()
+    assert fake.now == pytest.approx(now + 0.1)
+
+
+def test_should_render_at_fps():
+    c, fake = clock(ups=100, fps=20)
+
+    rendered = []
+    for _ in range(100):
+        rendered.append(c.should_render())
+        fake.advance(0.01)
+
+    """One second of 10 ms ticks at 20 fps: every fifth tick renders."""
+    assert sum(rendered) == 20
+    assert rendered[:6] == [True, False, False, False, False, True]
+    assert c.renders == 20
+
+
+@pytest.mark.parametrize("ups, fps", [(None, None), (0, 0)])
+def test_unbounded(ups, fps):
+    c, fake = clock(ups=ups, fps=fps)
+    assert c.unbounded
+
+    for _ in range(10):
+        fake.advance(0.3)
+        c.tick()
+        assert c.updates_due() == 1
+        assert c.should_render()
+
+    assert fake.sleeps == []
+    assert c.updates == 10 and c.renders == 10 and c.resyncs == 0
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from deep_logistics.dataset import DatasetReader, DatasetWriter
+
+
+def write(writer, start, n):
+    for i in range(start, start + n):
+        writer.add(np.full(4, i, dtype=np.float32), i % 5, float(i), i % 7 == 0)
+
+
+def shards(path):
+    return sorted(name for name in os.listdir(path) if name.startswith("shard-"))
+
+
+def test_readers_see_complete_shards_only(tmp_path):
+    path = str(tmp_path)
+    writer = DatasetWriter(path, shard_size=100, name="a")
+    write(writer, 0, 250)
+
+    """Two full shards are in place, the third is still filled in a hidden temporary directory."""
+    assert shards(path) == ["shard-a-000000", "shard-a-000001"]
+    assert len(DatasetReader(path)) == 200
+
+    reader = DatasetReader(path)
+    writer.close()
+    assert len(reader) == 200
+    reader.refresh()
+    assert len(reader) == 250
+    assert sorted(os.listdir(path)) == ["shard-a-000000", "shard-a-000001", "shard-a-000002"]
+
+
+def test_last_shard_is_truncated(tmp_path):
+    path = str(tmp_path)
+    with DatasetWriter(path, shard_size=100, name="a") as writer:
+        write(writer, 0, 130)
+
+    last = os.path.join(path, "shard-a-000001")
+    for name in ["obs", "actions", "rewards", "terminals"]:
+        assert np.load(os.path.join(last, name + ".npy"), mmap_mode="r").shape[0] == 30
+    assert sorted(os.listdir(last)) == ["actions.npy", "meta.json", "obs.npy", "rewards.npy", "terminals.npy"]
+
+
+def test_epoch_covers_every_row_once(tmp_path):
+    path = str(tmp_path)
+    with DatasetWriter(path, shard_size=64, name="a") as writer:
+        write(writer, 0, 500)
+    with DatasetWriter(path, shard_size=64, name="b") as writer:
+        write(writer, 500, 77)
+
+    reader = DatasetReader(path, seed=0)
+    assert len(reader) == 577
+
+    batches = list(reader.epoch(batch_size=50, window=3))
+    rows = np.concatenate([batch["rewards"] for batch in batches]).astype(np.int64)
+    np.testing.assert_array_equal(np.sort(rows), np.arange(577))
+    assert max(len(batch["rewards"]) for batch in batches) == 50
+
+    for batch in batches:
+        np.testing.assert_array_equal(batch["obs"][:, 0], batch["rewards"])
+        np.testing.assert_array_equal(batch["actions"], batch["rewards"].astype(np.int64) % 5)
+        np.testing.assert_array_equal(batch["terminals"], batch["rewards"].astype(np.int64) % 7 == 0)
+
+
+def test_empty_dataset(tmp_path):
+    path = str(tmp_path)
+    with DatasetWriter(path, shard_size=100):
+        pass
+    assert os.listdir(path) == []
+
+    reader = DatasetReader(path)
+    assert len(reader) == 0
+    assert list(reader.epoch(batch_size=8)) == []
+    with pytest.raises(ValueError):
+        reader.sample(8)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import Agent
+from deep_logistics.demand import PoissonProcess
+from deep_logistics.environment import Environment
+from deep_logistics.scheduler import BacklogScheduler
+
+
+def environment(delivery_locations=((2, 2), (5, 4))):
+    return Environment(width=7, height=6, depth=3, taxi_n=2, taxi_agent=Agent, scheduler=BacklogScheduler,
+                       demand=PoissonProcess(rate=5.0), demand_seed=1,
+                       spawn_strategy=spawn_strategy.RandomSpawnStrategy, delivery_locations=list(delivery_locations))
+
+
+def test_backlog_scheduler_has_no_generator():
+    env = environment()
+    assert env.scheduler.generator is None
+
+
+def test_reset_discards_backlog():
+    np.random.seed(0)
+    env = environment()
+    for _ in range(30):
+        env.update()
+    assert len(env.demand) > 0
+
+    env.reset()
+    assert len(env.demand) == 0
+    assert env.demand.horizon == env.get_seconds()
+
+
+def test_no_delivery_points():
+    with pytest.raises(ValueError):
+        environment(delivery_locations=())
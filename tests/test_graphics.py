@@ -0,0 +1,26 @@
+import numpy as np
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import Agent
+from deep_logistics.environment import Environment
+
+
+def test_overlay_repaints_hot_cells():
+    env = Environment(width=7, height=6, depth=3, taxi_n=2, taxi_agent=Agent,
+                      spawn_strategy=spawn_strategy.RandomSpawnStrategy, delivery_locations=[(2, 2), (5, 4)])
+    graphics = env.graphics
+    graphics.blit()
+    before = graphics.frame()
+
+    heat = np.zeros((env.height, env.width))
+    heat[3, 4] = 1.0
+    heat[1, 0] = 0.5
+    graphics.draw_overlay(heat)
+
+    assert sorted((cell.x, cell.y) for cell in graphics.changes_cells) == [(0, 1), (4, 3)]
+    changed = (graphics.frame() != before).any(axis=2)
+    assert changed[3 * graphics.cell_height, 4 * graphics.cell_width]
+    assert not changed[5 * graphics.cell_height:, :].any()
+
+    graphics.blit()
+    np.testing.assert_array_equal(graphics.frame(), before)
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from experiments.experiment_5.per_rl.inference import InferenceBatcher
+
+
+class Recorder:
+    """Stub predict_fn that records the batches it was called with."""
+
+    def __init__(self, fn=lambda x: x * 2):
+        self.fn = fn
+        self.batches = []
+
+    def __call__(self, x):
+        self.batches.append(x.copy())
+        return self.fn(x)
+
+
+def call_concurrently(batcher, observations):
+    """__call__ the batcher from one thread per observation, all started together. Returns the results in order."""
+    results = [None] * len(observations)
+    barrier = threading.Barrier(len(observations))
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = batcher(observations[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i, )) for i in range(len(observations))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+        assert not thread.is_alive(), "A caller hangs"
+    return results
+
+
+def test_concurrent_calls_are_merged():
+    predict = Recorder()
+    batcher = InferenceBatcher(predict, max_batch_size=4, max_latency=0.5)
+    observations = [np.full(3, i, dtype=np.float32) for i in range(10)]
+
+    results = call_concurrently(batcher, observations)
+    batcher.close()
+
+    assert [len(batch) for batch in predict.batches] == [4, 4, 2]
+    assert batcher.batches == 3 and batcher.requests == 10
+    for observation, result in zip(observations, results):
+        np.testing.assert_array_equal(result, observation * 2)
+
+
+def test_lone_request_is_flushed_after_max_latency():
+    predict = Recorder()
+    batcher = InferenceBatcher(predict, max_batch_size=64, max_latency=0.05)
+
+    start = time.perf_counter()
+    result = batcher(np.ones(3))
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    assert 0.05 <= elapsed < 2.0
+    assert [len(batch) for batch in predict.batches] == [1]
+    np.testing.assert_array_equal(result, np.full(3, 2.0))
+
+
+@pytest.mark.parametrize("kind", ["tuple", "dict"])
+def test_callers_get_their_row(kind):
+    def predict(x):
+        actions = x[:, 0].astype(np.int64)
+        values = x.sum(axis=1)
+        return (actions, values) if kind == "tuple" else dict(actions=actions, outputs=dict(values=values))
+
+    batcher = InferenceBatcher(predict, max_batch_size=8, max_latency=0.2)
+    observations = [np.array([i, i, 1.0]) for i in range(12)]
+    results = call_concurrently(batcher, observations)
+    batcher.close()
+
+    for i, result in enumerate(results):
+        if kind == "tuple":
+            assert isinstance(result, tuple)
+            actions, values = result
+        else:
+            actions, values = result["actions"], result["outputs"]["values"]
+        assert actions == i
+        assert values == 2 * i + 1
+
+
+def test_exception_reaches_every_caller():
+    failing = [True]
+
+    def predict(x):
+        if failing[0]:
+            raise RuntimeError("predict failed")
+        return x
+
+    batcher = InferenceBatcher(predict, max_batch_size=4, max_latency=0.2)
+    results = call_concurrently(batcher, [np.zeros(2) for _ in range(6)])
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    """The batcher keeps serving after a failed batch."""
+    failing[0] = False
+    np.testing.assert_array_equal(batcher.submit(np.ones(2)).result(timeout=5), np.ones(2))
+    batcher.close()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from experiments.experiment_5.per_rl.storage.minibatch import MinibatchIterator
+
+
+def batch(n):
+    """Columns whose values all encode the row, so misaligned rows are detected."""
+    rows = np.arange(n)
+    return dict(
+        obs=np.repeat(rows[:, None, None], 6, axis=1).repeat(2, axis=2).astype(np.float32),
+        actions=rows.astype(np.int64),
+        rewards=rows.astype(np.float64) / 2,
+        terminals=rows % 3 == 0,
+    )
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+@pytest.mark.parametrize("n, batch_size", [(100, 32), (96, 32), (10, 64), (1, 1)])
+def test_epoch(n, batch_size, shuffle):
+    np.random.seed(0)
+    minibatches = MinibatchIterator(batch(n), batch_size=batch_size, shuffle=shuffle)
+    size = min(batch_size, n)
+
+    orders = []
+    for _ in range(3):
+        rows = []
+        sizes = []
+        for minibatch in minibatches.epoch():
+            actions = minibatch["actions"].copy()
+            sizes.append(len(actions))
+
+            np.testing.assert_array_equal(minibatch["obs"], np.broadcast_to(
+                actions[:, None, None].astype(np.float32), (len(actions), 6, 2)))
+            np.testing.assert_array_equal(minibatch["rewards"], actions / 2)
+            np.testing.assert_array_equal(minibatch["terminals"], actions % 3 == 0)
+            rows.append(actions)
+
+        rows = np.concatenate(rows)
+        np.testing.assert_array_equal(np.sort(rows), np.arange(n))
+        assert len(sizes) == len(minibatches)
+        assert all(s == size for s in sizes[:-1])
+        assert 0 < sizes[-1] <= size
+        assert sizes[-1] == n - size * (len(sizes) - 1)
+        orders.append(rows)
+
+    if not shuffle:
+        np.testing.assert_array_equal(orders[0], np.arange(n))
+    elif n > 10:
+        assert not np.array_equal(orders[0], orders[1])
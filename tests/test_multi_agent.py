@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.action_space import ActionSpace
+from deep_logistics.agent import Agent
+from deep_logistics.environment import Environment
+from deep_logistics.multi_agent import MultiAgentEnvironment
+from experiments.experiment_3.state_representations import State0
+
+
+class TickReward:
+    """Per-agent reward of the tick number (1, 2, ...), terminal on terminal_tick."""
+
+    def __init__(self, env, terminal_tick=None):
+        self.env = env
+        self.start = env.tick_ps_counter
+        self.terminal_tick = terminal_tick
+
+    def __call__(self, agent):
+        tick = self.env.tick_ps_counter - self.start
+        return float(tick), tick == self.terminal_tick
+
+
+def multi_agent(frame_skip, gamma=1.0, terminal_tick=None):
+    env = Environment(width=20, height=20, depth=3, taxi_n=2, taxi_agent=Agent, ticks_per_second=1,
+                      spawn_strategy=spawn_strategy.RandomSpawnStrategy, delivery_locations=[(2, 2)])
+    renders = []
+    env.render = lambda: renders.append(env.tick_ps_counter)
+    return MultiAgentEnvironment(env, State0, TickReward(env, terminal_tick), render=True, frame_skip=frame_skip,
+                                 gamma=gamma), renders
+
+
+@pytest.mark.parametrize("gamma", [1.0, 0.9])
+def test_frame_skip_accumulates_rewards(gamma):
+    env, renders = multi_agent(frame_skip=4, gamma=gamma)
+    actions = np.full(2, ActionSpace.NOOP)
+
+    _, rewards, terminals, info = env.step(actions)
+    assert info["ticks"] == 4
+    assert not terminals.any()
+    np.testing.assert_allclose(rewards, sum(gamma ** i * (i + 1) for i in range(4)))
+
+    _, rewards, _, _ = env.step(actions)
+    np.testing.assert_allclose(rewards, sum(gamma ** i * (i + 5) for i in range(4)))
+    assert renders == [env.env.tick_ps_counter - 4, env.env.tick_ps_counter]
+
+
+def test_frame_skip_stops_on_terminal():
+    env, renders = multi_agent(frame_skip=4, terminal_tick=6)
+    actions = np.full(2, ActionSpace.NOOP)
+
+    env.step(actions)
+    _, rewards, terminals, info = env.step(actions)
+    assert info["ticks"] == 2
+    assert terminals.all()
+    np.testing.assert_allclose(rewards, 5 + 6)
+    assert len(renders) == 2
+
+
+def test_frame_skip_counts_actions_once():
+    env, _ = multi_agent(frame_skip=4)
+    start = [(agent.cell.x, agent.cell.y) for agent in env.env.agents]
+    actions = np.array([ActionSpace.NOOP, ActionSpace.NOOP])
+
+    for _ in range(3):
+        env.step(actions)
+    assert [agent.total_actions for agent in env.env.agents] == [3, 3]
+    assert [(agent.cell.x, agent.cell.y) for agent in env.env.agents] == start
+
+
+def test_frame_skip_holds_the_action():
+    np.random.seed(0)
+    env, _ = multi_agent(frame_skip=4)
+    agent = env.env.agents[0]
+    x, y = agent.cell.x, agent.cell.y
+    action, dx = (ActionSpace.LEFT, -1) if x >= 10 else (ActionSpace.RIGHT, 1)
+
+    env.step(np.array([action, ActionSpace.NOOP]), mask=np.array([True, False]))
+    assert (agent.cell.x, agent.cell.y) == (x + 4 * dx, y)
+    assert agent.total_actions == 1
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from experiments.experiment_5.per_rl.numpy_policy import NumpyPolicy
+
+"""Export of an A2C policy (See Policy.export): h_1..h_3 are shared by the logits and the action value."""
+OUTPUTS = dict(
+    logits=("h_1", "h_2", "h_3", "logits"),
+    action_value=("h_1", "h_2", "h_3", "h_4", "h_5", "h_6", "action_value")
+)
+LAYERS = [
+    ("h_1", 8, 16, "relu", True),
+    ("h_2", 16, 16, "tanh", True),
+    ("h_3", 16, 12, "sigmoid", False),
+    ("logits", 12, 5, "linear", True),
+    ("h_4", 12, 10, "relu", True),
+    ("h_5", 10, 10, "relu", False),
+    ("h_6", 10, 6, "tanh", True),
+    ("action_value", 6, 1, "linear", True),
+]
+
+
+def export(seed=0, dtype=np.float32):
+    rng = np.random.RandomState(seed)
+    return dict(
+        outputs=OUTPUTS,
+        squeezed=("action_value", ),
+        layers={
+            name: dict(kernel=rng.normal(size=(n_in, n_out)).astype(dtype),
+                       bias=rng.normal(size=n_out).astype(dtype) if use_bias else None,
+                       activation=activation)
+            for name, n_in, n_out, activation, use_bias in LAYERS
+        }
+    )
+
+
+def forward(spec, x):
+    """The Keras forward pass, written out layer by layer."""
+    def dense(name, x):
+        layer = spec["layers"][name]
+        y = x @ layer["kernel"]
+        if layer["bias"] is not None:
+            y = y + layer["bias"]
+        return dict(relu=lambda v: np.maximum(v, 0), tanh=np.tanh, sigmoid=lambda v: 1 / (1 + np.exp(-v)),
+                    linear=lambda v: v)[layer["activation"]](y)
+
+    h_3 = dense("h_3", dense("h_2", dense("h_1", x)))
+    logits = dense("logits", h_3)
+    action_value = dense("action_value", dense("h_6", dense("h_5", dense("h_4", h_3))))
+    return dict(logits=logits, action_value=np.squeeze(action_value))
+
+
+def test_outputs_match_forward_pass():
+    spec = export()
+    policy = NumpyPolicy(spec, seed=0)
+    x = np.random.RandomState(1).normal(size=(32, 8)).astype(np.float32)
+
+    pred = policy(x)
+    expected = forward(spec, x)
+    assert pred.keys() == expected.keys()
+    assert pred["logits"].shape == (32, 5)
+    assert pred["action_value"].shape == (32, )
+    for name in expected:
+        assert pred[name].dtype == np.float32
+        np.testing.assert_allclose(pred[name], expected[name], rtol=1e-5, atol=1e-5)
+
+    """A single observation is a batch of one."""
+    np.testing.assert_allclose(policy(x[0])["logits"], expected["logits"][:1], rtol=1e-5, atol=1e-5)
+
+
+def test_set_weights():
+    policy = NumpyPolicy(export(seed=0))
+    x = np.ones((4, 8), dtype=np.float32)
+
+    spec = export(seed=2)
+    policy.set_weights(spec)
+    np.testing.assert_allclose(policy(x)["logits"], forward(spec, x)["logits"], rtol=1e-5, atol=1e-5)
+
+    spec["layers"]["h_2"]["activation"] = "elu"
+    with pytest.raises(NotImplementedError):
+        policy.set_weights(spec)
+
+    del spec["layers"]["h_5"]
+    spec["layers"]["h_2"]["activation"] = "tanh"
+    with pytest.raises(ValueError):
+        policy.set_weights(spec)
+
+
+def test_sample_follows_logits():
+    policy = NumpyPolicy(export(), seed=0)
+    logits = np.log(np.array([0.1, 0.2, 0.3, 0.4, 0.0]) + 1e-12).astype(np.float32)
+    n = 50000
+
+    actions = policy.sample(dict(logits=np.tile(logits, (n, 1))))
+    assert actions.shape == (n, )
+
+    frequencies = np.bincount(actions, minlength=5) / n
+    np.testing.assert_allclose(frequencies, [0.1, 0.2, 0.3, 0.4, 0.0], atol=0.01)
+
+
+def test_predict_batch():
+    spec = export()
+    policy = NumpyPolicy(spec, seed=0)
+    x = np.random.RandomState(3).normal(size=(6, 8)).astype(np.float32)
+
+    actions, outputs = policy.predict_batch(x)
+    assert actions.shape == (6, )
+    assert set(outputs.keys()) == {"old_logits", "old_action_value"}
+    np.testing.assert_allclose(outputs["old_action_value"], forward(spec, x)["action_value"], rtol=1e-5, atol=1e-5)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from deep_logistics import spawn_strategy
+from deep_logistics.distance_field import bfs
+from deep_logistics.environment import Environment
+from deep_logistics.planner import ReservationAgent
+
+"""A U-shaped wall around (4, 4), open to the left. The target (8, 4) is right behind its closed side."""
+U_WALL = [
+    "..........",
+    "..........",
+    "..#####...",
+    "......#...",
+    "......#...",
+    "......#...",
+    "..#####...",
+    "..........",
+    "..........",
+    "..........",
+]
+
+
+def environment(obstacles=None, taxi_n=1, size=10, delivery_locations=((0, 0), )):
+    return Environment(width=size, height=size, depth=3, taxi_n=taxi_n, taxi_agent=ReservationAgent,
+                       ticks_per_second=1, obstacles=obstacles, spawn_strategy=spawn_strategy.RandomSpawnStrategy,
+                       delivery_locations=list(delivery_locations))
+
+
+def test_search_finds_shortest_path_around_obstacles():
+    env = environment(U_WALL)
+    planner = env.planner
+    planner.reservations.clear()
+    start, target = (4, 4), (8, 4)
+
+    path = planner._search(-1, start, target, planner.t)
+    optimal = bfs(~env.grid.obstacles, *start)[target[1], target[0]]
+
+    assert optimal == 16
+    assert path[0] == start and path[-1] == target
+    assert len(path) - 1 == optimal
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert abs(x1 - x0) + abs(y1 - y0) == 1
+        assert not env.grid.obstacles[y1, x1]
+
+
+def test_fleet_does_not_collide():
+    np.random.seed(0)
+    env = environment(taxi_n=20, size=16, delivery_locations=[(4, 4), (11, 4), (4, 11), (11, 11)])
+
+    for _ in range(400):
+        env.update()
+
+    assert sum(agent.total_crashes for agent in env.agents) == 0
+    assert sum(agent.total_deliveries for agent in env.agents) > 0
+    assert env.planner.total_plans > len(env.agents)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import Agent, ManhattanAgent
+from deep_logistics.demand import PoissonProcess
+from deep_logistics.environment import Environment
+from deep_logistics.recorder import EpisodeRecorder, EpisodeReplayer
+from deep_logistics.scheduler import BacklogScheduler
+
+SCENARIOS = dict(
+    on_demand=dict(taxi_agent=Agent),
+    backlog=dict(taxi_agent=ManhattanAgent, scheduler=BacklogScheduler, demand=PoissonProcess(rate=0.5),
+                 demand_seed=3, congestion_window=100),
+)
+
+
+def _order(order):
+    return order and (order.id, order.x_0, order.y_0, order.x_1, order.y_1, order.has_picked_up, order.started_at)
+
+
+def snapshot(env):
+    """Mutable state of the environment that a replay must reproduce."""
+    pending = env.demand.backlog if env.demand is not None else env.scheduler.generator.queue
+    return repr(dict(
+        agents=[(a.cell and (a.cell.x, a.cell.y), a.state, a.action, a.action_progress, _order(a.task))
+                for a in env.agents],
+        pending=[_order(order) for order in pending],
+        cells=[(cell.x, cell.y, cell.type.__name__, cell.occupant and cell.occupant.id) for cell in env.grid.grid.flat],
+        congestion={k: v.round(9).tolist() for k, v in env.grid.congestion.arrays().items()},
+        telemetry=env.telemetry.export(),
+        seconds=env.get_seconds()
+    ))
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS.keys()))
+def test_replay_matches_recording(tmp_path, scenario):
+    path = str(tmp_path / "episode.bin")
+    env = Environment(width=12, height=10, depth=3, taxi_n=8, telemetry=True, congestion=True,
+                      spawn_strategy=spawn_strategy.RandomSpawnStrategy, **SCENARIOS[scenario])
+    recorder = EpisodeRecorder(env, path, seed=5, keyframe_interval=50, chunk=20)
+
+    rng = np.random.RandomState(0)
+    snapshots = []
+    for _ in range(300):
+        snapshots.append(snapshot(env))
+        for agent in env.agents:
+            if rng.rand() < 0.5:
+                agent.do_action(int(rng.randint(5)))
+        env.update()
+        if env.is_terminal():
+            env.reset()
+    snapshots.append(snapshot(env))
+    recorder.close()
+
+    replayer = EpisodeReplayer(path)
+    assert len(replayer) == 300
+    for tick in [0, 300, 49, 50, 51, 123, 7, 299, 200, 201]:
+        assert snapshot(replayer.seek(tick)) == snapshots[tick], "tick %s" % tick
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from experiments.experiment_5.per_rl.returns import discounted_returns, generalized_advantage_estimation
+
+"""Reference loops, as PPOAgent computed returns and advantages before returns.py."""
+
+
+def returns_loop(rewards, gamma, terminals, bootstrap=0.0):
+    returns = np.zeros(len(rewards))
+    cum_r = bootstrap
+    for i in reversed(range(len(rewards))):
+        cum_r = rewards[i] + cum_r * gamma * (1 - terminals[i])
+        returns[i] = cum_r
+    return returns
+
+
+def gae_loop(rewards, values, gamma, lam, terminals, bootstrap=0.0):
+    """The PPOAgent loop. It masks step t with terminal[t + 1], i.e. by whether the following step ended an episode."""
+    V = np.concatenate((values, [bootstrap]))
+    terminal = np.concatenate((terminals, [0]))
+    adv = np.zeros(len(rewards))
+    lastgaelam = 0
+    for t in reversed(range(len(rewards))):
+        nextnonterminal = 1 - terminal[t + 1]
+        delta = rewards[t] + gamma * (V[t + 1] * nextnonterminal) - V[t]
+        adv[t] = lastgaelam = delta + gamma * lam * nextnonterminal * lastgaelam
+    return adv
+
+
+def shift(terminals):
+    """Terminals as the loop reads them: terminals[t] of returns.py is terminal[t + 1] of gae_loop."""
+    return np.concatenate(([0], terminals[:-1]))
+
+
+def batch(seed, steps=200, n_envs=3):
+    rng = np.random.RandomState(seed)
+    rewards = rng.normal(size=(steps, n_envs))
+    values = rng.normal(size=(steps, n_envs))
+    terminals = rng.rand(steps, n_envs) < 0.05
+    terminals[steps // 2] = True  # A terminal mid-batch in every environment
+    terminals[-1, 0] = True  # And one on the last step
+    bootstrap = rng.normal(size=n_envs)
+    return rewards, values, terminals, bootstrap
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_discounted_returns_match_loop(seed):
+    rewards, _, terminals, bootstrap = batch(seed)
+    gamma = 0.97
+
+    for e in range(rewards.shape[1]):
+        np.testing.assert_allclose(discounted_returns(rewards[:, e], gamma, terminals=terminals[:, e]),
+                                   returns_loop(rewards[:, e], gamma, terminals[:, e]), rtol=0, atol=1e-10)
+        np.testing.assert_allclose(
+            discounted_returns(rewards[:, e], gamma, terminals=terminals[:, e], bootstrap=bootstrap[e]),
+            returns_loop(rewards[:, e], gamma, terminals[:, e], bootstrap=bootstrap[e]), rtol=0, atol=1e-10
+        )
+
+    """Interleaved environments, flat like DynamicBatch rows of environments stepped in lockstep."""
+    flat = discounted_returns(rewards.reshape(-1), gamma, terminals=terminals.reshape(-1), bootstrap=bootstrap,
+                              n_envs=rewards.shape[1])
+    expected = np.stack([returns_loop(rewards[:, e], gamma, terminals[:, e], bootstrap=bootstrap[e])
+                         for e in range(rewards.shape[1])], axis=1)
+    assert flat.shape == (rewards.size, )
+    np.testing.assert_allclose(flat.reshape(rewards.shape), expected, rtol=0, atol=1e-10)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_gae_matches_loop(seed):
+    rewards, values, terminals, bootstrap = batch(seed)
+    gamma, lam = 0.99, 0.95
+    n_envs = rewards.shape[1]
+
+    advantages, returns = generalized_advantage_estimation(
+        rewards.reshape(-1), values.reshape(-1), gamma, lam, terminals=terminals.reshape(-1), bootstrap=bootstrap,
+        n_envs=n_envs
+    )
+    advantages = advantages.reshape(rewards.shape)
+    np.testing.assert_allclose(returns.reshape(rewards.shape), advantages + values, rtol=0, atol=1e-12)
+
+    for e in range(n_envs):
+        expected = gae_loop(rewards[:, e], values[:, e], gamma, lam, shift(terminals[:, e]), bootstrap=bootstrap[e])
+        if terminals[-1, e]:
+            """The loop cannot express a terminal on the last step, the bootstrap is cut off instead."""
+            expected = gae_loop(rewards[:, e], values[:, e], gamma, lam, shift(terminals[:, e]), bootstrap=0.0)
+        np.testing.assert_allclose(advantages[:, e], expected, rtol=0, atol=1e-10)
+
+
+def test_gae_masks_with_the_terminal_step():
+    """
+    Pins the change from the PPOAgent loop: a terminal on step t stops step t from bootstrapping from step t + 1.
+    The loop masked with terminals[t + 1] and bootstrapped across the episode end instead.
+    """
+    rewards = np.array([1.0, 1.0, 1.0])
+    values = np.array([0.0, 10.0, 0.0])
+    terminals = np.array([True, False, False])
+    gamma, lam = 0.5, 1.0
+
+    advantages, _ = generalized_advantage_estimation(rewards, values, gamma, lam, terminals=terminals)
+    np.testing.assert_allclose(advantages, [1.0, -8.5, 1.0])
+    np.testing.assert_allclose(gae_loop(rewards, values, gamma, lam, terminals), [1.75, -8.5, 1.0])
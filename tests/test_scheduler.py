@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import Agent
+from deep_logistics.environment import Environment
+
+"""The bottom right 3x3 corner is a pocket walled off from the rest of the map."""
+POCKET = [
+    "........",
+    "........",
+    "........",
+    ".....###",
+    ".....#..",
+    ".....#..",
+]
+
+
+def environment(obstacles):
+    return Environment(width=8, height=6, depth=3, taxi_n=2, taxi_agent=Agent, obstacles=obstacles,
+                       spawn_strategy=spawn_strategy.RandomSpawnStrategy, delivery_locations=[(1, 1)])
+
+
+def test_pickups_are_reachable():
+    random.seed(0)
+    env = environment(POCKET)
+    queue = env.scheduler.generator.queue
+
+    assert len(queue) > 1000
+    for order in queue:
+        assert not env.grid.obstacles[order.y_0, order.x_0]
+        assert order.y_0 >= 2
+        assert not (order.x_0 >= 6 and order.y_0 >= 4), "pickup in the unreachable pocket"
+
+    cells = env.distance_fields.pickup_cells()
+    assert len(cells) == 8 * 4 - 3 - 2 - 4
+    assert len(np.unique([(o.x_0, o.y_0) for o in queue], axis=0)) == len(cells)
+
+
+def test_no_pickup_cells():
+    blocked = ["........", "........"] + ["########"] * 4
+    with pytest.raises(ValueError):
+        environment(blocked)
@@ -0,0 +1,35 @@
+import random
+
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import Agent
+from deep_logistics.environment import Environment
+from experiments.experiment_3.state_representations import State0, State1
+
+
+@pytest.mark.parametrize("state", [State0, State1])
+@pytest.mark.parametrize("seed", range(5))
+def test_generate_batch_matches_generate(state, seed):
+    np.random.seed(seed)
+    random.seed(seed)
+    env = Environment(width=7, height=6, depth=3, taxi_n=12, taxi_agent=Agent,
+                      spawn_strategy=spawn_strategy.RandomSpawnStrategy, delivery_locations=[(2, 2), (5, 4)])
+    representation = state(env)
+
+    for _ in range(300):
+        for agent in env.agents:
+            agent.do_action(np.random.randint(5))
+        env.update()
+
+        batch = representation.generate_batch()
+        assert batch.dtype == np.float32
+
+        # generate() fails for agents that have a task but no cell, there is nothing to compare for them.
+        for i, agent in enumerate(env.agents):
+            if agent.cell or not agent.task:
+                np.testing.assert_array_equal(batch[i], representation.generate(agent).astype(np.float32))
+
+        if env.is_terminal():
+            env.reset()
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import Agent, ManhattanAgent
+from deep_logistics.environment import Environment
+
+
+class CountingAgent(Agent):
+    crashes = 0
+
+    def crash(self):
+        CountingAgent.crashes += 1
+        super().crash()
+
+
+@pytest.mark.parametrize("simultaneous_moves", [False, True])
+def test_crashes_match_crash_calls(simultaneous_moves):
+    np.random.seed(0)
+    CountingAgent.crashes = 0
+    env = Environment(width=7, height=6, depth=3, taxi_n=12, taxi_agent=CountingAgent, telemetry=True,
+                      simultaneous_moves=simultaneous_moves, spawn_strategy=spawn_strategy.RandomSpawnStrategy,
+                      delivery_locations=[(2, 2), (5, 4)])
+
+    episodes = []
+    for _ in range(500):
+        for agent in env.agents:
+            agent.do_action(np.random.randint(5))
+        env.update()
+        if env.is_terminal():
+            env.reset()
+            episodes.append(env.telemetry.last_episode)
+    episodes.append(env.telemetry.export())
+
+    assert CountingAgent.crashes > len(episodes)
+    assert sum(episode["crashes"] for episode in episodes) == CountingAgent.crashes
+    assert sum(sum(episode["agents"]["crashes"]) for episode in episodes) == CountingAgent.crashes
+
+    for episode in episodes:
+        crashes = np.array(episode["agents"]["crashes"])
+        ratios = np.array(episode["agents"]["crash_ratio"])
+        assert np.all((ratios > 0) == (crashes > 0))
+
+
+class CountingManhattanAgent(ManhattanAgent):
+    """Counts the increments of total_deliveries (Order.evaluate), which reset_stats zeroes on every spawn."""
+
+    def __init__(self, env):
+        self.delivered = 0
+        super().__init__(env)
+
+    @property
+    def total_deliveries(self):
+        return self._total_deliveries
+
+    @total_deliveries.setter
+    def total_deliveries(self, value):
+        self.delivered += max(value - getattr(self, "_total_deliveries", 0), 0)
+        self._total_deliveries = value
+
+
+def test_deliveries_match_delivered_orders():
+    np.random.seed(0)
+    env = Environment(width=10, height=10, depth=3, taxi_n=6, taxi_agent=CountingManhattanAgent, telemetry=True,
+                      ticks_per_second=1, spawn_strategy=spawn_strategy.RandomSpawnStrategy,
+                      delivery_locations=[(2, 2), (7, 7)])
+
+    episodes = []
+    for _ in range(600):
+        env.update()
+        if env.is_terminal():
+            env.reset()
+            episodes.append(env.telemetry.last_episode)
+    episodes.append(env.telemetry.export())
+
+    delivered = [agent.delivered for agent in env.agents]
+    assert sum(delivered) > 10
+    assert sum(episode["deliveries"] for episode in episodes) == sum(delivered)
+    np.testing.assert_array_equal(np.sum([episode["agents"]["deliveries"] for episode in episodes], axis=0),
+                                  delivered)
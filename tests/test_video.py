@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from deep_logistics import spawn_strategy
+from deep_logistics.agent import ManhattanAgent
+from deep_logistics.environment import Environment
+from deep_logistics.video import VideoSink
+
+
+def _record(path, ticks, stride):
+    np.random.seed(0)
+    env = Environment(width=7, height=6, depth=3, taxi_n=2, taxi_agent=ManhattanAgent, ticks_per_second=1,
+                      spawn_strategy=spawn_strategy.RandomSpawnStrategy, delivery_locations=[(2, 2), (5, 4)])
+    env.record_video(path, fps=10, stride=stride, block=True)
+    for _ in range(ticks):
+        env.update()
+        env.render()
+    return env.stop_video()
+
+
+def test_mp4_writes_every_stride_frame(tmp_path):
+    path = str(tmp_path / "episode.mp4")
+    video = _record(path, ticks=9, stride=2)
+
+    assert video.frames == 9
+    assert video.written == 5
+    assert video.dropped == 0
+    assert os.path.getsize(path) > 0
+
+
+def test_gif_writes_every_stride_frame(tmp_path):
+    path = str(tmp_path / "episode.gif")
+    video = _record(path, ticks=10, stride=2)
+
+    assert video.frames == 10
+    assert video.written == 5
+    assert video.dropped == 0
+    assert os.path.getsize(path) > 0
+
+
+def test_gif_without_imageio_fails_up_front(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "imageio", None)
+    with pytest.raises(ImportError, match="requires imageio"):
+        VideoSink(str(tmp_path / "episode.gif"))